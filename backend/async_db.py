@@ -0,0 +1,73 @@
+import os
+import re
+import threading
+from sqlalchemy.engine import make_url
+from starlette.concurrency import run_in_threadpool
+try:
+    from backend.models import SessionLocal, DATABASE_URL, SQL_ECHO, engine_options
+except ImportError:
+    from models import SessionLocal, DATABASE_URL, SQL_ECHO, engine_options
+
+# how request handlers reach the database
+#   DB_ASYNC=0 (default)  each handler's DB work runs on the threadpool with a regular Session, one thread per request
+#   DB_ASYNC=1            an AsyncSession on asyncpg (Postgres) / aiosqlite (SQLite); waiting on the database
+#                         no longer ties up a thread, so concurrency isn't capped by the threadpool size
+# handlers are written once, as plain functions of a Session, and go through run_db() in either mode;
+# in async mode they run inside AsyncSession.run_sync, so every query is awaited under the hood
+# scripts and background jobs keep using SessionLocal directly
+
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+_engine = None
+_sessionmaker = None
+_lock = threading.Lock()
+
+
+def async_url(url):
+    """ The async-driver version of a sync DATABASE_URL, plus connect_args it needs """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    url = url.set(drivername = ASYNC_DRIVERS[backend])
+    connect_args = {}
+    options = url.query.get("options")
+    if backend == "postgresql" and options:
+        # asyncpg doesn't understand libpq's ?options=-csearch_path=...; it takes server_settings instead
+        connect_args["server_settings"] = dict(re.findall(r"-c\s*([^=\s]+)=(\S+)", options))
+        url = url.difference_update_query(["options"])
+    return url, connect_args
+
+def get_async_engine():
+    global _engine, _sessionmaker
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                # imported here so the async drivers are only needed with DB_ASYNC=1
+                from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+                url, connect_args = async_url(DATABASE_URL)
+                _engine = create_async_engine(url, echo = SQL_ECHO, connect_args = connect_args, **engine_options(DATABASE_URL))
+                # expire_on_commit=False: handlers serialize what they return after committing
+                _sessionmaker = async_sessionmaker(_engine, expire_on_commit = False)
+    return _engine
+
+async def dispose_async_engine():
+    if _engine is not None:
+        await _engine.dispose()
+
+
+def _run_with_session(fn):
+    db = SessionLocal()
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+async def run_db(fn):
+    """ Run fn(session) and return its result, without blocking the event loop in either mode """
+    if DB_ASYNC:
+        get_async_engine()
+        async with _sessionmaker() as session:
+            return await session.run_sync(fn)
+    return await run_in_threadpool(_run_with_session, fn)
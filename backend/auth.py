@@ -3,7 +3,13 @@ from fastapi.responses import RedirectResponse, JSONResponse
 from authlib.integrations.starlette_client import OAuth, OAuthError
 import os
 from dotenv import load_dotenv
-from backend.models import SessionLocal, User
+from sqlalchemy import func
+from backend.models import User, dialect_insert
+# dialect_insert: INSERT ... ON CONFLICT for this database
+from backend.async_db import run_db
+# run_db keeps the user lookups off the event loop (threadpool, or an AsyncSession with DB_ASYNC=1)
+from backend.cache import LRUCache
+from backend.metrics import registry as metrics_registry, Gauge
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
@@ -19,6 +25,15 @@ print(f"Loaded GOOGLE_CLIENT_ID: {GOOGLE_CLIENT_ID}")
 # print(f"Loaded GOOGLE_CLIENT_SECRET: {GOOGLE_CLIENT_SECRET}")
 # print(f"Loaded GOOGLE_REDIRECT_URI: {GOOGLE_REDIRECT_URI}")
 
+# profiles of logged-in users, keyed by the session's user id, so an authenticated request doesn't cost a query
+# the cache is per worker process and nothing invalidates it across workers: login and logout only refresh or
+# drop this worker's entry, so the others serve the old profile until their entry's TTL runs out
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+user_cache = LRUCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+metrics_registry.register(Gauge("user_cache_hits_total", "Profile lookups served from the user cache", lambda: user_cache.hits, kind = "counter"))
+metrics_registry.register(Gauge("user_cache_misses_total", "Profile lookups that went to the database", lambda: user_cache.misses, kind = "counter"))
+
 CONF_URL = 'https://accounts.google.com/.well-known/openid-configuration'
 oauth.register(
     name = 'google',
@@ -28,6 +43,24 @@ oauth.register(
     client_kwargs = {'scope': 'openid email profile'}
 )
 
+def user_profile(user):
+    return {"id": user.id, "email": user.email, "name": user.name, "picture": user.picture}
+
+def upsert_user(db, email, name, picture):
+    """
+    Create the user or refresh their name and picture, in one statement; returns the profile.
+    Two first logins at once can't both insert: the unique email turns the second into an update.
+    A field the provider left out keeps its stored value rather than being cleared.
+    """
+    stmt = dialect_insert(db.get_bind().dialect.name)(User).values(email = email, name = name, picture = picture)
+    stmt = stmt.on_conflict_do_update(index_elements = ["email"], set_ = {
+        "name": func.coalesce(stmt.excluded.name, User.name),
+        "picture": func.coalesce(stmt.excluded.picture, User.picture),
+    })
+    user = db.execute(stmt.returning(User.id, User.email, User.name, User.picture)).one()
+    db.commit()
+    return user_profile(user)
+
 @router.get("/auth/login")
 async def login(request: Request):
     redirect_uri = str(request.url_for('auth_callback'))
@@ -47,19 +80,10 @@ async def auth_callback(request: Request):
         name = user_info.get("name")
         picture = user_info.get("picture")
 
-        # Store/lookup user in DB
-        db = SessionLocal()
-        db_user = db.query(User).filter(User.email == email).first()
-        if not db_user:
-            # if we can't find by email, then we create a new user
-            db_user = User(email=email, name=name, picture=picture)
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
-
         # Store user ID in session for future requests
-        request.session["user_id"] = db_user.id
-        db.close()
+        profile = await run_db(lambda db: upsert_user(db, email, name, picture))
+        user_cache.set(profile["id"], profile) # the next /auth/profile doesn't need the DB
+        request.session["user_id"] = profile["id"]
 
         # Redirect user to your frontend homepage (or a profile page)
         return RedirectResponse(url="http://localhost:8080/")  # or your chosen frontend URL
@@ -69,27 +93,27 @@ async def auth_callback(request: Request):
 
 
 @router.get("/auth/profile")
-def get_profile(request: Request):
+async def get_profile(request: Request):
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Not logged in")
 
-    db = SessionLocal()
-    db_user = db.query(User).filter(User.id == user_id).first()
-    db.close()
+    profile = user_cache.get(user_id)
+    if profile is None:
+        def load_profile(db):
+            db_user = db.query(User.id, User.email, User.name, User.picture).filter(User.id == user_id).first()
+            return user_profile(db_user) if db_user else None
+        profile = await run_db(load_profile)
 
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+        if not profile:
+            raise HTTPException(status_code=404, detail="User not found") # not cached, so a new user is seen at once
+        user_cache.set(user_id, profile)
 
-    return {
-        "id": db_user.id,
-        "email": db_user.email,
-        "name": db_user.name,
-        "picture": db_user.picture
-    }
+    return profile
 
 
 @router.get("/auth/logout")
 def logout(request: Request):
+    user_cache.pop(request.session.get("user_id"))
     request.session.clear()
     return {"detail": "Logged out"}
@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import threading
+import time
+from sqlalchemy import event, func
+from fastapi.testclient import TestClient
+from backend.models import SessionLocal, User, Base, engine
+from backend.main import app
+from backend.auth import user_cache, upsert_user
+from backend.benchmarks.sessions import session_cookie, SESSION_COOKIE
+from backend.benchmarks.synthetic_catalog import ensure_users
+from backend.benchmarks.timing import stopwatch
+
+# SQL statements per authenticated /auth/profile request, with and without the user cache, in process
+# (no server; the same session cookies locust's Member users send). "uncached" clears the cache before
+# every request, which is what each request used to cost
+# then --logins threads log the same new user in at once, which used to race (lookup, then insert)
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_auth_profile --users 1000 --requests 5000
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+def run(client, queries, cookies, requests, uncached):
+    counter_start = queries.count
+    def hit_profile():
+        for _ in range(requests):
+            if uncached:
+                user_cache.clear()
+            response = client.get("/auth/profile", cookies = {SESSION_COOKIE: random.choice(cookies)})
+            assert response.status_code == 200, response.text
+    _, elapsed = stopwatch(hit_profile)
+    return (queries.count - counter_start) / requests, requests / elapsed
+
+def concurrent_logins(threads):
+    email = f"first-login-{time.time_ns()}@load.example"
+    barrier = threading.Barrier(threads)
+    errors, ids = [], []
+
+    def login():
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            ids.append(upsert_user(db, email, "New User", None)["id"])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+    workers = [threading.Thread(target = login) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    db = SessionLocal()
+    rows = db.query(func.count(User.id)).filter(User.email == email).scalar()
+    db.close()
+    return rows, len(set(ids)), errors
+
+def main():
+    parser = argparse.ArgumentParser(description = "DB queries per authenticated request, with and without the user cache")
+    parser.add_argument("--users", type = int, default = 1000)
+    parser.add_argument("--requests", type = int, default = 5000)
+    parser.add_argument("--logins", type = int, default = 16, help = "threads logging the same new user in at once")
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    ensure_users(db, args.users)
+    user_ids = [user_id for user_id, in db.query(User.id).limit(args.users)]
+    db.close()
+    secret = os.environ["SESSION_SECRET_KEY"]
+    cookies = [session_cookie(secret, {"user_id": user_id}) for user_id in user_ids]
+    queries = QueryCounter()
+    client = TestClient(app)
+
+    print(f"{len(user_ids)} users, {args.requests} requests to /auth/profile")
+    print(f"{'case':<12}{'queries/request':>18}{'requests/s':>14}")
+    for name, uncached in (("uncached", True), ("cached", False)):
+        user_cache.clear()
+        per_request, throughput = run(client, queries, cookies, args.requests, uncached)
+        print(f"{name:<12}{per_request:>18.3f}{throughput:>14.0f}")
+    rows, distinct, errors = concurrent_logins(args.logins)
+    print(f"{args.logins} simultaneous first logins: {rows} user row, {distinct} distinct id, {len(errors)} errors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import time
+from backend.models import SessionLocal, Tool, Base, engine
+from backend.ingest import BulkIngest
+from backend.benchmarks.timing import stopwatch
+
+# per-row inserts (what POST /tools does: add + commit + refresh per tool) vs BulkIngest's batched upserts
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_bulk_ingest --rows 20000
+
+
+def records(prefix, rows):
+    for i in range(rows):
+        yield {"name": f"{prefix} tool {i}", "description": f"synthetic api number {i}", "category": f"Bench {i % 20}", "url": f"https://{prefix}.bench.example/{i}"}
+
+def per_row(db, rows, prefix):
+    for record in records(prefix, rows):
+        tool = Tool(**record)
+        db.add(tool)
+        db.commit()
+        db.refresh(tool)
+
+def bulk(db, rows, prefix, batch_size):
+    ingest = BulkIngest(db, batch_size = batch_size)
+    for number, record in enumerate(records(prefix, rows), 1):
+        ingest.add(number, record)
+        if ingest.ready():
+            ingest.flush()
+    ingest.flush()
+    return ingest.report()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Per-row vs batched tool inserts")
+    parser.add_argument("--rows", type = int, default = 20_000)
+    parser.add_argument("--per-row-rows", type = int, default = 2_000, help = "per-row inserts are slow; time fewer and scale")
+    parser.add_argument("--batch-size", type = int, default = 1000)
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    run = int(time.time())
+    _, seconds = stopwatch(lambda: per_row(db, args.per_row_rows, f"row{run}"))
+    per_row_rate = args.per_row_rows / seconds
+    report, seconds = stopwatch(lambda: bulk(db, args.rows, f"bulk{run}", args.batch_size))
+    bulk_rate = args.rows / seconds
+    db.close()
+
+    print(f"{'mode':<12}{'rows':>10}{'rows/s':>12}")
+    print(f"{'per-row':<12}{args.per_row_rows:>10}{per_row_rate:>12.0f}")
+    print(f"{'bulk':<12}{report['written']:>10}{bulk_rate:>12.0f}")
+    print(f"speedup: {bulk_rate / per_row_rate:.1f}x")
+
+if __name__ == "__main__":
+    main()
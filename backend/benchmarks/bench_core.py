@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import numpy as np
+from backend.vector_index import FlatIndex, IVFIndex, _top_k
+from backend.serialization import TOOL_FIELDS, tools_json, orjson
+from backend.benchmarks.bench_vector_index import synthetic_vectors
+from backend.benchmarks.synthetic_catalog import synthetic_tool
+from backend.benchmarks.timing import timed, summary
+
+# offline microbenchmarks for the ranking core, in the spirit of pytest-benchmark:
+# every case is warmed up, timed for a fixed number of rounds and summarized (min/median/mean/stddev/ops)
+#   encode     query encoding with the real model, one query and a batch of 64 (skipped if it can't load)
+#   topk       argpartition top-k over N scores, flat scan and IVF search at N vectors
+#   serialize  tools_json for 10/100/500 rows
+#   db         /tools page, keyset page and keyword search against DATABASE_URL (SQLite or Postgres),
+#              on a synthetic catalog of --rows tools
+# results go to a JSON file; pass an earlier one as --compare to see what got slower:
+#   python -m backend.benchmarks.bench_core --output results/core.json
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_core --groups db --rows 100000 \
+#       --output results/core-db.json --compare results/core-db-main.json
+
+GROUPS = ("encode", "topk", "serialize", "db")
+
+
+def encode_cases(args):
+    try:
+        from backend.embeddings import encode_texts
+        encode_texts(["warm up"])
+    except Exception as e:
+        print(f"skipping encode: {e}")
+        return {}
+    batch = [f"weather api number {i}" for i in range(64)]
+    return {
+        "encode/query": lambda: encode_texts(["real time stock prices"]),
+        "encode/batch64": lambda: encode_texts(batch),
+    }
+
+def topk_cases(args):
+    data = synthetic_vectors(args.vectors + 1, args.dim, clusters = max(1, args.vectors // 20), seed = args.seed)
+    vectors, query = data[:-1], data[-1]
+    ids = np.arange(1, args.vectors + 1)
+    scores = vectors @ query
+    flat = FlatIndex(args.dim)
+    flat.add(ids, vectors)
+    ivf = IVFIndex(args.dim)
+    ivf.add(ids, vectors)
+    ivf.train()
+    return {
+        f"topk/argpartition-{args.vectors}": lambda: _top_k(scores, 10),
+        f"topk/flat-{args.vectors}": lambda: flat.search(query, 10),
+        f"topk/ivf-{args.vectors}": lambda: ivf.search(query, 10),
+    }
+
+def serialize_cases(args):
+    cases = {}
+    for limit in (10, 100, 500):
+        rows = [tuple({"id": i + 1, **synthetic_tool(args.seed, i)}[field] for field in TOOL_FIELDS) for i in range(limit)]
+        cases[f"serialize/tools_json-{limit}"] = lambda rows = rows: tools_json(rows)
+    return cases
+
+def db_cases(args):
+    from backend.models import SessionLocal, Tool, Base, engine
+    from backend.search_backend import make_search_backend
+    from backend.serialization import TOOL_COLUMNS
+    from backend.benchmarks.synthetic_catalog import ensure_catalog
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    search_backend = make_search_backend(engine)
+    db = SessionLocal()
+    ensure_catalog(db, args.rows, args.seed)
+    middle = args.rows // 2
+    return {
+        "db/page-offset0": lambda: db.query(*TOOL_COLUMNS).order_by(Tool.id).limit(10).all(),
+        "db/page-offset-middle": lambda: db.query(*TOOL_COLUMNS).order_by(Tool.id).offset(middle).limit(10).all(),
+        "db/page-keyset-middle": lambda: db.query(*TOOL_COLUMNS).filter(Tool.id > middle).order_by(Tool.id).limit(10).all(),
+        "db/search-name": lambda: search_backend.search(db, name = "forecast", limit = 10),
+        "db/search-name-category": lambda: search_backend.search(db, name = "price", category = "finance", limit = 10),
+    }
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True).stdout.strip()
+    except OSError:
+        commit = None
+    database = os.getenv("DATABASE_URL", "")
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "json_encoder": "orjson" if orjson else "json",
+        "database": database.split(":", 1)[0] if "db" in args.groups else None, # dialect only, never credentials
+        "args": vars(args),
+    }
+
+def compare(results, path, threshold):
+    # median vs median; returns the names that got more than threshold slower
+    with open(path) as f:
+        baseline = json.load(f)["benchmarks"]
+    regressions = []
+    print(f"\n{'benchmark':<36}{'baseline ms':>13}{'now ms':>10}{'change':>9}")
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]["median_ms"], stats["median_ms"]
+        change = (now - before) / before if before else 0.0
+        flag = "  <- slower" if change > threshold else ""
+        print(f"{name:<36}{before:>13.3f}{now:>10.3f}{change:>+8.0%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = "Microbenchmarks for encoding, top-k, serialization and DB queries")
+    parser.add_argument("--groups", nargs = "+", choices = GROUPS, default = ["encode", "topk", "serialize"])
+    parser.add_argument("--rounds", type = int, default = 50)
+    parser.add_argument("--vectors", type = int, default = 100_000, help = "index size for topk")
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--rows", type = int, default = 100_000, help = "catalog size for db")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--output", help = "write results as JSON here")
+    parser.add_argument("--compare", help = "an earlier --output file to compare medians against")
+    parser.add_argument("--threshold", type = float, default = 0.10, help = "slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    builders = {"encode": encode_cases, "topk": topk_cases, "serialize": serialize_cases, "db": db_cases}
+    results = {}
+    print(f"{'benchmark':<36}{'median ms':>11}{'min ms':>10}{'stddev':>9}{'ops/s':>11}")
+    for group in args.groups:
+        for name, fn in builders[group](args).items():
+            stats = results[name] = summary(timed(fn, args.rounds, warmup = 3))
+            print(f"{name:<36}{stats['median_ms']:>11.3f}{stats['min_ms']:>10.3f}{stats['stddev_ms']:>9.3f}{stats['ops'] or 0:>11.0f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok = True)
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(args), "benchmarks": results}, f, indent = 2)
+        print(f"\nwrote {args.output}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            sys.exit(1) # so CI can fail the build
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import httpx
+from backend.benchmarks.timing import percentile
+
+# throughput and tail latency of the threadpool (DB_ASYNC=0) vs async (DB_ASYNC=1) database paths
+# starts a uvicorn server per mode against DATABASE_URL with the response cache off, so every request hits the DB
+#   DATABASE_URL=postgresql://... python -m backend.benchmarks.bench_db_modes --concurrency 50 200 --requests 4000
+# the gap is widest on a real Postgres with network latency; on a local SQLite file both modes are mostly CPU bound
+
+PATHS = ["/tools?limit=20", "/tools?limit=20&cursor=", "/tools/search?name=tool%20123&limit=10", "/tools/1"]
+
+
+async def worker(client, queue, latencies, errors):
+    while True:
+        try:
+            path = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+async def load(base_url, concurrency, requests):
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(PATHS[i % len(PATHS)])
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections = concurrency, max_keepalive_connections = concurrency)
+    async with httpx.AsyncClient(base_url = base_url, limits = limits, timeout = 60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, queue, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "errors": len(errors),
+    }
+
+def start_server(mode, port, workers):
+    env = {
+        **os.environ,
+        "DB_ASYNC": mode,
+        "CACHE_MAX_ENTRIES": "0", # measure the database path, not the response cache
+        "EMBEDDING_WARMUP": "lazy",
+        "SESSION_SECRET_KEY": os.getenv("SESSION_SECRET_KEY", "bench"),
+        "SQL_ECHO": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env = env, stdout = subprocess.DEVNULL,
+    )
+    for _ in range(300):
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout = 1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server didn't come up")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Threadpool vs async DB handlers under load")
+    parser.add_argument("--concurrency", type = int, nargs = "+", default = [50, 200])
+    parser.add_argument("--requests", type = int, default = 4000)
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--workers", type = int, default = 1)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, label in (("0", "threadpool"), ("1", "async")):
+        server = start_server(mode, args.port, args.workers)
+        try:
+            asyncio.run(load(f"http://127.0.0.1:{args.port}", 10, 200)) # warm up
+            for concurrency in args.concurrency:
+                result = asyncio.run(load(f"http://127.0.0.1:{args.port}", concurrency, args.requests))
+                print(f"{label:<10}{concurrency:>12}{result['rps']:>10.0f}{result['p50']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import json
+import resource
+from backend.models import SessionLocal, Tool, Base, engine
+from backend.export import export_chunks
+from backend.benchmarks.synthetic_catalog import ensure_catalog
+from backend.benchmarks.timing import stopwatch
+
+# /tools/export throughput and peak memory: the streamed export vs loading every Tool and dumping one big list
+# peak RSS only ever goes up, so the streamed run goes first and the naive one (--naive) after it
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_export --rows 1000000 --naive
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+
+def streamed(fmt, gzip):
+    size = 0
+    for chunk in export_chunks(fmt, gzip):
+        size += len(chunk)
+    return size
+
+def naive():
+    db = SessionLocal()
+    tools = db.query(Tool).order_by(Tool.id).all()
+    body = json.dumps([{"id": t.id, "name": t.name, "description": t.description, "category": t.category, "url": t.url} for t in tools])
+    db.close()
+    return len(body)
+
+def run(label, fn, rows):
+    before = peak_rss_mb()
+    size, elapsed = stopwatch(fn)
+    print(f"{label:<16}{rows / elapsed:>12.0f}{size / 1e6:>10.1f}{peak_rss_mb():>12.0f}{peak_rss_mb() - before:>12.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Streaming export vs materializing the catalog")
+    parser.add_argument("--rows", type = int, default = 1_000_000)
+    parser.add_argument("--naive", action = "store_true", help = "also time .all() + json.dumps (uses a lot of memory)")
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    ensure_catalog(db, args.rows)
+    rows = db.query(Tool).count()
+    db.close()
+
+    print(f"{rows} rows")
+    print(f"{'mode':<16}{'rows/s':>12}{'MB out':>10}{'peak MB':>12}{'+peak MB':>12}")
+    run("ndjson", lambda: streamed("ndjson", False), rows)
+    run("csv", lambda: streamed("csv", False), rows)
+    run("ndjson.gz", lambda: streamed("ndjson", True), rows)
+    if args.naive:
+        run("naive .all()", naive, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import time
+from sqlalchemy import text
+from backend.models import SessionLocal, Base, engine
+from backend.search_backend import make_search_backend
+from backend.facets import CategoryFacets, setup, group_by_counts, drift, _names
+from backend.benchmarks.synthetic_catalog import ensure_catalog, synthetic_tool
+from backend.ingest import upsert_statement
+from backend.benchmarks.timing import stopwatch, timed, percentile
+
+# /tools/facets on a big catalog: the maintained category counts vs GROUP BY category over every row
+#   reads    latency of the unscoped facet list both ways, and of a ?name= scoped one (a GROUP BY of the
+#            tools the search index matches, against the same over an ILIKE scan)
+#   writes   what the triggers add to a bulk load: --write-rows rows inserted with and without them, each
+#            in a transaction that is rolled back, so the catalog (and its counts) are left as they were
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_facets --rows 1000000
+
+
+def bulk_load(db, rows, batch_size, seed, triggers):
+    dialect = db.get_bind().dialect.name
+    if not triggers:
+        _, tools, _ = _names(engine)
+        for event in ("insert", "delete", "update"):
+            db.execute(text(f"DROP TRIGGER IF EXISTS tools_category_counts_{event}" + (f" ON {tools}" if dialect == "postgresql" else "")))
+    def load():
+        for offset in range(0, rows, batch_size):
+            batch = [synthetic_tool(seed, i) for i in range(offset, min(offset + batch_size, rows))]
+            db.execute(upsert_statement(dialect, batch, "nothing"))
+    _, seconds = stopwatch(load)
+    db.rollback()
+    if not triggers:
+        setup(engine) # pysqlite commits DDL on its own, so the rollback may not have brought the triggers back
+    return seconds
+
+def main():
+    parser = argparse.ArgumentParser(description = "Maintained category counts vs GROUP BY")
+    parser.add_argument("--rows", type = int, default = 1_000_000)
+    parser.add_argument("--repeat", type = int, default = 20)
+    parser.add_argument("--name", default = "open", help = "the ?name= scope to time")
+    parser.add_argument("--write-rows", type = int, default = 20_000)
+    parser.add_argument("--batch-size", type = int, default = 1000)
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    facets = CategoryFacets(engine, make_search_backend(engine)) # creates the triggers, so rows added below are counted as they go in
+    if not facets.maintained:
+        raise SystemExit("This database can't maintain category counts")
+    db = SessionLocal()
+    try:
+        ensure_catalog(db, args.rows)
+        wrong = drift(db)
+        print(f"{args.rows} rows, {len(facets.counts(db))} categories, {len(wrong)} counts off")
+
+        naive = timed(lambda: group_by_counts(db).all(), args.repeat)
+        maintained = timed(lambda: facets.counts(db), args.repeat)
+        scoped = timed(lambda: facets.counts(db, name = args.name), args.repeat)
+        scanned = timed(lambda: group_by_counts(db, name = args.name).all(), max(1, args.repeat // 4))
+        for label, times in (("GROUP BY every row", naive), ("maintained counts", maintained),
+                             (f"?name={args.name}, search index", scoped), (f"?name={args.name}, ILIKE scan", scanned)):
+            print(f"{label:<28} p50 {percentile(times, 0.5):8.2f} ms  p99 {percentile(times, 0.99):8.2f} ms")
+
+        # fresh urls, past anything ensure_catalog made, so every row is a real insert
+        seed = int(time.time())
+        # best of two each, alternating, so page cache warm-up doesn't land on one side
+        plain, counted = float("inf"), float("inf")
+        for _ in range(2):
+            plain = min(plain, bulk_load(db, args.write_rows, args.batch_size, seed, triggers = False))
+            counted = min(counted, bulk_load(db, args.write_rows, args.batch_size, seed, triggers = True))
+        print(f"bulk insert of {args.write_rows} rows: {args.write_rows / plain:.0f} rows/s without triggers, "
+              f"{args.write_rows / counted:.0f} rows/s with ({(counted / plain - 1) * 100:+.0f}%)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import numpy as np
+from backend.models import SessionLocal, Tool, Base, engine
+from backend.search_backend import make_search_backend
+from backend.serialization import TOOL_COLUMNS
+from backend.vector_index import FlatIndex
+from backend.hybrid_search import HybridSearch
+from backend.benchmarks.bench_vector_index import synthetic_vectors
+from backend.benchmarks.synthetic_catalog import ensure_catalog
+from backend.benchmarks.timing import timed, median
+
+# per-query latency of the ranking work behind each endpoint, on a synthetic catalog:
+#   ai_search        score every vector, fetch the top rows (today's full-table path)
+#   hybrid           lexical + semantic fused, no filter
+#   hybrid+category  the category filter picks the candidates first, so only their vectors are scored
+#   semantic+category  the same with lexical_weight=0: ai_search restricted to a category
+# the query vector is fixed and synthetic (encoding costs the same in every case and is left out);
+# vectors are synthetic too, so no model or embedding pass is needed
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_hybrid_search --rows 200000
+
+
+def fetch(db, ids):
+    return db.query(*TOOL_COLUMNS).filter(Tool.id.in_(ids)).all()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Full-table ai_search vs filtered hybrid search")
+    parser.add_argument("--rows", type = int, default = 200_000)
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--limit", type = int, default = 10)
+    parser.add_argument("--repeat", type = int, default = 30)
+    parser.add_argument("--q", default = "forecast")
+    parser.add_argument("--category", default = "weather")
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    search_backend = make_search_backend(engine)
+    db = SessionLocal()
+    ensure_catalog(db, args.rows)
+    ids = np.array([row.id for row in db.query(Tool.id).order_by(Tool.id)], dtype = np.int64)
+    vectors = synthetic_vectors(len(ids) + 1, args.dim, clusters = max(1, len(ids) // 20), seed = 0)
+    index = FlatIndex(args.dim)
+    index.add(ids, vectors[:-1])
+    query = vectors[-1]
+    hybrid = HybridSearch(search_backend, index)
+    candidates = len(search_backend.filter_ids(db, category = args.category))
+
+    cases = {
+        "ai_search": lambda: fetch(db, [tool_id for tool_id, _ in index.search(query, args.limit)]),
+        "hybrid": lambda: fetch(db, [tool_id for tool_id, _ in hybrid.search(db, args.q, query, limit = args.limit)]),
+        "hybrid+category": lambda: fetch(db, [tool_id for tool_id, _ in hybrid.search(db, args.q, query, category = args.category, limit = args.limit)]),
+        "semantic+category": lambda: fetch(db, [tool_id for tool_id, _ in hybrid.search(db, args.q, query, category = args.category, limit = args.limit, lexical_weight = 0)]),
+    }
+    print(f"catalog: {len(ids)} tools; category {args.category!r} has {candidates} candidates; median of {args.repeat}")
+    print(f"{'case':<20}{'ms':>10}")
+    for name, fn in cases.items():
+        print(f"{name:<20}{median(timed(fn, args.repeat)):>10.2f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import json
+import subprocess
+import sys
+
+# startup time + memory for each EMBEDDING_BACKEND
+# every backend is measured in a fresh interpreter so imports and RSS aren't shared
+# run from the repo root:
+#   python -m backend.benchmarks.bench_model_startup --backends torch quantized onnx
+
+PROBE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import backend.embeddings as embeddings
+t1 = time.perf_counter()
+model = embeddings.load_model(sys.argv[1])
+t2 = time.perf_counter()
+model.encode(["warm up"])
+t3 = time.perf_counter()
+texts = ["a public api for weather forecasts and historical climate data"] * 256
+model.encode(texts, batch_size = 64)
+t4 = time.perf_counter()
+single = time.perf_counter()
+for _ in range(50):
+    model.encode("find me a payments api")
+single = (time.perf_counter() - single) / 50
+print(json.dumps({
+    "import_s": t1 - t0,
+    "load_s": t2 - t1,
+    "first_encode_s": t3 - t2,
+    "batch_texts_per_s": len(texts) / (t4 - t3),
+    "single_query_ms": single * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # ru_maxrss is KB on Linux
+}))
+"""
+
+
+def measure(backend):
+    result = subprocess.run([sys.executable, "-c", PROBE, backend], capture_output = True, text = True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description = "Startup time and RSS per embedding backend")
+    parser.add_argument("--backends", nargs = "+", default = ["torch", "quantized", "onnx"])
+    args = parser.parse_args()
+
+    print(f"{'backend':<11}{'import s':>10}{'load s':>9}{'1st enc s':>11}{'texts/s':>10}{'query ms':>10}{'peak MB':>9}")
+    for backend in args.backends:
+        stats = measure(backend)
+        if "error" in stats:
+            print(f"{backend:<11} {stats['error']}")
+            continue
+        print(
+            f"{backend:<11}{stats['import_s']:>10.2f}{stats['load_s']:>9.2f}{stats['first_encode_s']:>11.2f}"
+            f"{stats['batch_texts_per_s']:>10.0f}{stats['single_query_ms']:>10.1f}{stats['peak_rss_mb']:>9.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
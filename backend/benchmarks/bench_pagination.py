@@ -0,0 +1,45 @@
+import argparse
+from backend.models import SessionLocal, Tool, Base, engine
+from backend.search_backend import make_search_backend
+from backend.benchmarks.synthetic_catalog import ensure_catalog
+from backend.benchmarks.timing import timed, median
+
+# page-N latency for OFFSET vs keyset (cursor) pagination, for /tools and /tools/search
+# uses whatever DATABASE_URL points at, and tops the tools table up with synthetic rows first:
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_pagination --rows 200000 --page 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "OFFSET vs keyset pagination")
+    parser.add_argument("--rows", type = int, default = 200_000)
+    parser.add_argument("--page", type = int, default = 1000, help = "1-based page number to fetch")
+    parser.add_argument("--limit", type = int, default = 10)
+    parser.add_argument("--repeat", type = int, default = 20)
+    parser.add_argument("--name", default = "api", help = "search term for the /tools/search case (needs page * limit matches)")
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    search = make_search_backend(engine)
+    db = SessionLocal()
+    ensure_catalog(db, args.rows)
+    skip = (args.page - 1) * args.limit
+
+    # the cursor a client would hold after paging through page-1 pages
+    last_id = db.query(Tool.id).order_by(Tool.id).offset(skip - 1).limit(1).scalar() if skip else 0
+    list_offset = median(timed(lambda: db.query(Tool).order_by(Tool.id).offset(skip).limit(args.limit).all(), args.repeat))
+    list_keyset = median(timed(lambda: db.query(Tool).filter(Tool.id > last_id).order_by(Tool.id).limit(args.limit).all(), args.repeat))
+
+    previous = search.search(db, name = args.name, skip = skip - 1, limit = 1) if skip else []
+    after = (previous[0][1], previous[0][0]) if previous else None
+    search_offset = median(timed(lambda: search.search(db, name = args.name, skip = skip, limit = args.limit), args.repeat))
+    search_keyset = median(timed(lambda: search.search(db, name = args.name, limit = args.limit, after = after), args.repeat))
+    db.close()
+
+    print(f"{args.rows} rows, page {args.page} of {args.limit} ({search.name} search backend), median of {args.repeat}")
+    print(f"{'endpoint':<16}{'offset ms':>12}{'cursor ms':>12}")
+    print(f"{'/tools':<16}{list_offset:>12.2f}{list_keyset:>12.2f}")
+    print(f"{'/tools/search':<16}{search_offset:>12.2f}{search_keyset:>12.2f}")
+
+if __name__ == "__main__":
+    main()
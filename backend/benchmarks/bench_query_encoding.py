@@ -0,0 +1,49 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from backend.embeddings import encode_texts
+from backend.inference import BatchEncoder
+from backend.benchmarks.timing import stopwatch
+
+# queries/sec for query encoding: every thread calling the model itself (what ai_search used to do)
+# vs. the micro-batching BatchEncoder, at a few concurrency levels
+# run from the repo root:
+#   python -m backend.benchmarks.bench_query_encoding --concurrency 1 8 32 --requests 512
+
+WORDS = "weather maps music payments email crypto sports news jobs books movies translation".split()
+
+
+def make_queries(n):
+    # distinct queries so the in-batch dedupe doesn't flatter the batched numbers
+    return [f"{WORDS[i % len(WORDS)]} api {i}" for i in range(n)]
+
+def run(fn, queries, concurrency):
+    with ThreadPoolExecutor(concurrency) as pool:
+        _, seconds = stopwatch(lambda: list(pool.map(fn, queries)))
+    return len(queries) / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description = "Per-request vs micro-batched query encoding")
+    parser.add_argument("--requests", type = int, default = 512)
+    parser.add_argument("--concurrency", type = int, nargs = "+", default = [1, 4, 16, 64])
+    parser.add_argument("--max-batch", type = int, default = 32)
+    parser.add_argument("--max-wait-ms", type = float, default = 5)
+    args = parser.parse_args()
+
+    queries = make_queries(args.requests)
+    encode_texts(queries[:8]) # warm the model up so neither side pays for it
+
+    encoder = BatchEncoder(encode_texts, max_batch = args.max_batch, max_wait_ms = args.max_wait_ms,
+                           queue_size = args.requests)
+    encoder.start()
+    print(f"{'concurrency':>12}{'per-request q/s':>18}{'batched q/s':>14}{'avg batch':>11}")
+    for concurrency in args.concurrency:
+        direct = run(lambda q: encode_texts([q])[0], queries, concurrency)
+        before = encoder.metrics()
+        batched = run(encoder.encode, queries, concurrency)
+        after = encoder.metrics()
+        avg_batch = (after["items"] - before["items"]) / max(after["batches"] - before["batches"], 1)
+        print(f"{concurrency:>12}{direct:>18.1f}{batched:>14.1f}{avg_batch:>11.1f}")
+    encoder.stop()
+
+if __name__ == "__main__":
+    main()
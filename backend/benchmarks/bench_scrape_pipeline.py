@@ -0,0 +1,48 @@
+import argparse
+import os
+import tempfile
+import time
+from backend.models import SessionLocal, Base, engine
+from backend.llm import StubClient
+from backend.scrape_public_apis import run_pipeline
+from backend.benchmarks.timing import stopwatch
+
+# scrape pipeline throughput against a synthetic README and the stub LLM (no network, no API key)
+# every row without a description costs one stub call of --latency seconds, so this mostly measures
+# how well the enrich stage overlaps them
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_scrape_pipeline --rows 500 --concurrency 1 8 32
+
+
+def write_readme(path, rows, prefix):
+    with open(path, "w", encoding = "utf-8") as f:
+        f.write("| API | Description | Auth | HTTPS | CORS |\n|---|---|---|---|---|\n")
+        for i in range(rows):
+            description = f"Synthetic api {i}" if i % 2 else "" # half the rows need the LLM
+            f.write(f"| [{prefix} {i}](https://{prefix}.bench.example/{i}) | {description} | `apiKey` | Yes | No |\n")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Scrape pipeline throughput with a stub LLM")
+    parser.add_argument("--rows", type = int, default = 500)
+    parser.add_argument("--latency", type = float, default = 0.05, help = "seconds per stub LLM call")
+    parser.add_argument("--concurrency", type = int, nargs = "+", default = [1, 8, 32])
+    parser.add_argument("--batch-size", type = int, default = 100)
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    run = int(time.time())
+    print(f"{args.rows} rows, {args.latency * 1000:.0f} ms per LLM call")
+    print(f"{'concurrency':<14}{'written':>10}{'seconds':>10}{'rows/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrency in args.concurrency:
+            prefix = f"scrape{run}c{concurrency}"
+            path = os.path.join(tmp, prefix + ".md")
+            write_readme(path, args.rows, prefix)
+            # url-only dedup: the synthetic rows differ only by a number, so text matching would (rightly) drop them
+            written, elapsed = stopwatch(lambda: run_pipeline(db, path, StubClient(args.latency), concurrency, args.batch_size, checkpoint_path = None, dedup = "url"))
+            print(f"{concurrency:<14}{written:>10}{elapsed:>10.2f}{args.rows / elapsed:>10.0f}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import functools
+import http.server
+import os
+import random
+import tempfile
+import threading
+import time
+from backend.models import SessionLocal, Base, engine, Tool
+from backend.llm import StubClient
+from backend.scrape_public_apis import run_pipeline, sync_source
+from backend.benchmarks.bench_scrape_pipeline import write_readme
+from backend.benchmarks.timing import stopwatch
+
+# full rescrape vs incremental sync of a synthetic README served over local HTTP (no network, stub LLM)
+#   first sync   after a full scrape: every row is matched to the tool it already became, no LLM calls
+#   unchanged    the server answers the conditional request with 304, nothing is read
+#   edited       --changes of the rows are edited, as many added and as many removed; the sync writes
+#                only those, while a full rerun re-reads everything (and still misses the edits and removals)
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_scrape_sync --rows 2000 --changes 0.01
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    # SimpleHTTPRequestHandler already answers If-Modified-Since with a 304
+    def log_message(self, *args):
+        pass
+
+def serve(directory):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory = directory))
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
+
+def edit_readme(path, changes, prefix, seed):
+    rng = random.Random(seed)
+    with open(path, encoding = "utf-8") as f:
+        lines = f.readlines()
+    header, rows = lines[:2], lines[2:]
+    count = max(1, int(len(rows) * changes))
+    picked = rng.sample(range(len(rows)), 2 * count)
+    for i in picked[:count]:
+        columns = rows[i].split("|")
+        columns[2] = f" Edited description {i} "
+        rows[i] = "|".join(columns)
+    removed = set(picked[count:])
+    rows = [row for i, row in enumerate(rows) if i not in removed]
+    rows += [f"| [{prefix} new {i}](https://{prefix}.bench.example/new/{i}) |  | `apiKey` | Yes | No |\n" for i in range(count)]
+    with open(path, "w", encoding = "utf-8") as f:
+        f.writelines(header + rows)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 2)) # Last-Modified has 1s resolution
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description = "Full rescrape vs incremental sync")
+    parser.add_argument("--rows", type = int, default = 2000)
+    parser.add_argument("--changes", type = float, default = 0.01, help = "fraction of rows edited (and added, and removed)")
+    parser.add_argument("--latency", type = float, default = 0.05, help = "seconds per stub LLM call")
+    parser.add_argument("--concurrency", type = int, default = 8)
+    parser.add_argument("--batch-size", type = int, default = 100)
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    prefix = f"sync{int(time.time())}"
+    with tempfile.TemporaryDirectory() as tmp:
+        write_readme(os.path.join(tmp, "README.md"), args.rows, prefix)
+        server = serve(tmp)
+        url = f"http://127.0.0.1:{server.server_port}/README.md"
+        client = StubClient(args.latency)
+
+        def full():
+            return run_pipeline(db, url, client, args.concurrency, args.batch_size, checkpoint_path = None, dedup = "url")
+
+        def sync():
+            return sync_source(db, url, client, args.concurrency, args.batch_size)
+
+        print(f"{args.rows} rows, {args.latency * 1000:.0f} ms per LLM call")
+        print(f"{'run':<26}{'seconds':>10}{'llm calls':>11}  result")
+        for name, fn in (("full scrape", full), ("first sync", sync), ("sync, unchanged", sync)):
+            calls = client.calls
+            result, seconds = stopwatch(fn)
+            print(f"{name:<26}{seconds:>10.2f}{client.calls - calls:>11}  {result}")
+        changed = edit_readme(os.path.join(tmp, "README.md"), args.changes, prefix, seed = 0)
+        calls = client.calls
+        result, seconds = stopwatch(sync)
+        edited = db.query(Tool).filter(Tool.url.like(f"https://{prefix}.%"), Tool.description.like("Edited%")).count()
+        print(f"{f'sync, {changed} x3 changes':<26}{seconds:>10.2f}{client.calls - calls:>11}  {result}, {edited} edits visible")
+        calls = client.calls
+        result, seconds = stopwatch(full)
+        print(f"{'full rerun':<26}{seconds:>10.2f}{client.calls - calls:>11}  {result} written")
+        server.shutdown()
+    db.close()
+
+if __name__ == "__main__":
+    main()
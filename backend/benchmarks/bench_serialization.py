@@ -0,0 +1,47 @@
+import argparse
+import json
+from fastapi.encoders import jsonable_encoder
+from backend.models import SessionLocal, Tool, Base, engine
+from backend.schemas import ToolResponse
+from backend.serialization import TOOL_COLUMNS, tools_json, orjson
+from backend.benchmarks.synthetic_catalog import ensure_catalog
+from backend.benchmarks.timing import timed, median
+
+# per-request cost of building a /tools page body
+#   orm      load Tool objects, validate each through ToolResponse (from_attributes) and encode, as response_model does
+#   columns  select the response columns as row tuples and encode with serialization.tools_json (orjson if installed)
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_serialization --limits 10 100 500
+
+
+def from_orm(tool):
+    return ToolResponse.model_validate(tool)
+
+def orm_page(db, limit):
+    tools = db.query(Tool).order_by(Tool.id).limit(limit).all()
+    return json.dumps(jsonable_encoder([from_orm(tool) for tool in tools])).encode("utf-8")
+
+def columns_page(db, limit):
+    return tools_json(db.query(*TOOL_COLUMNS).order_by(Tool.id).limit(limit).all())
+
+def main():
+    parser = argparse.ArgumentParser(description = "ORM + ToolResponse vs column rows + fast JSON")
+    parser.add_argument("--limits", type = int, nargs = "+", default = [10, 100, 500])
+    parser.add_argument("--repeat", type = int, default = 50)
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    ensure_catalog(db, max(args.limits))
+    assert json.loads(orm_page(db, 5)) == json.loads(columns_page(db, 5)) # same contract
+
+    print(f"encoder: {'orjson' if orjson else 'json'}; median of {args.repeat}")
+    print(f"{'limit':<8}{'orm ms':>10}{'columns ms':>12}{'speedup':>10}")
+    for limit in args.limits:
+        orm = median(timed(lambda: (orm_page(db, limit), db.expunge_all()), args.repeat))
+        columns = median(timed(lambda: columns_page(db, limit), args.repeat))
+        print(f"{limit:<8}{orm:>10.2f}{columns:>12.2f}{orm / columns:>9.1f}x")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import random
+import tracemalloc
+from backend.suggest import SuggestIndex, _Snapshot, normalize
+from backend.benchmarks.synthetic_catalog import synthetic_tool
+from backend.benchmarks.timing import stopwatch, timed_each, percentile
+
+# /tools/suggest's prefix index on a synthetic catalog, in memory (no DB, no server):
+#   build      time and memory to pack every name into the snapshot
+#   suggest    latency of one lookup for prefixes people actually type (1-8 leading characters of a
+#              random name's first or a later word), against a linear scan of every name for the same answer
+#   python -m backend.benchmarks.bench_suggest --rows 1000000 --memory
+
+
+def scan(names, prefix, limit):
+    # what answering without an index costs: normalize-and-check every name
+    key = normalize(prefix)
+    found = []
+    for tool_id, name, _ in names:
+        name_key = normalize(name)
+        if name_key.startswith(key) or (" " + key) in name_key:
+            found.append((not name_key.startswith(key), len(name_key), tool_id))
+    return sorted(found)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Prefix-index typeahead vs scanning every name")
+    parser.add_argument("--rows", type = int, default = 1_000_000)
+    parser.add_argument("--queries", type = int, default = 5000)
+    parser.add_argument("--limit", type = int, default = 10)
+    parser.add_argument("--scan-queries", type = int, default = 5, help = "the scan is slow; only time a few")
+    parser.add_argument("--memory", action = "store_true", help = "also measure peak memory during the build")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    rows = []
+    for i in range(args.rows):
+        tool = synthetic_tool(args.seed, i)
+        rows.append((i + 1, tool["name"], tool["category"]))
+
+    snapshot, build_seconds = stopwatch(lambda: _Snapshot(rows))
+    peak = None
+    if args.memory:
+        tracemalloc.start() # slows the build down a lot, so it's a second, separate build
+        _Snapshot(rows)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    size = sum(a.nbytes for a in (snapshot.ids, snapshot.name_offsets, snapshot.category_of, snapshot.name_index.offsets,
+                                  snapshot.name_index.starts, snapshot.name_index.order))
+    size += len(snapshot.names) + len(snapshot.name_index.blob)
+    print(f"{len(rows)} names, {len(snapshot.name_index)} word entries, {len(snapshot.name_index.top)} precomputed prefixes")
+    print(f"build: {build_seconds:.1f}s, {size / 2 ** 20:.0f} MB resident" + (f" ({peak / 2 ** 20:.0f} MB peak while building)" if peak else ""))
+
+    index = SuggestIndex()
+    index._snapshot = snapshot
+    rng = random.Random(args.seed)
+    prefixes = []
+    for _ in range(args.queries):
+        words = normalize(rng.choice(rows)[1]).split()
+        prefixes.append(rng.choice(words)[:rng.randint(1, 8)])
+    for length in (1, 2, 3, 5, 8):
+        group = [prefix for prefix in prefixes if len(prefix) == length or (length == 8 and len(prefix) > 5)]
+        if group:
+            _, times = timed_each(lambda prefix: index.suggest(prefix, args.limit), group)
+            times = [ms * 1000 for ms in times] # lookups are microseconds
+            print(f"suggest, {length} chars{'+' if length == 8 else ''}: p50 {percentile(times, 0.5):.0f}us  p99 {percentile(times, 0.99):.0f}us  ({len(times)} queries)")
+
+    _, seconds = stopwatch(lambda: [scan(rows, prefix, args.limit) for prefix in prefixes[:args.scan_queries]])
+    print(f"linear scan of every name: {seconds / args.scan_queries * 1000:.0f} ms per query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import insert
+from backend.models import SessionLocal, Tool, Base, engine
+from backend.benchmarks.fake_llm_server import serve
+from backend import update_descriptions as job
+
+# description backfill against the local fake LLM server: throughput, cache reuse and retries on 429s
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.bench_update_descriptions --rows 400 --duplicates 4
+
+
+def seed(db, rows, duplicates, prefix):
+    # every `duplicates` rows share a name, so the dedupe/cache has something to do
+    db.execute(insert(Tool), [
+        {"name": f"{prefix} api {i // duplicates}", "description": job.PLACEHOLDER, "category": "Public APIs", "url": f"https://{prefix}.bench.example/{i}"}
+        for i in range(rows)
+    ])
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description = "update_descriptions against a fake LLM")
+    parser.add_argument("--rows", type = int, default = 400)
+    parser.add_argument("--duplicates", type = int, default = 4)
+    parser.add_argument("--latency", type = float, default = 0.1)
+    parser.add_argument("--error-rate", type = float, default = 0.05)
+    parser.add_argument("--concurrency", type = int, default = 16)
+    parser.add_argument("--port", type = int, default = 8089)
+    args = parser.parse_args()
+
+    server, fake = serve(args.port, args.latency, args.error_rate)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    seed(db, args.rows, args.duplicates, f"describe{int(time.time())}")
+    db.close()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "descriptions.sqlite")
+        first = job.update_descriptions("openai", args.concurrency, cache_path = cache, embed = False)
+    server.shutdown()
+    print(f"fake server saw {fake.requests} requests, {fake.rejected} answered 429")
+    print(f"{first['rows']} rows, {first['generated']} generated, {first['cache_hits']} cache hits, {first['retries']} retries, {first['rows_per_second']} rows/s")
+
+if __name__ == "__main__":
+    main()
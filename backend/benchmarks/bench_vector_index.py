@@ -0,0 +1,75 @@
+import argparse
+import os
+import tempfile
+import statistics
+import numpy as np
+from backend.vector_index import FlatIndex, IVFIndex, load_index
+from backend.benchmarks.timing import stopwatch, timed_each, percentile
+
+# recall-vs-latency benchmark: IVF at several nprobe settings against the exact flat index
+# run from the repo root:
+#   python -m backend.benchmarks.bench_vector_index --n 200000 --nprobe 1 2 4 8 16 32
+# vectors are synthetic (gaussian clusters, normalized) so it runs without a DB or model
+
+
+def synthetic_vectors(n, dim, clusters, seed):
+    # real sentence embeddings are clumpy, so uniform random vectors would flatter nothing;
+    # clustered data is a fairer stand-in
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    data = centers[labels] + 1.0 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis = 1, keepdims = True)
+
+def timed_search(index, queries, top_k, **kwargs):
+    # one query at a time, like the endpoint does; returns (results, per-query latencies in ms)
+    return timed_each(lambda query: index.search_batch(query[None, :], top_k, **kwargs)[0], queries)
+
+def latency_columns(ms):
+    return f"{statistics.fmean(ms):>10.2f}{percentile(ms, 0.5):>10.2f}{percentile(ms, 0.99):>10.2f}"
+
+def recall(truth, results):
+    hits = sum(len({i for i, _ in t} & {i for i, _ in r}) for t, r in zip(truth, results))
+    return hits / sum(len(t) for t in truth)
+
+def main():
+    parser = argparse.ArgumentParser(description = "IVF vs flat recall/latency benchmark")
+    parser.add_argument("--n", type = int, default = 100_000, help = "catalog size")
+    parser.add_argument("--dim", type = int, default = 384, help = "all-MiniLM-L6-v2 is 384")
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("--top-k", type = int, default = 10)
+    parser.add_argument("--nlist", type = int, default = 0, help = "0 = sqrt(n)")
+    parser.add_argument("--nprobe", type = int, nargs = "+", default = [1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    data = synthetic_vectors(args.n + args.queries, args.dim, clusters = max(1, args.n // 20), seed = args.seed)
+    vectors, queries = data[:args.n], data[args.n:]
+    ids = np.arange(1, args.n + 1)
+
+    flat = FlatIndex(args.dim)
+    _, seconds = stopwatch(lambda: flat.add(ids, vectors))
+    print(f"flat build: {seconds:.2f}s")
+
+    ivf = IVFIndex(args.dim, nlist = args.nlist or None)
+    _, seconds = stopwatch(lambda: (ivf.add(ids, vectors), ivf.train()))
+    print(f"ivf build (nlist={len(ivf.centroids)}): {seconds:.2f}s")
+
+    truth, flat_ms = timed_search(flat, queries, args.top_k)
+    print()
+    print(f"{'backend':<16}{'recall@' + str(args.top_k):>12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'flat':<16}{1.0:>12.3f}{latency_columns(flat_ms)}")
+    for nprobe in args.nprobe:
+        results, ms = timed_search(ivf, queries, args.top_k, nprobe = nprobe)
+        label = f"ivf nprobe={nprobe}"
+        print(f"{label:<16}{recall(truth, results):>12.3f}{latency_columns(ms)}")
+
+    # save/load round trip (what VECTOR_INDEX_PATH does on restart)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tools.npz")
+        _, saved = stopwatch(lambda: ivf.save(path))
+        loaded, seconds = stopwatch(lambda: load_index(path))
+        print(f"\nivf save {saved:.2f}s, load {seconds:.2f}s, {len(loaded)} vectors")
+
+if __name__ == "__main__":
+    main()
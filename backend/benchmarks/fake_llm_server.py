@@ -0,0 +1,83 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# a local stand-in for the OpenAI chat completions API, for running the ingest scripts and
+# benchmarks without a key or network; it can be slow and answer 429 like the real thing
+#   python -m backend.benchmarks.fake_llm_server --port 8089 --latency 0.3 --error-rate 0.05
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python update_descriptions.py
+
+
+class FakeLLM:
+    def __init__(self, latency, error_rate):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with fake._lock:
+                fake.requests += 1
+                reject = random.random() < fake.error_rate
+                fake.rejected += reject
+            if reject:
+                self._reply(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+                return
+            time.sleep(fake.latency)
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            self._reply(200, {
+                "id": f"chatcmpl-fake{fake.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": f"Fake description for: {prompt[-60:]}"}}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 12, "total_tokens": len(prompt) // 4 + 12},
+            })
+
+        def _reply(self, status, payload, headers = None):
+            raw = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, *args):
+            pass # quiet
+
+    return Handler
+
+def serve(port = 8089, latency = 0.3, error_rate = 0.0):
+    """ Starts the server in a background thread; returns (server, fake) """
+    fake = FakeLLM(latency, error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(fake))
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server, fake
+
+def main():
+    parser = argparse.ArgumentParser(description = "Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type = int, default = 8089)
+    parser.add_argument("--latency", type = float, default = 0.3)
+    parser.add_argument("--error-rate", type = float, default = 0.0, help = "fraction of requests answered with 429")
+    args = parser.parse_args()
+    server, _ = serve(args.port, args.latency, args.error_rate)
+    print(f"Fake LLM listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
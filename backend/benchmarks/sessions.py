@@ -0,0 +1,15 @@
+import json
+from base64 import b64encode
+import itsdangerous
+
+# signed session cookies for load tests: lets a simulated user be "logged in" as any user id without
+# going through Google, by signing the session exactly like starlette's SessionMiddleware does
+# (so it only works with the server's own SESSION_SECRET_KEY)
+
+SESSION_COOKIE = "session"
+
+
+def session_cookie(secret_key, session):
+    """ The value of the session cookie for a session dict, e.g. {"user_id": 42} """
+    data = b64encode(json.dumps(session).encode("utf-8"))
+    return itsdangerous.TimestampSigner(str(secret_key)).sign(data).decode("utf-8")
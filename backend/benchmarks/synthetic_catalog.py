@@ -0,0 +1,140 @@
+import argparse
+import random
+import time
+from sqlalchemy import func
+from backend.models import SessionLocal, Tool, User, Base, engine, dialect_insert
+from backend.ingest import upsert_statement
+from backend.cache import bump_catalog_version
+
+# a realistic-looking tools catalog of any size (tested up to 1M rows) for load tests and benchmarks
+# names, descriptions and categories are built from public-apis style vocabulary, so keyword search,
+# trigram indexes and embeddings see text with a plausible spread instead of "bench tool 123"
+# row i only depends on (seed, i), so the same --rows/--seed gives the same catalog on SQLite and Postgres,
+# and re-running tops up the table instead of duplicating it (conflicts on url are skipped)
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.synthetic_catalog --rows 100000
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.synthetic_catalog --rows 100000 --embed
+# --users N also adds N users (load-user-<i>@load.example) for authenticated load tests
+
+CATEGORIES = (
+    "Animals", "Anime", "Art & Design", "Authentication", "Blockchain", "Books", "Business", "Calendar",
+    "Cloud Storage", "Cryptocurrency", "Currency Exchange", "Data Validation", "Development", "Dictionaries",
+    "Documents & Productivity", "Email", "Entertainment", "Environment", "Finance", "Food & Drink", "Games & Comics",
+    "Geocoding", "Government", "Health", "Jobs", "Machine Learning", "Music", "News", "Open Data", "Photography",
+    "Science & Math", "Security", "Shopping", "Social", "Sports & Fitness", "Transportation", "Video", "Weather",
+)
+# per-category subjects, so "Weather" tools talk about forecasts and "Music" tools about tracks
+SUBJECTS = {
+    "Animals": ("dog breed", "cat fact", "bird sighting", "pet adoption"), "Anime": ("anime title", "manga chapter", "character quote"),
+    "Art & Design": ("color palette", "icon", "artwork", "font"), "Authentication": ("login", "OAuth token", "user identity", "2FA code"),
+    "Blockchain": ("block", "smart contract", "wallet", "transaction"), "Books": ("book", "author", "ISBN", "library record"),
+    "Business": ("company", "invoice", "lead", "tax rate"), "Calendar": ("holiday", "event", "time zone", "working day"),
+    "Cloud Storage": ("file", "bucket", "upload", "share link"), "Cryptocurrency": ("coin price", "exchange rate", "market cap", "order book"),
+    "Currency Exchange": ("exchange rate", "currency", "conversion"), "Data Validation": ("email address", "phone number", "VAT number", "IBAN"),
+    "Development": ("repository", "build", "package", "code snippet"), "Dictionaries": ("word", "definition", "synonym", "translation"),
+    "Documents & Productivity": ("PDF", "spreadsheet", "note", "task"), "Email": ("mailbox", "email", "newsletter", "bounce"),
+    "Entertainment": ("joke", "meme", "trivia question", "quote"), "Environment": ("air quality", "carbon footprint", "pollen count"),
+    "Finance": ("stock quote", "bank transaction", "credit score", "portfolio"), "Food & Drink": ("recipe", "restaurant", "cocktail", "nutrition fact"),
+    "Games & Comics": ("game", "comic", "player stat", "leaderboard"), "Geocoding": ("address", "coordinate", "postal code", "IP location"),
+    "Government": ("census record", "election result", "public dataset", "regulation"), "Health": ("drug label", "symptom", "clinical trial", "hospital"),
+    "Jobs": ("job posting", "salary", "resume", "company review"), "Machine Learning": ("model", "prediction", "sentiment score", "image label"),
+    "Music": ("track", "album", "artist", "lyric"), "News": ("headline", "article", "news source", "trending story"),
+    "Open Data": ("dataset", "statistic", "open record"), "Photography": ("photo", "image", "stock picture", "EXIF tag"),
+    "Science & Math": ("equation", "constant", "satellite", "element"), "Security": ("vulnerability", "malware hash", "SSL certificate", "breach"),
+    "Shopping": ("product", "price", "coupon", "review"), "Social": ("post", "profile", "follower", "hashtag"),
+    "Sports & Fitness": ("match score", "team", "workout", "league table"), "Transportation": ("bus route", "flight", "train departure", "parking spot"),
+    "Video": ("video", "movie", "TV show", "subtitle"), "Weather": ("forecast", "temperature", "storm alert", "sunrise time"),
+}
+PREFIXES = ("Open", "Free", "Rapid", "Smart", "Global", "Simple", "Cloud", "Hyper", "Quick", "Easy", "Data", "Meta", "Micro", "Super", "True")
+SUFFIXES = ("API", "Hub", "Base", "Kit", "Stack", "ly", "ify", "io", "DB", "Lab", "Cloud", "Feed", "Box", "Now", "Pro")
+VERBS = ("Search", "Look up", "Fetch", "Track", "Convert", "Validate", "Stream", "Generate", "Analyze", "Browse", "Monitor", "Translate")
+QUALIFIERS = ("in real time", "by keyword", "with pagination", "from public sources", "for any country", "with historical data",
+              "in JSON", "via REST", "with webhooks", "for free", "without an API key", "at scale")
+AUTH = ("No auth required.", "Requires an API key.", "Uses OAuth.", "Free tier with an API key.")
+
+
+def synthetic_tool(seed, i):
+    """ Row i of the catalog for this seed, as a tools row dict """
+    rng = random.Random(seed * 1_000_003 + i)
+    category = CATEGORIES[rng.randrange(len(CATEGORIES))]
+    subject = rng.choice(SUBJECTS[category])
+    stem = subject.split()[-1].capitalize()
+    name = f"{rng.choice(PREFIXES)}{stem}{rng.choice(SUFFIXES)}"
+    if rng.random() < 0.3:
+        name = f"{name} {rng.choice(('v2', 'Lite', 'Plus', 'Open', 'EU', 'US'))}"
+    sentences = [f"{rng.choice(VERBS)} {subject}s {rng.choice(QUALIFIERS)}."]
+    if rng.random() < 0.6:
+        other = rng.choice(SUBJECTS[category])
+        sentences.append(f"Also returns {other} data {rng.choice(QUALIFIERS)}.")
+    sentences.append(rng.choice(AUTH))
+    slug = name.lower().replace(" ", "-")
+    return {
+        "name": name,
+        # a slice of tools keep the scraper placeholder, like a real catalog mid-backfill
+        "description": "Scraped from public-apis list" if rng.random() < 0.05 else " ".join(sentences),
+        "category": category,
+        "url": f"https://{slug}.example.com/{seed}/{i}", # unique per (seed, i)
+    }
+
+def generate(db, rows, seed = 0, batch_size = 1000, start = 0, progress = True):
+    """ Insert rows start..rows-1 (skipping urls already present); returns how many were new """
+    dialect = db.get_bind().dialect.name
+    inserted, batch = 0, []
+    began = time.perf_counter()
+    for i in range(start, rows):
+        batch.append(synthetic_tool(seed, i))
+        if len(batch) == batch_size or i == rows - 1:
+            inserted += len(db.execute(upsert_statement(dialect, batch, "nothing")).all())
+            db.commit()
+            batch = []
+            if progress and (i + 1) % (batch_size * 50) == 0:
+                print(f"  {i + 1}/{rows} ({(i + 1 - start) / (time.perf_counter() - began):.0f} rows/s)")
+    return inserted
+
+def ensure_catalog(db, rows, seed = 0, batch_size = 1000, progress = True):
+    """ Top the tools table up to at least `rows` rows; cheap when it is already big enough """
+    have = db.query(func.count(Tool.id)).scalar()
+    if have >= rows:
+        return 0
+    # rows are numbered from the current count, so topping up 10k -> 100k only generates the new 90k
+    inserted = generate(db, rows, seed, batch_size, start = have, progress = progress)
+    bump_catalog_version(db)
+    return inserted
+
+def ensure_users(db, count, batch_size = 1000):
+    """ Top the users table up to at least `count` users; on an empty table their ids are 1..count """
+    have = db.query(func.count(User.id)).scalar()
+    insert = dialect_insert(db.get_bind().dialect.name)
+    for start in range(have, count, batch_size):
+        rows = [{"email": f"load-user-{i}@load.example", "name": f"Load User {i}", "picture": None} for i in range(start, min(start + batch_size, count))]
+        db.execute(insert(User).values(rows).on_conflict_do_nothing(index_elements = ["email"]))
+        db.commit()
+    return max(0, count - have)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Generate a synthetic tools catalog")
+    parser.add_argument("--rows", type = int, default = 100_000, help = "target catalog size (up to ~1M)")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--batch-size", type = int, default = 1000)
+    parser.add_argument("--users", type = int, default = 0, help = "also make sure this many users exist")
+    parser.add_argument("--embed", action = "store_true", help = "also compute embeddings so ai_search works (slow on CPU)")
+    args = parser.parse_args()
+
+    engine.echo = False
+    Base.metadata.create_all(bind = engine)
+    db = SessionLocal()
+    start = time.perf_counter()
+    inserted = ensure_catalog(db, args.rows, args.seed, args.batch_size)
+    total = db.query(func.count(Tool.id)).scalar()
+    print(f"inserted {inserted} tools in {time.perf_counter() - start:.1f}s; catalog now has {total}")
+    if args.users:
+        print(f"inserted {ensure_users(db, args.users)} users")
+    if args.embed:
+        from backend.embeddings import sync_embeddings, publish_embeddings
+        start = time.perf_counter()
+        sync_embeddings(db)
+        publish_embeddings(db)
+        print(f"embedded in {time.perf_counter() - start:.1f}s")
+    db.close()
+
+if __name__ == "__main__":
+    main()
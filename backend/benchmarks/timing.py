@@ -0,0 +1,61 @@
+import statistics
+import time
+
+# how every benchmark here times things, so their numbers compare across scripts:
+#   samples      wall time per call from time.perf_counter, in milliseconds, after `warmup` untimed calls
+#   percentiles  nearest rank over the sorted samples (p50 of an even count is the upper middle, not a mean)
+#   ops/s        1 / median
+# scripts that time one long run (a build, a bulk load) use stopwatch(); per-call latencies go through timed()
+# or timed_each(), and get reported with percentile() or summary()
+
+WARMUP = 1 # untimed calls before sampling: first-call costs (imports, caches, query plans) aren't steady state
+
+
+def stopwatch(fn):
+    """ (fn(), seconds it took) """
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def timed(fn, repeat, warmup = WARMUP):
+    """ [ms] for `repeat` calls of fn """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def timed_each(fn, items, warmup = WARMUP):
+    """ ([fn(item)], [ms per item]): one call per input, for latencies over a set of queries """
+    for item in items[:warmup]:
+        fn(item)
+    results, times = [], []
+    for item in items:
+        start = time.perf_counter()
+        results.append(fn(item))
+        times.append((time.perf_counter() - start) * 1000)
+    return results, times
+
+def percentile(times, p):
+    """ p in 0..1 """
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def median(times):
+    return percentile(times, 0.5)
+
+def summary(times):
+    """ The stats bench_core records (and --compare reads); all in ms except ops """
+    middle = median(times)
+    return {
+        "rounds": len(times),
+        "min_ms": min(times),
+        "median_ms": middle,
+        "p99_ms": percentile(times, 0.99),
+        "mean_ms": statistics.fmean(times),
+        "stddev_ms": statistics.pstdev(times),
+        "ops": 1000 / middle if middle > 0 else None,
+    }
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+try:
+    from backend.models import CatalogVersion
+except ImportError:
+    from models import CatalogVersion
+
+# read-through cache for the tool endpoints
+# entries are keyed on (catalog version, endpoint, normalized params), so any write that bumps the
+# catalog version makes every older entry unreachable; the LRU then ages them out
+# the version lives in the DB so the ingest scripts (separate processes) invalidate the API too
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+# how stale our view of the catalog version may get for writes made by *other* processes
+CACHE_VERSION_POLL_SECONDS = float(os.getenv("CACHE_VERSION_POLL_SECONDS", "1"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL") # optional shared second level, e.g. redis://localhost:6379/0
+
+
+class LRUCache:
+    """ Size-bounded, thread-safe LRU with a per-entry TTL """
+
+    def __init__(self, max_entries = CACHE_MAX_ENTRIES, ttl = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisStore:
+    """ Shared cache level so every worker (and node) reuses each other's responses """
+
+    def __init__(self, url, ttl = CACHE_TTL_SECONDS):
+        import redis # optional dependency, only needed when CACHE_REDIS_URL is set
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl = None):
+        self.client.set(key, json.dumps(value), ex = int(ttl or self.ttl))
+
+
+class CachedResponse:
+    def __init__(self, body, headers = None):
+        self.body = body # serialized JSON bytes
+        self.headers = headers or {}
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def matches(self, if_none_match):
+        # If-None-Match may be "*" or a comma-separated list of tags, any of them weak (W/"..."); the comparison
+        # is the weak one (RFC 9110 13.1.2), so a W/ prefix a proxy added after compressing the body still matches
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    def to_dict(self):
+        return {"body": self.body.decode("utf-8"), "headers": self.headers}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["body"].encode("utf-8"), data["headers"])
+
+
+class ResponseCache:
+    def __init__(self, shared = None):
+        self.local = LRUCache()
+        self.shared = shared
+
+    @staticmethod
+    def key(version, endpoint, params):
+        # normalize so ?name=Fast&limit=10 and ?limit=10&name=fast%20 share an entry
+        normalized = []
+        for name, value in sorted(params.items()):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = " ".join(value.split())
+            normalized.append(f"{name}={value}")
+        return f"v{version}:{endpoint}?" + "&".join(normalized)
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            data = self.shared.get(key)
+            if data is not None:
+                entry = CachedResponse.from_dict(data)
+                self.local.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry.to_dict())
+
+    def stats(self):
+        return {"entries": len(self.local), "hits": self.local.hits, "misses": self.local.misses}
+
+
+class CatalogVersionTracker:
+    """
+    Our view of the catalog version.
+    Local writes update it immediately; writes from other processes are seen within CACHE_VERSION_POLL_SECONDS.
+    """
+
+    def __init__(self, poll_seconds = CACHE_VERSION_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.version = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db):
+        now = time.monotonic()
+        if self.version is None or now - self.checked_at >= self.poll_seconds:
+            row = db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).first()
+            with self._lock:
+                self.version = row.version if row else 0
+                self.checked_at = now
+        return self.version
+
+    def seen(self, version):
+        with self._lock:
+            self.version = version
+            self.checked_at = time.monotonic()
+
+
+def bump_catalog_version(db, commit = True):
+    """ Call after any write to the tools table; returns the new version """
+    updated = (
+        db.query(CatalogVersion)
+        .filter(CatalogVersion.id == 1)
+        .update({CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session = False)
+    )
+    if not updated:
+        db.add(CatalogVersion(id = 1, version = 1))
+    if commit:
+        db.commit()
+    version = db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar()
+    catalog_version.seen(version)
+    return version
+
+
+catalog_version = CatalogVersionTracker()
+response_cache = ResponseCache(RedisStore(CACHE_REDIS_URL) if CACHE_REDIS_URL else None)
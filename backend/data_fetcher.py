@@ -1,5 +1,8 @@
 import requests
 from models import SessionLocal, Tool
+from embeddings import sync_embeddings, publish_embeddings
+from cache import bump_catalog_version
+from dedup import IngestDeduper
 
 # e.g.
 API_URL = "https://api.publicapis.org/entries"
@@ -9,7 +12,10 @@ def fetch_tools():
     if response.status_code == 200:
         data = response.json().get("entries", [])
         db = SessionLocal()
+        deduper = IngestDeduper().load(db) # skip tools we already have, even under a slightly different url/name
         for item in data[:20]:
+            if deduper.check(item.get("API"), item.get("Description"), item.get("Link", "#")):
+                continue
             tool = Tool(
                 name = item.get("API", "No Name"),
                 description = item.get("Description", "No Description"),
@@ -18,6 +24,9 @@ def fetch_tools():
             )
             db.add(tool)
         db.commit()
+        sync_embeddings(db) # embed the new tools so ai_search picks them up
+        publish_embeddings(db) # and hand running workers a fresh shared index, if they use one
+        bump_catalog_version(db) # running API servers drop their cached tool responses
         db.close()
         print("Tools added successfully!")
     else:
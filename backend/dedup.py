@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import re
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import numpy as np
+try:
+    from backend.models import SessionLocal, Tool, ToolEmbedding
+    from backend.embeddings import MODEL_NAME, SYNC_BATCH_SIZE, publish_embeddings
+    from backend.cache import bump_catalog_version
+    from backend.ingest import delete_tools
+except ImportError:
+    from models import SessionLocal, Tool, ToolEmbedding
+    from embeddings import MODEL_NAME, SYNC_BATCH_SIZE, publish_embeddings
+    from cache import bump_catalog_version
+    from ingest import delete_tools
+
+# near-duplicate tools: the same API under http:// and https://, with a trailing slash or www., or listed
+# twice under slightly different names; exact-url checks miss all of these
+#   urls   normalized (scheme, www., default port, trailing slash, fragment, utm_* and query order ignored)
+#   text   MinHash signatures of name + description character shingles, bucketed with LSH bands, so only
+#          tools sharing a band are ever compared: ~linear in the catalog size instead of all N^2/2 pairs
+#   vectors optionally, LSH candidates whose stored embeddings are nearly identical count too
+# used two ways:
+#   ingest   IngestDeduper drops incoming rows that duplicate a tool we have (scrape_public_apis, data_fetcher)
+#   offline  python -m backend.dedup --report dedup.json   (what it would merge)
+#            python -m backend.dedup --merge               (keep one tool per group, delete the rest)
+
+# url by default: "near" also drops distinct APIs whose (often templated) descriptions read alike, so it's opt-in
+DEDUP_MODE = os.getenv("DEDUP_MODE", "url") # near | url | off
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8")) # estimated Jaccard similarity of the shingle sets
+DEDUP_EMBED_THRESHOLD = float(os.getenv("DEDUP_EMBED_THRESHOLD", "0.97")) # cosine, with --embeddings
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16")) # 16 bands x 4 rows: pairs above ~0.5 similarity become candidates
+DEDUP_SHINGLE = 4
+DEDUP_MAX_COMPARE = 50 # per LSH bucket; a bucket of templated text shouldn't turn quadratic
+
+# descriptions that say nothing about the tool; left out so they don't make unrelated tools look alike
+PLACEHOLDER_DESCRIPTIONS = {"scraped from public-apis list", "no description available", "no description"}
+_PRIME = 4294967291 # largest prime below 2**32: (a * h + b) fits in uint64 and the minima in uint32
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|ref|source)$")
+
+
+def normalize_url(url):
+    """ A key two spellings of the same address share, e.g. http://www.Example.com/api/ -> example.com/api """
+    url = (url or "").strip()
+    parts = urlsplit(url if "://" in url else "//" + url)
+    try:
+        port = parts.port # raises on a malformed port, e.g. "example.com:80a"
+    except ValueError:
+        return url # one bad scraped url shouldn't stop the ingest; it just won't match its other spellings
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = port if port not in (None, 80, 443) else None
+    path = re.sub(r"/+", "/", parts.path).rstrip("/")
+    if path.endswith(("/index.html", "/index.htm")):
+        path = path.rsplit("/", 1)[0]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values = True) if not _TRACKING_PARAMS.match(k))
+    return host + (f":{port}" if port else "") + path + ("?" + urlencode(query) if query else "")
+
+def url_variants(url):
+    """ The usual spellings of url (http/https, with or without www. and a trailing slash), for exact-match lookups """
+    url = (url or "").strip()
+    parts = urlsplit(url if "://" in url else "//" + url)
+    host = parts.netloc[4:] if parts.netloc.lower().startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/")
+    rest = ("?" + parts.query if parts.query else "") + ("#" + parts.fragment if parts.fragment else "")
+    return {f"{scheme}://{prefix}{host}{path}{slash}{rest}" for scheme in ("http", "https") for prefix in ("", "www.") for slash in ("", "/")} | {url}
+
+def normalize_text(name, description):
+    description = "" if (description or "").strip().lower() in PLACEHOLDER_DESCRIPTIONS else description
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", f"{name or ''} {description or ''}".lower()).split())
+
+def shingles(text, k = DEDUP_SHINGLE):
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+    """ num_perm hash functions (a * h + b) mod p over crc32 shingle hashes; the signature is their minima """
+
+    def __init__(self, num_perm = DEDUP_NUM_PERM, seed = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2 ** 32, num_perm, dtype = np.uint64)[:, None]
+        self.b = rng.integers(0, 2 ** 32, num_perm, dtype = np.uint64)[:, None]
+        self.num_perm = num_perm
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype = np.uint64)
+        if len(hashes) == 0:
+            return None # nothing to compare on
+        return ((self.a * hashes + self.b) % _PRIME).min(axis = 1).astype(np.uint32)
+
+class LSHIndex:
+    """
+    Signatures split into bands; an item only gets compared with items sharing at least one band.
+    Positions (0, 1, 2...) identify items; callers map them back to their own keys.
+    """
+
+    def __init__(self, num_perm = DEDUP_NUM_PERM, bands = DEDUP_BANDS):
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = np.empty((1024, num_perm), dtype = np.uint32)
+        self.size = 0
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def candidates(self, signature):
+        """ (positions, estimated Jaccard similarities) of the items sharing a band with signature """
+        found = set()
+        for band, key in self._keys(signature):
+            found.update(self.buckets[band].get(key, ())[:DEDUP_MAX_COMPARE])
+        if not found:
+            return np.empty(0, dtype = np.int64), np.empty(0)
+        positions = np.fromiter(found, dtype = np.int64, count = len(found))
+        # the share of matching minima estimates |A & B| / |A | B|; all candidates in one comparison
+        return positions, (self.signatures[positions] == signature).mean(axis = 1)
+
+    def add(self, signature):
+        position = self.size
+        if position == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.empty_like(self.signatures)])
+        self.signatures[position] = signature
+        self.size += 1
+        for band, key in self._keys(signature):
+            self.buckets[band].setdefault(key, []).append(position)
+        return position
+
+
+class IngestDeduper:
+    """
+    The ingest-time stage: remembers every tool it has seen (what's in the DB plus what it accepted)
+    and tells the caller when an incoming one duplicates it.
+    mode "url" only compares normalized urls; "near" also compares names + descriptions.
+    """
+
+    def __init__(self, mode = DEDUP_MODE, threshold = DEDUP_THRESHOLD):
+        self.mode = mode
+        self.threshold = threshold
+        self.urls = {}
+        self.names = {}
+        self.keys = [] # LSH position -> key
+        self.hasher = MinHasher() if mode == "near" else None
+        self.lsh = LSHIndex() if mode == "near" else None
+        self.dropped = {"url": 0, "near": 0}
+
+    def load(self, db):
+        if self.mode == "off":
+            return self # check() never looks
+        start = time.perf_counter()
+        # only near mode reads descriptions; url mode doesn't stream the whole catalog's text for nothing
+        columns = (Tool.id, Tool.name, Tool.url) + ((Tool.description,) if self.hasher else ())
+        for tool_id, name, url, *description in db.query(*columns).yield_per(10000):
+            self._remember(("db", tool_id), name, url, self._signature(name, *description) if description else None)
+        if self.mode == "near":
+            print(f"Dedup index: {len(self.names)} tools in {time.perf_counter() - start:.1f}s")
+        return self
+
+    def _signature(self, name, description):
+        return self.hasher.signature(normalize_text(name, description)) if self.hasher else None
+
+    def _remember(self, key, name, url, signature):
+        self.urls.setdefault(normalize_url(url), key)
+        self.names[key] = name
+        if signature is not None:
+            self.lsh.add(signature)
+            self.keys.append(key)
+
+    def check(self, name, description, url):
+        """ None if the tool is new (and remembers it), otherwise why it's a duplicate """
+        if self.mode == "off":
+            return None
+        same_url = self.urls.get(normalize_url(url))
+        if same_url is not None:
+            self.dropped["url"] += 1
+            return f"same url as {self.names[same_url]!r}"
+        signature = self._signature(name, description)
+        if signature is not None:
+            positions, similarities = self.lsh.candidates(signature)
+            if len(positions) and similarities.max() >= self.threshold:
+                best = int(np.argmax(similarities))
+                self.dropped["near"] += 1
+                return f"{similarities[best]:.0%} similar to {self.names[self.keys[positions[best]]]!r}"
+        self._remember(("new", len(self.names)), name, url, signature)
+        return None
+
+
+# --- offline: whole-catalog groups, report and merge ---
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+def find_duplicates(tools, threshold = DEDUP_THRESHOLD, vectors = None, embed_threshold = DEDUP_EMBED_THRESHOLD):
+    """
+    tools is an iterable of (id, name, description, url); vectors optionally {id: unit vector}.
+    Returns (groups, pairs): lists of ids with more than one member, and the (a, b, reason) edges that joined them.
+    """
+    hasher, lsh, uf = MinHasher(), LSHIndex(), _UnionFind()
+    urls, ids, pairs = {}, [], []
+    for tool_id, name, description, url in tools:
+        key = normalize_url(url)
+        if key in urls:
+            pairs.append((urls[key], tool_id, "url"))
+            uf.union(tool_id, urls[key])
+        else:
+            urls[key] = tool_id
+        signature = hasher.signature(normalize_text(name, description))
+        if signature is None:
+            continue
+        positions, similarities = lsh.candidates(signature)
+        for position, similarity in zip(positions.tolist(), similarities.tolist()):
+            other = ids[position]
+            if similarity >= threshold:
+                reason = f"text {similarity:.2f}"
+            elif vectors is not None and tool_id in vectors and other in vectors and float(vectors[tool_id] @ vectors[other]) >= embed_threshold:
+                reason = f"embedding {float(vectors[tool_id] @ vectors[other]):.3f}"
+            else:
+                continue
+            if uf.find(other) != uf.find(tool_id):
+                pairs.append((other, tool_id, reason))
+                uf.union(tool_id, other)
+        lsh.add(signature)
+        ids.append(tool_id)
+    groups = {}
+    for item in list(uf.parent):
+        groups.setdefault(uf.find(item), []).append(item)
+    return [sorted(group) for group in groups.values() if len(group) > 1], pairs
+
+def _load_vectors(db):
+    vectors = {}
+    query = db.query(ToolEmbedding.tool_id, ToolEmbedding.vector).filter(ToolEmbedding.model_name == MODEL_NAME).yield_per(SYNC_BATCH_SIZE)
+    for tool_id, vector in query:
+        vectors[tool_id] = np.frombuffer(vector, dtype = np.float32)
+    return vectors
+
+def _keep_first(tool):
+    # which member of a group survives: a real description, then https, then the oldest
+    placeholder = (tool.description or "").strip().lower() in PLACEHOLDER_DESCRIPTIONS or not tool.description
+    return (placeholder, not (tool.url or "").startswith("https://"), tool.id)
+
+def merge_groups(db, groups):
+    """ Keeps one tool per group and deletes the rest """
+    removed = []
+    for group in groups:
+        tools = sorted(db.query(Tool).filter(Tool.id.in_(group)).all(), key = _keep_first)
+        if len(tools) < 2:
+            continue
+        removed.extend(tool.id for tool in tools[1:])
+    delete_tools(db, removed)
+    db.commit()
+    return removed
+
+def run(report_path = None, merge = False, threshold = DEDUP_THRESHOLD, embeddings = False):
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        tools = db.query(Tool.id, Tool.name, Tool.description, Tool.url).order_by(Tool.id).yield_per(10000)
+        vectors = _load_vectors(db) if embeddings else None
+        groups, pairs = find_duplicates(tools, threshold, vectors)
+        duplicates = sum(len(group) - 1 for group in groups)
+        print(f"Found {len(groups)} duplicate groups ({duplicates} extra tools) in {time.perf_counter() - start:.1f}s")
+        if report_path:
+            names = dict(db.query(Tool.id, Tool.name).filter(Tool.id.in_({i for group in groups for i in group})).all()) if groups else {}
+            with open(report_path, "w") as f:
+                json.dump({
+                    "groups": [[{"id": i, "name": names.get(i)} for i in group] for group in groups],
+                    "pairs": [{"a": a, "b": b, "reason": reason} for a, b, reason in pairs],
+                }, f, indent = 2)
+            print(f"Wrote {report_path}")
+        if merge and groups:
+            removed = merge_groups(db, groups)
+            publish_embeddings(db) # drop the deleted tools from the live index
+            bump_catalog_version(db)
+            print(f"Merged: deleted {len(removed)} duplicates; "
+                  "rebuild the similar-tools graph with python -m backend.similar")
+        return groups
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Find (and optionally merge) near-duplicate tools")
+    parser.add_argument("--report", help = "write the groups and why they matched to this JSON file")
+    parser.add_argument("--merge", action = "store_true", help = "keep one tool per group and delete the others")
+    parser.add_argument("--threshold", type = float, default = DEDUP_THRESHOLD, help = "estimated Jaccard similarity (0-1)")
+    parser.add_argument("--embeddings", action = "store_true", help = "also match candidates whose stored embeddings are nearly identical")
+    args = parser.parse_args()
+    run(args.report, args.merge, args.threshold, args.embeddings)
@@ -0,0 +1,351 @@
+import hashlib
+import os
+import threading
+import numpy as np
+try:
+    from backend.models import Tool, ToolEmbedding, CatalogVersion
+except ImportError:
+    # the ingest scripts are run from inside backend/, where the package prefix doesn't resolve
+    from models import Tool, ToolEmbedding, CatalogVersion
+try:
+    from backend.vector_index import VECTOR_INDEX, IVFIndex, make_index, load_index
+    from backend.vector_store import SharedIndex, publish, generation_model
+except ImportError:
+    from vector_index import VECTOR_INDEX, IVFIndex, make_index, load_index
+    from vector_store import SharedIndex, publish, generation_model
+
+# embeddings are computed once per tool and kept in the tool_embeddings side table
+# the API keeps them all in an in-memory vector index, so a search is just
+# "encode the query" + one index lookup instead of re-encoding the whole catalog
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+# torch = the stock model; quantized = same model with int8 dynamic quantization of the Linear layers;
+# onnx = ONNX Runtime export (needs `pip install sentence-transformers[onnx]`)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+SYNC_BATCH_SIZE = 256 # how many tools we read/encode/commit at a time when syncing
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH") # e.g. /var/lib/toolhub/tools.npz
+# when set, vectors live in memory-mapped files shared by every worker (see vector_store.py)
+# instead of a private in-memory index per worker
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR")
+# without a shared store, each API process holds a private copy of the vectors; the ingest scripts bump an
+# embeddings version (row 2 of catalog_version) after changing tool_embeddings, and processes that see it
+# change reload their copy; checked every EMBEDDING_RELOAD_SECONDS (0 = never)
+EMBEDDING_RELOAD_SECONDS = float(os.getenv("EMBEDDING_RELOAD_SECONDS", "30"))
+EMBEDDINGS_VERSION_ID = 2
+
+
+_model = None
+_model_lock = threading.Lock()
+
+def load_model(backend = EMBEDDING_BACKEND):
+    # torch/sentence_transformers are only imported here, so importing this module (or the app) stays cheap
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        return SentenceTransformer(MODEL_NAME)
+    if backend == "onnx":
+        return SentenceTransformer(MODEL_NAME, backend = "onnx")
+    if backend == "quantized":
+        import torch
+        return torch.quantization.quantize_dynamic(SentenceTransformer(MODEL_NAME, device = "cpu"), {torch.nn.Linear}, dtype = torch.qint8)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected torch, quantized or onnx")
+
+def get_model():
+    # loaded on first use; the lock makes sure concurrent first callers only load it once
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model()
+    return _model
+
+def model_loaded():
+    return _model is not None
+
+def embedding_dim(db = None):
+    # the stored vectors know their size, which saves loading the model just to ask it
+    if db is not None:
+        dim = db.query(ToolEmbedding.dim).filter(ToolEmbedding.model_name == MODEL_NAME).limit(1).scalar()
+        if dim:
+            return dim
+    return get_model().get_sentence_embedding_dimension()
+
+def tool_text(name, description):
+    # the text we embed for a tool (usu. description preferred)
+    return description if description else name
+
+def content_hash(text):
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+def embeddings_version(db):
+    return db.query(CatalogVersion.version).filter(CatalogVersion.id == EMBEDDINGS_VERSION_ID).scalar() or 0
+
+def bump_embeddings_version(db):
+    """ Tell API processes with a private index that tool_embeddings changed under them """
+    updated = (
+        db.query(CatalogVersion)
+        .filter(CatalogVersion.id == EMBEDDINGS_VERSION_ID)
+        .update({CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session = False)
+    )
+    if not updated:
+        db.add(CatalogVersion(id = EMBEDDINGS_VERSION_ID, version = 1))
+    db.commit()
+
+def encode_texts(texts):
+    # normalized vectors, so cosine similarity is just a dot product
+    vectors = get_model().encode(texts, convert_to_numpy = True, normalize_embeddings = True, batch_size = 64)
+    return np.asarray(vectors, dtype = np.float32)
+
+def encode_query(q):
+    return encode_texts([q])[0]
+
+
+class EmbeddingIndex:
+    """
+    The tool embeddings the API searches against, held in a VectorIndex backend
+    (exact flat scan or approximate IVF, see vector_index.py).
+    """
+
+    def __init__(self, kind = None, path = None, store_dir = None):
+        self.kind = kind or VECTOR_INDEX
+        self.path = path or VECTOR_INDEX_PATH # optional on-disk copy, saves retraining IVF on every restart
+        if self.path and not self.path.endswith(".npz"):
+            self.path += ".npz" # np.savez would add it when saving, and the exists() check below would never match
+        self.store_dir = store_dir or VECTOR_STORE_DIR
+        self.vectors = None
+        self._lock = threading.Lock()
+        self._pending = None # writes that land while load() is running, replayed once it's done
+        self.version = None # embeddings version the loaded vectors reflect
+
+    def __len__(self):
+        return len(self.vectors) if self.vectors is not None else 0
+
+    @property
+    def loaded(self):
+        return self.vectors is not None
+
+    def _new_index(self, dim):
+        if self.path and os.path.exists(self.path):
+            saved = load_index(self.path)
+            if saved.kind == self.kind and saved.dim == dim:
+                return saved
+        return make_index(dim, self.kind)
+
+    def load(self, db):
+        with self._lock:
+            self._pending = []
+        try:
+            self._load(db)
+        finally:
+            # only still set if the load failed: hand the buffered writes to whatever index is live (the
+            # previous one on a reload; with none, the rows are in the DB and the next load reads them)
+            with self._lock:
+                if self._pending is not None and self.vectors is not None:
+                    for op, tool_id, vector in self._pending:
+                        self._apply(self.vectors, op, tool_id, vector)
+                self._pending = None
+
+    def reload_if_changed(self, db):
+        """ Reload the private index if an ingest script changed tool_embeddings since the last load """
+        if self.store_dir or self.version is None or embeddings_version(db) == self.version:
+            return False
+        self.load(db) # the old index keeps serving until the new one is swapped in
+        return True
+
+    def _load(self, db):
+        version = embeddings_version(db) # read first, so a change made while loading triggers another reload
+        # bring the side table up to date, then pull every vector into the index
+        updated = sync_embeddings(db)
+        if self.store_dir:
+            # the first worker up writes the shared file and everyone else just maps it, unless this worker's
+            # sync just (re)computed vectors (or the live generation is from another model): those need a
+            # new generation, or every worker would map stale or missing vectors
+            publish_embeddings(db, self.store_dir, only_if_missing = not updated)
+            self._finish_load(SharedIndex(self.store_dir, MODEL_NAME), version)
+            return
+        index = self._new_index(embedding_dim(db))
+        seen = set()
+        query = (
+            db.query(ToolEmbedding.tool_id, ToolEmbedding.vector)
+            .filter(ToolEmbedding.model_name == MODEL_NAME)
+            .order_by(ToolEmbedding.tool_id)
+            .yield_per(SYNC_BATCH_SIZE)
+        )
+        ids, vectors = [], []
+        for tool_id, vector in query:
+            ids.append(tool_id)
+            vectors.append(np.frombuffer(vector, dtype = np.float32))
+            if len(ids) == SYNC_BATCH_SIZE:
+                index.add(ids, np.stack(vectors))
+                seen.update(ids)
+                ids, vectors = [], []
+        if ids:
+            index.add(ids, np.stack(vectors))
+            seen.update(ids)
+        # anything left over from a saved copy that's no longer in the DB
+        saved_ids, _ = index.items()
+        index.remove([tool_id for tool_id in saved_ids.tolist() if tool_id not in seen])
+        if isinstance(index, IVFIndex) and index.needs_training():
+            index.train()
+        if self.path:
+            index.save(self.path)
+        self._finish_load(index, version)
+
+    def _finish_load(self, index, version):
+        with self._lock:
+            for op, tool_id, vector in self._pending:
+                self._apply(index, op, tool_id, vector)
+            self._pending = None
+            self.vectors = index
+            self.version = version
+        print(f"Loaded {len(index)} tool embeddings into the {index.kind} search index")
+
+    @staticmethod
+    def _apply(index, op, tool_id, vector):
+        if op == "upsert":
+            index.add([tool_id], np.asarray(vector, dtype = np.float32)[None, :])
+        else:
+            index.remove([tool_id])
+
+    def _write(self, op, tool_id, vector = None):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((op, tool_id, vector))
+                return
+            if self.vectors is None:
+                # nothing loaded yet; the row is already in the DB, so the first load/publish picks it up
+                if op == "remove" or (self.store_dir and generation_model(self.store_dir) != MODEL_NAME):
+                    return
+                self.vectors = SharedIndex(self.store_dir, MODEL_NAME) if self.store_dir else make_index(len(vector), self.kind)
+            self._apply(self.vectors, op, tool_id, vector)
+
+    def upsert(self, tool_id, vector):
+        self._write("upsert", tool_id, vector)
+
+    def remove(self, tool_id):
+        self._write("remove", tool_id)
+
+    def search(self, query_vector, top_k):
+        # returns [(tool_id, score)], best first
+        if top_k <= 0 or not len(self):
+            return []
+        return self.vectors.search(query_vector, top_k)
+
+    def lookup(self, ids):
+        # (ids, vectors) for whichever of ids are in the index
+        if not len(self):
+            return np.empty(0, dtype = np.int64), np.empty((0, 0), dtype = np.float32)
+        return self.vectors.lookup(ids)
+
+    def search_subset(self, query_vector, ids, top_k):
+        # exact scores for a pre-filtered candidate set only (hybrid search with filters)
+        if top_k <= 0 or not len(self):
+            return []
+        return self.vectors.search_subset(query_vector, ids, top_k)
+
+
+def sync_embeddings(db, batch_size = SYNC_BATCH_SIZE):
+    """
+    Compute embeddings for tools that don't have one yet, or whose text/model changed.
+    Walks the tools table in id order one batch at a time, so memory stays flat.
+    Returns {tool_id: vector} for everything (re)computed.
+    """
+    updated = {}
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Tool.id, Tool.name, Tool.description, ToolEmbedding.content_hash, ToolEmbedding.model_name)
+            .outerjoin(ToolEmbedding, ToolEmbedding.tool_id == Tool.id)
+            .filter(Tool.id > last_id)
+            .order_by(Tool.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        stale = []
+        for row in rows:
+            text = tool_text(row.name, row.description)
+            digest = content_hash(text)
+            if row.content_hash != digest or row.model_name != MODEL_NAME:
+                stale.append((row.id, text, digest, row.content_hash is not None))
+        if not stale:
+            continue
+        vectors = encode_texts([text for _, text, _, _ in stale])
+        inserts, updates = [], []
+        for (tool_id, _, digest, exists), vector in zip(stale, vectors):
+            mapping = {
+                "tool_id": tool_id,
+                "model_name": MODEL_NAME,
+                "content_hash": digest,
+                "dim": len(vector),
+                "vector": vector.tobytes(),
+            }
+            (updates if exists else inserts).append(mapping)
+            updated[tool_id] = vector
+        if inserts:
+            db.bulk_insert_mappings(ToolEmbedding, inserts)
+        if updates:
+            db.bulk_update_mappings(ToolEmbedding, updates)
+        db.commit()
+    if updated:
+        print(f"Computed {len(updated)} tool embeddings")
+    return updated
+
+def publish_embeddings(db, store_dir = None, only_if_missing = False):
+    """
+    Write every stored vector into a new shared generation (see vector_store.py) and make it live.
+    Running workers swap to it on their next search; the ingest scripts call this after syncing.
+    Without a shared store, it bumps the embeddings version instead, so API processes reload their copy.
+    """
+    store_dir = store_dir or VECTOR_STORE_DIR
+    if not store_dir:
+        if not only_if_missing:
+            bump_embeddings_version(db)
+        return None
+
+    def chunks():
+        last_id = 0
+        while True:
+            rows = (
+                db.query(ToolEmbedding.tool_id, ToolEmbedding.vector)
+                .filter(ToolEmbedding.model_name == MODEL_NAME, ToolEmbedding.tool_id > last_id)
+                .order_by(ToolEmbedding.tool_id)
+                .limit(SYNC_BATCH_SIZE)
+                .all()
+            )
+            if not rows:
+                return
+            last_id = rows[-1].tool_id
+            yield [row.tool_id for row in rows], np.stack([np.frombuffer(row.vector, dtype = np.float32) for row in rows])
+
+    generation = publish(store_dir, chunks(), embedding_dim(db), MODEL_NAME, only_if_missing = only_if_missing)
+    if generation:
+        print(f"Published tool embeddings generation {generation} to {store_dir}")
+    return generation
+
+def embed_tool(db, tool):
+    """ (Re)compute and store the embedding for a single tool; skips the encode if the text didn't change """
+    text = tool_text(tool.name, tool.description)
+    digest = content_hash(text)
+    stored = db.query(ToolEmbedding).filter(ToolEmbedding.tool_id == tool.id).first()
+    if stored and stored.content_hash == digest and stored.model_name == MODEL_NAME:
+        return np.frombuffer(stored.vector, dtype = np.float32)
+    vector = encode_texts([text])[0]
+    if stored is None:
+        stored = ToolEmbedding(tool_id = tool.id)
+        db.add(stored)
+    stored.model_name = MODEL_NAME
+    stored.content_hash = digest
+    stored.dim = len(vector)
+    stored.vector = vector.tobytes()
+    db.commit()
+    return vector
+
+def delete_embedding(db, tool_id):
+    db.query(ToolEmbedding).filter(ToolEmbedding.tool_id == tool_id).delete()
+    db.commit()
+
+
+index = EmbeddingIndex() # the process-wide index the API searches against
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import os
+import zlib
+from sqlalchemy import select
+try:
+    from backend.models import Tool, engine
+except ImportError:
+    from models import Tool, engine
+
+# GET /tools/export: the whole catalog as NDJSON or CSV, optionally gzipped, without ever holding it in memory
+# rows come off a server-side cursor (stream_results + yield_per; SQLite's cursor is lazy anyway) as plain
+# tuples of the exported columns, are encoded into ~64KB chunks and handed to the StreamingResponse one at a time
+
+EXPORT_YIELD_PER = int(os.getenv("EXPORT_YIELD_PER", "5000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_COLUMNS = ("id", "name", "description", "category", "url")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def iter_rows(yield_per = EXPORT_YIELD_PER, bind = None):
+    # its own connection: the request's session is gone by the time the response body is streamed
+    columns = [getattr(Tool, column) for column in EXPORT_COLUMNS]
+    with (bind or engine).connect() as conn:
+        result = conn.execution_options(stream_results = True, yield_per = yield_per).execute(select(*columns).order_by(Tool.id))
+        for row in result:
+            yield row
+
+def _encode_ndjson(rows):
+    dumps = json.dumps
+    for row in rows:
+        yield dumps(dict(zip(EXPORT_COLUMNS, row)), separators = (",", ":")) + "\n"
+
+def _encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_chunks(fmt = "ndjson", gzip = False, rows = None):
+    """ Yields bytes chunks of the export; pass rows to export something other than the whole tools table """
+    rows = iter_rows() if rows is None else rows
+    encoded = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(rows)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None # wbits 31 = gzip container
+    pending, size = [], 0
+    for text in encoded:
+        pending.append(text)
+        size += len(text)
+        if size >= EXPORT_CHUNK_BYTES:
+            data = "".join(pending).encode("utf-8")
+            pending, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = "".join(pending).encode("utf-8")
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+def export_filename(fmt, gzip):
+    return f"tools.{fmt}" + (".gz" if gzip else "")
@@ -0,0 +1,189 @@
+import argparse
+import os
+from sqlalchemy import text, func
+try:
+    from backend.models import SessionLocal, Tool, CategoryCount, engine
+    from backend.cache import bump_catalog_version
+except ImportError:
+    from models import SessionLocal, Tool, CategoryCount, engine
+    from cache import bump_catalog_version
+
+# per-category tool counts behind GET /tools/facets
+# a GROUP BY category over the whole tools table on every request reads every row; instead category_counts
+# holds one row per category and triggers on tools keep it current:
+#   postgres - statement-level triggers with transition tables, so a 1000-row bulk INSERT is one grouped
+#              upsert per statement (not 1000 row updates), in category order so concurrent writers lock
+#              the counter rows in the same order
+#   sqlite   - row-level triggers (SQLite has no statement triggers); writes serialize there anyway
+#   other    - no triggers, every facet read falls back to the GROUP BY
+# the triggers live in the database, so the scraper, data_fetcher.py and dedup merges (separate
+# processes, no API code involved) keep the counts right too; tools without a category aren't counted
+# a name filter can't be served from per-category totals, so scoped reads GROUP BY the tools the search
+# backend's index matches (see search_backend.py); both kinds go through the response cache
+#   python -m backend.facets --check     compare the counts with a fresh GROUP BY
+#   python -m backend.facets --rebuild   recount from scratch (after a TRUNCATE or a manual edit)
+
+FACETS_MAX_LIMIT = int(os.getenv("FACETS_MAX_LIMIT", "500"))
+
+# the net change per category, from whichever transition tables the trigger has
+_PG_CHANGES = {
+    "insert": "SELECT category, 1 AS delta FROM new_rows",
+    "delete": "SELECT category, -1 AS delta FROM old_rows",
+    "update": "SELECT category, 1 AS delta FROM new_rows UNION ALL SELECT category, -1 FROM old_rows",
+}
+_PG_TRANSITIONS = {
+    "insert": "REFERENCING NEW TABLE AS new_rows",
+    "delete": "REFERENCING OLD TABLE AS old_rows",
+    "update": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+
+
+def _names(engine):
+    schema = None if engine.dialect.name == "sqlite" else Tool.__table__.schema
+    qualify = (lambda name: f"{schema}.{name}") if schema else (lambda name: name)
+    return qualify, qualify(Tool.__tablename__), qualify(CategoryCount.__tablename__)
+
+def _postgres_statements(engine):
+    qualify, tools, counts = _names(engine)
+    statements = []
+    for event, changes in _PG_CHANGES.items():
+        function = qualify(f"category_counts_{event}")
+        statements += [
+            f"""CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO {counts} (category, count)
+                SELECT category, sum(delta) FROM ({changes}) changes
+                WHERE category IS NOT NULL GROUP BY category HAVING sum(delta) <> 0 ORDER BY category
+                ON CONFLICT (category) DO UPDATE SET count = {CategoryCount.__tablename__}.count + excluded.count;
+                DELETE FROM {counts} WHERE count <= 0;
+                RETURN NULL;
+            END $$""",
+            f"DROP TRIGGER IF EXISTS tools_category_counts_{event} ON {tools}",
+            f"""CREATE TRIGGER tools_category_counts_{event} AFTER {event.upper()} ON {tools}
+            {_PG_TRANSITIONS[event]} FOR EACH STATEMENT EXECUTE FUNCTION {function}()""",
+        ]
+    return statements
+
+def _sqlite_statements(engine):
+    # insert-if-missing + UPDATE, not an upsert or INSERT OR IGNORE: SQLite applies the outer statement's
+    # conflict policy to statements inside a trigger, so under POST /tools/bulk's ON CONFLICT those would abort
+    # both halves are no-ops for a NULL category (SQLite would otherwise store NULL in a text primary key)
+    _, tools, counts = _names(engine)
+    add = f"""INSERT INTO {counts} (category, count) SELECT new.category, 0
+              WHERE new.category IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {counts} WHERE category = new.category);
+              UPDATE {counts} SET count = count + 1 WHERE category = new.category;"""
+    remove = f"""UPDATE {counts} SET count = count - 1 WHERE category = old.category;
+                 DELETE FROM {counts} WHERE category = old.category AND count <= 0;"""
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS tools_category_counts_insert AFTER INSERT ON {tools} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS tools_category_counts_delete AFTER DELETE ON {tools} BEGIN {remove} END",
+        f"""CREATE TRIGGER IF NOT EXISTS tools_category_counts_update AFTER UPDATE OF category ON {tools}
+            WHEN old.category IS NOT new.category BEGIN {remove} {add} END""",
+    ]
+
+def _has_triggers(conn):
+    if conn.dialect.name == "postgresql":
+        query = "SELECT 1 FROM pg_trigger WHERE tgname = 'tools_category_counts_update'"
+    else:
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'tools_category_counts_update'"
+    return conn.execute(text(query)).first() is not None
+
+def _recount(conn):
+    # with the triggers already in place and (on Postgres) writers locked out, so no write is lost or counted twice
+    _, tools, counts = _names(conn.engine)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"LOCK TABLE {tools} IN SHARE ROW EXCLUSIVE MODE")) # readers carry on, writers wait
+    conn.execute(text(f"DELETE FROM {counts}"))
+    conn.execute(text(
+        f"INSERT INTO {counts} (category, count) "
+        f"SELECT category, count(*) FROM {tools} WHERE category IS NOT NULL GROUP BY category"
+    ))
+
+def setup(engine):
+    """ Create the triggers (and fill the counts) unless they exist; returns False if this database can't keep them """
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        return False
+    try:
+        with engine.begin() as conn:
+            if dialect == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('category_counts'))")) # workers starting together
+            if not _has_triggers(conn):
+                statements = _postgres_statements(engine) if dialect == "postgresql" else _sqlite_statements(engine)
+                for statement in statements:
+                    conn.execute(text(statement))
+                _recount(conn)
+    except Exception as e:
+        print(f"Maintained category counts unavailable ({e}), facets will GROUP BY the tools table")
+        return False
+    return True
+
+
+class CategoryFacets:
+    def __init__(self, engine, search_backend = None):
+        self.maintained = setup(engine)
+        self.search_backend = search_backend # narrows ?name= scoped counts with its index instead of an ILIKE scan
+
+    def counts(self, db, name = None, category = None, limit = FACETS_MAX_LIMIT):
+        """ [(category, tool count)], most tools first; name scopes the count to matching tools, category filters the list """
+        if self.maintained and not name:
+            query = db.query(CategoryCount.category, CategoryCount.count)
+            if category:
+                query = query.filter(CategoryCount.category.ilike(f"%{category}%"))
+            order = (CategoryCount.count.desc(), CategoryCount.category)
+        else:
+            if name and self.search_backend is not None:
+                query = group_by_counts(db, category = category).filter(Tool.id.in_(self.search_backend.id_filter(name = name)))
+            else:
+                query = group_by_counts(db, name, category)
+            order = (func.count(Tool.id).desc(), Tool.category)
+        return [(row[0], int(row[1])) for row in query.order_by(*order).limit(limit)]
+
+
+def group_by_counts(db, name = None, category = None):
+    # the naive aggregate: what the triggers save us from for unscoped reads
+    query = db.query(Tool.category, func.count(Tool.id)).filter(Tool.category.isnot(None))
+    if name:
+        query = query.filter(Tool.name.ilike(f"%{name}%"))
+    if category:
+        query = query.filter(Tool.category.ilike(f"%{category}%"))
+    return query.group_by(Tool.category)
+
+def drift(db):
+    """ {category: (stored, actual)} for every category whose stored count is wrong """
+    stored = dict(db.query(CategoryCount.category, CategoryCount.count).all())
+    actual = dict(group_by_counts(db).all())
+    return {
+        category: (stored.get(category, 0), actual.get(category, 0))
+        for category in stored.keys() | actual.keys()
+        if stored.get(category, 0) != actual.get(category, 0)
+    }
+
+def rebuild():
+    with engine.begin() as conn:
+        _recount(conn)
+    db = SessionLocal()
+    try:
+        bump_catalog_version(db) # cached facet responses carry the old counts
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Check or rebuild the maintained category counts")
+    parser.add_argument("--check", action = "store_true", help = "list categories whose stored count differs from a GROUP BY")
+    parser.add_argument("--rebuild", action = "store_true", help = "recount every category from the tools table")
+    args = parser.parse_args()
+    if not setup(engine):
+        raise SystemExit("This database can't maintain category counts")
+    if args.check:
+        db = SessionLocal()
+        try:
+            wrong = drift(db)
+        finally:
+            db.close()
+        for category, (stored, actual) in sorted(wrong.items()):
+            print(f"{category}: stored {stored}, actual {actual}")
+        print(f"{len(wrong)} categories off")
+    if args.rebuild:
+        rebuild()
+        print("Recounted every category")
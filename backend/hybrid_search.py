@@ -0,0 +1,79 @@
+import os
+try:
+    from backend.metrics import HYBRID_SEARCH_STAGE
+except ImportError:
+    from metrics import HYBRID_SEARCH_STAGE
+
+# GET /tools/hybrid_search: keyword and semantic ranking fused into one list
+#   1. filter    name/category filters are resolved to a candidate id set first (index-backed, see search_backend)
+#   2. lexical   the keyword backend ranks the query text, limited to the candidates
+#   3. semantic  cosine similarity against the candidates' embeddings only, so a filtered query scores
+#                a few thousand vectors instead of the whole catalog
+#   4. fuse      reciprocal rank fusion: score = sum of weight / (k + position) over the two rankings,
+#                so neither list's raw score scale (bm25 vs cosine) matters
+# each ranking is read max(HYBRID_DEPTH, skip + limit) deep, so skip/limit page through the fused order
+
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60")) # larger = flatter, less weight on the very top ranks
+HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "100"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_SEMANTIC_WEIGHT = float(os.getenv("HYBRID_SEMANTIC_WEIGHT", "1.0"))
+# past this many candidates, gathering their vectors costs more than an index search + post-filter
+HYBRID_MAX_PREFILTER = int(os.getenv("HYBRID_MAX_PREFILTER", "50000"))
+
+
+def reciprocal_rank_fusion(rankings, weights, k = HYBRID_RRF_K):
+    """ rankings are lists of ids, best first; returns [(id, fused score)] best first (ties by id) """
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        if not weight:
+            continue
+        for position, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + weight / (k + position)
+    return sorted(scores.items(), key = lambda item: (-item[1], item[0]))
+
+
+class HybridSearch:
+    def __init__(self, search_backend, index, k = HYBRID_RRF_K, depth = HYBRID_DEPTH, max_prefilter = HYBRID_MAX_PREFILTER):
+        self.search_backend = search_backend
+        self.index = index
+        self.k = k
+        self.depth = depth
+        self.max_prefilter = max_prefilter
+
+    def lexical(self, db, q, name, category, depth, candidates):
+        # the backend already applies category; a name filter is enforced by intersecting with the
+        # candidates, reading further down the keyword ranking to make up for what gets dropped
+        if not name:
+            return [tool_id for tool_id, _ in self.search_backend.search(db, name = q, category = category, limit = depth)]
+        ranked = self.search_backend.search(db, name = q, category = category, limit = depth * 4)
+        return [tool_id for tool_id, _ in ranked if tool_id in candidates][:depth]
+
+    def semantic(self, query_vector, depth, candidates):
+        if candidates is None:
+            return [tool_id for tool_id, _ in self.index.search(query_vector, depth)]
+        if len(candidates) <= self.max_prefilter:
+            return [tool_id for tool_id, _ in self.index.search_subset(query_vector, candidates, depth)]
+        # a broad filter: search deeper over everything and keep the hits that pass
+        hits = self.index.search(query_vector, depth * 10)
+        return [tool_id for tool_id, _ in hits if tool_id in candidates][:depth]
+
+    def search(self, db, q, query_vector = None, name = None, category = None, skip = 0, limit = 10,
+               lexical_weight = HYBRID_LEXICAL_WEIGHT, semantic_weight = HYBRID_SEMANTIC_WEIGHT):
+        """ [(tool_id, fused score)] for positions skip..skip+limit of the fused ranking """
+        depth = max(self.depth, skip + limit)
+        candidates = None
+        if name or category:
+            with HYBRID_SEARCH_STAGE.time(stage = "filter"):
+                candidates = set(self.search_backend.filter_ids(db, name = name, category = category))
+            if not candidates:
+                return []
+        lexical, semantic = [], []
+        if lexical_weight:
+            with HYBRID_SEARCH_STAGE.time(stage = "lexical"):
+                lexical = self.lexical(db, q, name, category, depth, candidates)
+        if semantic_weight and query_vector is not None:
+            with HYBRID_SEARCH_STAGE.time(stage = "semantic"):
+                semantic = self.semantic(query_vector, depth, candidates)
+        with HYBRID_SEARCH_STAGE.time(stage = "fuse"):
+            fused = reciprocal_rank_fusion([lexical, semantic], [lexical_weight, semantic_weight], self.k)
+        return fused[skip:skip + limit]
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+try:
+    from backend.embeddings import encode_texts
+except ImportError:
+    from embeddings import encode_texts
+
+# micro-batching for query embeddings
+# instead of every request thread calling model.encode on its own (and all of them fighting
+# over torch's intra-op threads), requests drop their text on a bounded queue and a worker
+# thread encodes whatever has piled up in one batched call
+# a batch closes when it hits INFERENCE_MAX_BATCH texts or INFERENCE_MAX_WAIT_MS after the first arrived
+
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "256")) # past this we shed load (429)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "10")) # seconds a caller waits for its vector
+
+
+class QueueFull(Exception):
+    """ Raised when the inference queue is full; callers should back off and retry """
+
+
+class BatchEncoder:
+    def __init__(self, encode_fn, max_batch = INFERENCE_MAX_BATCH, max_wait_ms = INFERENCE_MAX_WAIT_MS,
+                 queue_size = INFERENCE_QUEUE_SIZE, workers = INFERENCE_WORKERS):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self._queue = queue.Queue(maxsize = queue_size)
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "max_batch_size": 0,
+            "batch_seconds": 0.0, # total time spent inside encode_fn
+            "wait_seconds": 0.0, # total time items sat in the queue before their batch ran
+            "rejected": 0,
+            "errors": 0,
+        }
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target = self._run, name = f"inference-{i}", daemon = True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None) # one stop sentinel per worker
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, text):
+        future = Future()
+        try:
+            self._queue.put_nowait((text, future, time.perf_counter()))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            raise QueueFull("inference queue is full")
+        return future
+
+    def encode(self, text, timeout = INFERENCE_TIMEOUT):
+        if not self._threads:
+            # not started (e.g. scripts importing the app); just encode inline
+            return self.encode_fn([text])[0]
+        return self.submit(text).result(timeout = timeout)
+
+    def _collect(self, first):
+        # gather more work until the batch is full or the wait window closes
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout = remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None) # leave the sentinel for the loop to see
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            # identical queries in the same batch (popular searches) are only encoded once
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            started = time.perf_counter()
+            try:
+                vectors = dict(zip(texts, self.encode_fn(texts)))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                continue
+            finished = time.perf_counter()
+            for text, future, _ in batch:
+                future.set_result(vectors[text])
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+                self._stats["batch_seconds"] += finished - started
+                self._stats["wait_seconds"] += sum(started - queued for _, _, queued in batch)
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches, items = stats["batches"], stats["items"]
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = items / batches if batches else 0.0
+        stats["avg_batch_ms"] = stats["batch_seconds"] * 1000 / batches if batches else 0.0
+        stats["avg_wait_ms"] = stats["wait_seconds"] * 1000 / items if items else 0.0
+        return stats
+
+
+query_encoder = BatchEncoder(encode_texts) # shared by every ai_search request
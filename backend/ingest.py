@@ -0,0 +1,200 @@
+import codecs
+import csv
+import json
+import os
+import time
+from pydantic import ValidationError
+from sqlalchemy import delete
+try:
+    from backend.models import Tool, ToolEmbedding, ToolNeighbor, dialect_insert
+    from backend.schemas import ToolCreate
+except ImportError:
+    from models import Tool, ToolEmbedding, ToolNeighbor, dialect_insert
+    from schemas import ToolCreate
+
+# bulk loading for POST /tools/bulk (and anything else that writes many tools at once)
+# rows are parsed and validated one at a time as the body streams in, and written in batches
+# with one multi-row INSERT ... ON CONFLICT (url) per batch instead of one transaction per tool
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+PARAMS_PER_ROW = 4 # name, description, category, url
+MAX_BATCH_SIZE = 10000 # Postgres allows 65535 bind params per statement
+SQLITE_MAX_PARAMS = 32766 # SQLite's default SQLITE_MAX_VARIABLE_NUMBER (since 3.32)
+MAX_REPORTED_ERRORS = 1000 # the rest are only counted, so a bad file can't blow up the response
+UPDATE_COLUMNS = ("name", "description", "category")
+
+
+def upsert_statement(dialect, rows, on_conflict = "update"):
+    """ One multi-row INSERT for the batch; returns the ids it inserted or updated """
+    insert = dialect_insert(dialect)
+    stmt = insert(Tool).values(rows)
+    if on_conflict == "nothing":
+        stmt = stmt.on_conflict_do_nothing(index_elements = ["url"])
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements = ["url"],
+            set_ = {column: stmt.excluded[column] for column in UPDATE_COLUMNS},
+        )
+    return stmt.returning(Tool.id)
+
+def delete_tools(db, ids, chunk_size = 1000):
+    """ Deletes tools with their embeddings and similar-tools rows, chunk_size ids per statement (no commit) """
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        # explicitly: SQLite doesn't cascade unless foreign keys are switched on
+        db.execute(delete(ToolEmbedding).where(ToolEmbedding.tool_id.in_(chunk)))
+        db.execute(delete(ToolNeighbor).where(ToolNeighbor.tool_id.in_(chunk) | ToolNeighbor.neighbor_id.in_(chunk)))
+        db.execute(delete(Tool).where(Tool.id.in_(chunk)))
+
+def validation_message(error):
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+async def iter_lines(chunks):
+    # split a streamed body into lines without holding more than one partial line
+    decoder = codecs.getincrementaldecoder("utf-8")(errors = "replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final = True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+async def iter_records(chunks, fmt):
+    """ Yields (row number, dict or None, parse error or None) for an NDJSON or CSV body """
+    if fmt == "csv":
+        header = None
+        pending, start = "", 0
+        number = 0
+        async for line in iter_lines(chunks):
+            number += 1
+            # a quoted field can span lines; keep reading until the quotes balance
+            if not pending:
+                start = number
+            pending = pending + "\n" + line if pending else line
+            if pending.count('"') % 2:
+                continue
+            record, pending = pending, ""
+            if not record.strip():
+                continue
+            values = next(csv.reader([record]))
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                continue
+            if len(values) != len(header):
+                yield start, None, f"expected {len(header)} columns, got {len(values)}"
+                continue
+            yield start, dict(zip(header, values)), None
+        if pending:
+            yield start, None, "unterminated quoted field"
+    else:
+        number = 0
+        async for line in iter_lines(chunks):
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield number, None, "expected a JSON object"
+                continue
+            yield number, record, None
+
+
+def max_batch_size(dialect):
+    # a batch over the bind param limit fails as a whole and drops to the row-by-row retry, so clamp below it
+    if dialect == "sqlite":
+        return min(MAX_BATCH_SIZE, SQLITE_MAX_PARAMS // PARAMS_PER_ROW)
+    return MAX_BATCH_SIZE
+
+
+class BulkIngest:
+    """
+    Collects validated rows and writes them a batch at a time.
+    Call add() per parsed row, flush() when ready() (and once at the end), then report().
+    """
+
+    def __init__(self, db, on_conflict = "update", batch_size = INGEST_BATCH_SIZE):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+        self.on_conflict = on_conflict
+        self.batch_size = max(1, min(batch_size, max_batch_size(self.dialect)))
+        self.batch = {} # url -> (row number, values); a url repeated within a batch keeps its last row
+        self.ids = [] # every tool id inserted or updated
+        self.received = 0
+        self.skipped = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def fail(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def add(self, row, record, error = None):
+        self.received += 1
+        if error:
+            self.fail(row, error)
+            return
+        try:
+            # null means "not given" (ToolCreate's optional fields are declared as `str = None`)
+            tool = ToolCreate(**{key: value for key, value in record.items() if value is not None})
+        except (ValidationError, TypeError) as e:
+            self.fail(row, validation_message(e) if isinstance(e, ValidationError) else str(e))
+            return
+        if tool.url in self.batch:
+            self.skipped += 1 # superseded by this later row
+        # description or None: CSV has no nulls, so an empty cell means no description
+        self.batch[tool.url] = (row, {"name": tool.name, "description": tool.description or None, "category": tool.category, "url": tool.url})
+
+    def ready(self):
+        return len(self.batch) >= self.batch_size
+
+    def flush(self):
+        if not self.batch:
+            return
+        rows = list(self.batch.values())
+        self.batch = {}
+        self.batches += 1
+        failed = self.failed
+        try:
+            ids = self._write([values for _, values in rows])
+        except Exception:
+            # something in the batch broke the statement; retry row by row to find (and report) it
+            self.db.rollback()
+            ids = []
+            for row, values in rows:
+                try:
+                    ids += self._write([values])
+                except Exception as e:
+                    self.db.rollback()
+                    self.fail(row, str(getattr(e, "orig", e)).strip())
+        # whatever wasn't written or rejected hit ON CONFLICT DO NOTHING
+        self.skipped += len(rows) - len(ids) - (self.failed - failed)
+        self.ids += ids
+
+    def _write(self, rows):
+        ids = [row.id for row in self.db.execute(upsert_statement(self.dialect, rows, self.on_conflict))]
+        self.db.commit()
+        return ids
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "received": self.received,
+            "written": len(self.ids),
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(self.received / elapsed, 1) if elapsed > 0 else None,
+            "errors": self.errors,
+        }
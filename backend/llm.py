@@ -0,0 +1,198 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+# the LLM the ingest scripts use to write tool descriptions, behind one small interface
+# so the scripts can run (and be benchmarked) against a local stub with no network or API key
+#   LLM_BACKEND=openai (default) | stub
+#   LLM_MODEL        model name for the openai backend
+#   OPENAI_BASE_URL  point the openai backend at any OpenAI-compatible server (e.g. a local fake)
+#   LLM_STUB_LATENCY seconds the stub sleeps per call, to mimic a real API
+#   LLM_MAX_RPM / LLM_MAX_TPM   request and (estimated) token budget per minute for LimitedClient; 0 = unlimited
+#   LLM_RETRIES      attempts after the first for rate-limit/server/network errors
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0.2"))
+LLM_MAX_RPM = float(os.getenv("LLM_MAX_RPM", "500"))
+LLM_MAX_TPM = float(os.getenv("LLM_MAX_TPM", "90000"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "5"))
+SYSTEM_PROMPT = "You are an API documentation assistant."
+REPLY_TOKENS = 150 # what we budget for a short description on top of the prompt
+
+
+class LLMClient:
+    name = None
+
+    def complete(self, prompt, system = SYSTEM_PROMPT):
+        """ Returns the model's reply text; raises on failure """
+        raise NotImplementedError
+
+
+class OpenAIClient(LLMClient):
+    name = "openai"
+
+    def __init__(self, model = LLM_MODEL, api_key = None, base_url = None):
+        import openai # only needed for this backend
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        if not api_key and not base_url:
+            raise ValueError("OPENAI_API_KEY environment variable not set!")
+        self.model = model
+        # retries (and rate limiting) are LimitedClient's job, so the SDK doesn't retry underneath it
+        self.client = openai.OpenAI(api_key = api_key or "unused", base_url = base_url, max_retries = 0)
+
+    def complete(self, prompt, system = SYSTEM_PROMPT):
+        response = self.client.chat.completions.create(
+            model = self.model,
+            messages = [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+        )
+        return response.choices[0].message.content
+
+
+class StubClient(LLMClient):
+    """ Deterministic canned replies after a fixed delay; no network """
+    name = "stub"
+
+    def __init__(self, latency = LLM_STUB_LATENCY):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock() # the generation pool calls this from many threads; += isn't atomic
+
+    def complete(self, prompt, system = SYSTEM_PROMPT):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Stub description {digest}."
+
+
+class RateLimiter:
+    """
+    Token buckets for requests/minute and tokens/minute, shared by every thread using the client.
+    acquire() blocks until both budgets allow the call.
+    """
+
+    def __init__(self, requests_per_minute = LLM_MAX_RPM, tokens_per_minute = LLM_MAX_TPM):
+        self.rates = (requests_per_minute / 60, tokens_per_minute / 60) # refill per second
+        self.capacity = (requests_per_minute, tokens_per_minute)
+        self.available = list(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens = 1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed, self.updated = now - self.updated, now
+                wait = 0.0
+                need = (1, tokens)
+                for i in (0, 1):
+                    if not self.capacity[i]:
+                        continue # unlimited
+                    self.available[i] = min(self.capacity[i], self.available[i] + elapsed * self.rates[i])
+                    # a single call bigger than the whole budget would wait forever; let it through at full capacity
+                    want = min(need[i], self.capacity[i])
+                    if self.available[i] < want:
+                        wait = max(wait, (want - self.available[i]) / self.rates[i])
+                if not wait:
+                    for i in (0, 1):
+                        if self.capacity[i]:
+                            self.available[i] -= min(need[i], self.capacity[i])
+                    return
+            time.sleep(wait)
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1 # ~4 characters per token for English; good enough for budgeting
+
+def is_retryable(error):
+    # rate limits, server errors, timeouts and dropped connections are worth another try; bad requests aren't
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class LimitedClient(LLMClient):
+    """ Wraps another client with the shared rate limit and retries with exponential backoff + jitter """
+
+    def __init__(self, client, limiter = None, retries = LLM_RETRIES, backoff = 1.0, max_backoff = 60.0):
+        self.client = client
+        self.name = client.name
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.calls = 0
+        self.retried = 0
+        self._lock = threading.Lock() # guards the counters, which every worker thread bumps
+
+    def complete(self, prompt, system = SYSTEM_PROMPT):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(estimate_tokens(system + prompt) + REPLY_TOKENS)
+            with self._lock:
+                self.calls += 1
+            try:
+                return self.client.complete(prompt, system)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+class CompletionCache:
+    """
+    Generated text by key, persisted in a small SQLite file so reruns (and other scripts) reuse it.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread = False)
+        with self._lock:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL)")
+            self.conn.commit()
+
+    @staticmethod
+    def normalize(name):
+        # "GitHub API", " github-api " and "Github_API" all describe the same thing
+        return " ".join(re.sub(r"[\W_]+", " ", name.lower()).split())
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500): # stay under SQLite's bind parameter limit
+                chunk = keys[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM completions WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update(rows)
+        return found
+
+    def set(self, key, value):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?)", (key, value, time.time()))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def make_llm_client(backend = None, **kwargs):
+    backend = backend or LLM_BACKEND
+    if backend == "stub":
+        return StubClient(**kwargs)
+    if backend == "openai":
+        return OpenAIClient(**kwargs)
+    raise ValueError(f"Unknown LLM backend {backend!r} (expected openai or stub)")
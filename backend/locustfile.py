@@ -1,18 +1,152 @@
+import json
+import os
+import random
+import uuid
 from locust import HttpUser, task, between
+try:
+    from backend.benchmarks.sessions import session_cookie, SESSION_COOKIE
+except ImportError:
+    from benchmarks.sessions import session_cookie, SESSION_COOKIE
 # locust performance test to simulate multiple users making API requests to see how well my API performs under load
 # HttpUser is a simulated user
-# task is a decorator to mark methods as tasks that the user will perform
+# task is a decorator to mark methods as tasks that the user will perform; @task(n) makes it n times as likely
 # between is making users randomly wait between x and y seconds before their next request
+#
+# kinds of users, mixed by weight (default ~10 readers per editor):
+#   Reader  browsing, deep pagination (offset and cursor), keyword + semantic search, detail pages, profile
+#   Editor  create / update / delete its own tools and small bulk uploads
+#   Member  a logged-in user (only with LOAD_USERS > 0): reads its profile on every page, then browses
+# load a catalog first so there is something to read (ids 1..LOAD_CATALOG_ROWS are assumed to exist):
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.synthetic_catalog --rows 100000 --embed
+# for Members, also users (ids 1..LOAD_USERS) and the server's SESSION_SECRET_KEY, to sign their session cookies;
+# db_queries_per_request{route="/auth/profile"} in /metrics then shows how many lookups the user cache saves
+#   DATABASE_URL=sqlite:///bench.db python -m backend.benchmarks.synthetic_catalog --rows 100000 --users 1000
+#   LOAD_USERS=1000 SESSION_SECRET_KEY=... locust -f backend/locustfile.py --host http://localhost:8000 ...
+#   LOAD_CATALOG_ROWS=100000 locust -f backend/locustfile.py --host http://localhost:8000 \
+#       --headless -u 200 -r 20 -t 3m --csv results/locust   # results/locust_stats.csv for regression tracking
+# requests are grouped by route template (name=...), so the stats line up with /metrics
 
+CATALOG_ROWS = int(os.getenv("LOAD_CATALOG_ROWS", "10000"))
+WAIT_MIN = float(os.getenv("LOAD_WAIT_MIN", "1"))
+WAIT_MAX = float(os.getenv("LOAD_WAIT_MAX", "5"))
+LOAD_USERS = int(os.getenv("LOAD_USERS", "0"))
 
-class MyUser(HttpUser):
-    wait_time = between(1, 5)
+# terms that hit the synthetic catalog's vocabulary (see benchmarks/synthetic_catalog.py), plus a few misses
+KEYWORDS = ("weather", "forecast", "stock", "recipe", "music", "track", "crypto", "coin", "address", "email",
+            "photo", "video", "news", "game", "login", "token", "flight", "dataset", "zzzz-no-match")
+CATEGORIES = ("Weather", "Finance", "Music", "Food & Drink", "Geocoding", "Security", "Development", "Video")
+QUESTIONS = (
+    "weather forecast for my city", "convert between currencies", "look up song lyrics", "check if an email is valid",
+    "real time stock prices", "find recipes by ingredient", "translate words", "track flights", "detect malware",
+    "free news headlines api", "sports scores live", "geocode an address",
+)
 
-    @task
+
+class Reader(HttpUser):
+    weight = 10
+    wait_time = between(WAIT_MIN, WAIT_MAX)
+
+    def on_start(self):
+        self.cursor = ""
+
+    @task(10)
     def list_tools(self):
-        self.client.get("/tools?skip=0&limit=10")
-        
+        self.client.get("/tools?skip=0&limit=10", name = "/tools")
+
+    @task(2)
+    def deep_offset_page(self):
+        skip = random.randrange(0, max(CATALOG_ROWS - 10, 1))
+        self.client.get(f"/tools?skip={skip}&limit=10", name = "/tools?skip=deep")
+
+    @task(3)
+    def cursor_walk(self):
+        # keep paging forward with X-Next-Cursor, starting over at the end
+        response = self.client.get("/tools", params = {"cursor": self.cursor, "limit": 50}, name = "/tools?cursor")
+        self.cursor = response.headers.get("X-Next-Cursor", "")
+
+    @task(8)
+    def read_tool(self):
+        self.client.get(f"/tools/{random.randint(1, CATALOG_ROWS)}", name = "/tools/{tool_id}")
 
-    @task
+    @task(8)
     def search_tools(self):
-        self.client.get("/tools/search?name=football&category=Public%20APIs&limit=10")
\ No newline at end of file
+        params = {"name": random.choice(KEYWORDS), "limit": 10}
+        if random.random() < 0.3:
+            params["category"] = random.choice(CATEGORIES)
+        self.client.get("/tools/search", params = params, name = "/tools/search")
+
+    @task(4)
+    def ai_search(self):
+        self.client.get("/tools/ai_search", params = {"q": random.choice(QUESTIONS), "top_k": 5}, name = "/tools/ai_search")
+
+    @task(1)
+    def profile(self):
+        # anonymous users get 401, which is the expected answer here
+        with self.client.get("/auth/profile", name = "/auth/profile", catch_response = True) as response:
+            if response.status_code in (200, 401):
+                response.success()
+
+
+class Editor(HttpUser):
+    weight = 1
+    wait_time = between(WAIT_MIN, WAIT_MAX)
+
+    def on_start(self):
+        self.prefix = f"load-{uuid.uuid4().hex[:8]}"
+        self.created = []
+
+    def new_tool(self):
+        n = random.randrange(10 ** 9)
+        return {
+            "name": f"{self.prefix} tool {n}",
+            "description": f"Load test tool {n}. {random.choice(QUESTIONS).capitalize()}.",
+            "category": random.choice(CATEGORIES),
+            "url": f"https://{self.prefix}.load.example/{n}",
+        }
+
+    @task(3)
+    def create_tool(self):
+        response = self.client.post("/tools", json = self.new_tool(), name = "/tools [POST]")
+        if response.status_code == 200:
+            self.created.append(response.json()["id"])
+
+    @task(2)
+    def update_tool(self):
+        if self.created:
+            tool_id = random.choice(self.created)
+            self.client.put(f"/tools/{tool_id}", json = {"description": f"Updated {random.random()}"}, name = "/tools/{tool_id} [PUT]")
+
+    @task(1)
+    def delete_tool(self):
+        if self.created:
+            tool_id = self.created.pop(random.randrange(len(self.created)))
+            self.client.delete(f"/tools/{tool_id}", name = "/tools/{tool_id} [DELETE]")
+
+    @task(1)
+    def bulk_upload(self):
+        body = "".join(json.dumps(self.new_tool()) + "\n" for _ in range(100))
+        self.client.post("/tools/bulk", data = body, headers = {"Content-Type": "application/x-ndjson"}, name = "/tools/bulk")
+
+
+class Member(HttpUser):
+    abstract = not LOAD_USERS # locust skips it unless there are users to log in as
+    weight = 5
+    wait_time = between(WAIT_MIN, WAIT_MAX)
+
+    def on_start(self):
+        # "log in" as one of the synthetic users with a cookie signed like the server's SessionMiddleware would
+        self.user_id = random.randint(1, max(LOAD_USERS, 1))
+        self.client.cookies.set(SESSION_COOKIE, session_cookie(os.environ["SESSION_SECRET_KEY"], {"user_id": self.user_id}))
+
+    @task(5)
+    def profile(self):
+        # what the frontend asks on every page load
+        self.client.get("/auth/profile", name = "/auth/profile [member]")
+
+    @task(3)
+    def list_tools(self):
+        self.client.get("/tools?skip=0&limit=10", name = "/tools")
+
+    @task(2)
+    def read_tool(self):
+        self.client.get(f"/tools/{random.randint(1, CATALOG_ROWS)}", name = "/tools/{tool_id}")
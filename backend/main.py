@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, BackgroundTasks
 # FastAPI creates the API application
 # Depends handles dependency injection
 # HTTPException is used to handle errors
@@ -14,18 +14,95 @@ from backend.models import SessionLocal, Tool, Base, engine
 import uvicorn
 # ASGI server (???) to run the FastAPI app
 # asynchronous server gateway interface -- allows Python web apps to multithread basically (async funcs.)
-from backend.schemas import ToolCreate, ToolUpdate, ToolResponse
+from backend.schemas import ToolCreate, ToolUpdate, ToolResponse, SuggestResponse, FacetResponse
 # our Pydantic schemas
-from typing import List, Optional
+from typing import List, Optional, Literal
 # type hints for query parameters
-from sentence_transformers import SentenceTransformer, util
-import torch
+from backend.embeddings import index as embedding_index, embed_tool, delete_embedding, sync_embeddings, encode_texts, model_loaded, EMBEDDING_BACKEND, EMBEDDING_RELOAD_SECONDS
+# precomputed tool embeddings + the in-memory matrix we search against
+from backend.inference import query_encoder, QueueFull
+from concurrent.futures import TimeoutError as InferenceTimeout
+# query_encoder batches concurrent query encodings into one model call
+from backend.search_backend import make_search_backend
+from backend.pagination import encode_cursor, decode_cursor
+from backend.cache import response_cache, catalog_version, bump_catalog_version, CachedResponse
+# read-through cache for the GET tool endpoints, invalidated by bumping the catalog version on writes
+from backend.ingest import BulkIngest, iter_records, INGEST_BATCH_SIZE, MAX_BATCH_SIZE
+# streamed, batched upserts for POST /tools/bulk
+from backend.async_db import run_db, dispose_async_engine
+# run_db(fn) runs fn(session) on the threadpool, or on an AsyncSession with DB_ASYNC=1
+from backend.serialization import TOOL_COLUMNS, tool_row, tools_json, tool_json, dumps
+# list endpoints select only the response columns and encode the rows straight to JSON bytes
+from backend.metrics import registry as metrics_registry, MetricsMiddleware, Gauge, AI_SEARCH_STAGE
+# Prometheus metrics: per-route latency, SQL per request, ai_search stages
+from backend.hybrid_search import HybridSearch, HYBRID_LEXICAL_WEIGHT, HYBRID_SEMANTIC_WEIGHT
+# keyword + semantic ranking fused with reciprocal rank fusion, filters applied first
+from backend.similar import similar_ids, scan_similar, update_neighbors, remove_neighbors, SIMILAR_K
+# precomputed k-NN graph behind /tools/{tool_id}/similar, kept up to date on writes
+from backend.export import export_chunks, export_filename, MEDIA_TYPES as EXPORT_MEDIA_TYPES
+# streamed NDJSON/CSV dumps of the catalog
+from backend.suggest import index as suggest_index, SUGGEST_MAX_LIMIT, SUGGEST_REBUILD_AFTER
+# in-memory prefix index over tool names and categories for /tools/suggest
+from backend.facets import CategoryFacets, FACETS_MAX_LIMIT
+# per-category tool counts for /tools/facets, kept current by triggers on the tools table
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+import threading
 import os
+import numpy as np
 
 Base.metadata.create_all(bind = engine) # creates database tables if they don't exist
 # bind = engine tells SQLAlchemy to create all tables inside the DB connected to engine
-app = FastAPI(title = "Tool Hub Aggregator API") # initializing the FastAPI app
+search_backend = make_search_backend(engine) # indexed keyword search for /tools/search
+hybrid = HybridSearch(search_backend, embedding_index)
+category_facets = CategoryFacets(engine, search_backend) # creates the count triggers (and fills the counts) on first start
+
+# background = load the model + index in a thread at startup (default)
+# lazy = only load the index at startup; the model loads on the first request that needs it
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "background")
+
+def warm_up_search():
+    # embed anything new/changed, load every vector into memory, then (optionally) the model
+    # runs off the event loop, so /tools etc. are served while this is still going
+    db = SessionLocal()
+    try:
+        embedding_index.load(db)
+        if EMBEDDING_WARMUP == "background":
+            encode_texts(["warm up"]) # loads the model and pays for the first (slow) forward pass
+    except Exception as e:
+        print(f"Search warm-up failed: {e}")
+    finally:
+        db.close()
+
+def watch_embeddings(stop):
+    # a private index doesn't see vectors the ingest scripts wrote (the shared store does, via its log);
+    # poll the embeddings version they bump and reload when it moves
+    while not stop.wait(EMBEDDING_RELOAD_SECONDS):
+        db = SessionLocal()
+        try:
+            if embedding_index.reload_if_changed(db):
+                bump_catalog_version(db) # cached ai_search results were ranked against the old vectors
+        except Exception as e:
+            print(f"Reloading tool embeddings failed: {e}")
+        finally:
+            db.close()
+
+@asynccontextmanager
+async def lifespan(app):
+    query_encoder.start()
+    stop_watching = threading.Event()
+    threading.Thread(target = warm_up_search, name = "search-warmup", daemon = True).start()
+    if EMBEDDING_RELOAD_SECONDS > 0:
+        threading.Thread(target = watch_embeddings, args = (stop_watching,), name = "embedding-reload", daemon = True).start()
+    suggest_index.rebuild_async() # its own thread (no model needed, so it doesn't wait for search), serialized with write-triggered rebuilds
+    yield
+    stop_watching.set()
+    query_encoder.stop()
+    await dispose_async_engine()
+
+app = FastAPI(title = "Tool Hub Aggregator API", lifespan = lifespan) # initializing the FastAPI app
 
 SECRET_KEY = os.getenv("SESSION_SECRET_KEY")
 if not SECRET_KEY:
@@ -42,10 +119,11 @@ app.add_middleware(
     allow_origins = ["http://localhost:8080"], # allow all origins, can change for production
     allow_credentials = True, # allow cookies
     allow_methods = ["*"], # allow all methods
-    allow_headers = ["*"] # allow all headers
+    allow_headers = ["*"], # allow all headers
+    expose_headers = ["X-Next-Cursor"], # cursor pagination hands the next cursor back in this header; let the frontend read it
 )
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+app.add_middleware(MetricsMiddleware) # added last, so it's outermost and times the whole stack
 
 def get_db():
     db = SessionLocal() # create the session
@@ -59,100 +137,390 @@ def get_db():
 # that's why we use Depends(get_db), because the func. doesn't have to create it
 
 # @ is a decorator, a function modifying another. It tells FastAPI to run the function below when accessing the endpoint above
+def parse_cursor(cursor, size):
+    try:
+        return decode_cursor(cursor, size)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+
+def next_cursor_headers(rows, limit, *key):
+    # a full page means there may be more; the client passes this back as ?cursor=
+    if rows and len(rows) == limit and limit > 0:
+        return {"X-Next-Cursor": encode_cursor(*key)}
+    return {}
+
+def cached_response(request, db, endpoint, params, compute):
+    # compute(db) -> (body bytes, extra headers); only runs on a miss
+    # the key includes the catalog version, so any write makes every older entry unreachable
+    key = response_cache.key(catalog_version.get(db), endpoint, params)
+    entry = response_cache.get(key)
+    status = "HIT"
+    if entry is None:
+        body, headers = compute(db)
+        entry = CachedResponse(body, headers)
+        response_cache.set(key, entry)
+        status = "MISS"
+    headers = {**entry.headers, "ETag": entry.etag, "X-Cache": status}
+    # clients holding the same body can skip the download entirely
+    if entry.matches(request.headers.get("if-none-match")):
+        return Response(status_code = 304, headers = headers)
+    return Response(entry.body, media_type = "application/json", headers = headers)
+
+def normalize_term(term):
+    # "  Fast " and "fast" run the same (case-insensitive) search, so they share a cache entry
+    return " ".join(term.split()).lower() if term else None
+
 @app.get("/tools", response_model = List[ToolResponse]) # this is an GET endpoint
-def read_tools(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    # Depends(get_db) is used to inject db into these functions
+async def read_tools(
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = Query(None, description = "Keyset pagination: pass an empty value for the first page, then X-Next-Cursor"),
+):
+    # run_db hands compute a session (see async_db.py), so the event loop never waits on the database
     # skip is pagination offset, default 0; ignore skip rows
     # limit is max no. of results
     # e.g. offset(10).limit(5) returns rows 11-15
-    tools = db.query(Tool).offset(skip).limit(limit).all()
-    # queries with offset of 0 and allows 10 results
-    return tools # this is a list
+    after = parse_cursor(cursor, 1) if cursor is not None else None
+    def compute(db):
+        if cursor is not None:
+            # keyset mode: WHERE id > last id seen, so deep pages cost the same as page 1
+            query = db.query(*TOOL_COLUMNS).order_by(Tool.id)
+            if after:
+                query = query.filter(Tool.id > after[0])
+            tools = query.limit(limit).all()
+            return tools_json(tools), next_cursor_headers(tools, limit, tools[-1].id if tools else None)
+        tools = db.query(*TOOL_COLUMNS).order_by(Tool.id).offset(skip).limit(limit).all()
+        # queries with offset of 0 and allows 10 results
+        return tools_json(tools), {}
+    params = {"skip": skip, "limit": limit, "cursor": cursor}
+    return await run_db(lambda db: cached_response(request, db, "tools", params, compute))
+
+@app.get("/tools/export")
+def export_tools(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = Query(False, description = "Compress on the fly; the file is then tools.<format>.gz"),
+):
+    # streamed straight off a server-side cursor, so memory stays flat however big the catalog is
+    # (declared before /tools/{tool_id} so "export" isn't parsed as an id)
+    filename = export_filename(format, gzip)
+    return StreamingResponse(
+        export_chunks(format, gzip),
+        media_type = "application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @app.get("/tools/search", response_model = List[ToolResponse])
-def search_tools(
+async def search_tools(
+    request: Request,
     name: Optional[str] = None,
     category: Optional[str] = None,
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description = "Keyset pagination: pass an empty value for the first page, then X-Next-Cursor"),
 ):
-    query = db.query(Tool)
-    if name:
-        query = query.filter(Tool.name.ilike(f"%{name}%"))
-        # ilike (SQL-based partial matching)
-        # a case insensitive search
-        # e.g. %fast% matches FastAPI, fast, FAST TOOLS
-    if category:
-        query = query.filter(Tool.category.ilike(f"%{category}%"))
-    tools = query.offset(skip).limit(limit).all()
-    return tools
+    # the search backend uses an index (pg_trgm/tsvector on Postgres, FTS5 on SQLite)
+    # and hands back ids best-match first, e.g. "fast" matches FastAPI, fast, FAST TOOLS
+    after = parse_cursor(cursor, 2) if cursor is not None else None
+    name, category = normalize_term(name), normalize_term(category)
+    def compute(db):
+        ranked = search_backend.search(db, name = name, category = category, skip = skip, limit = limit, after = after)
+        headers = {}
+        if cursor is not None and ranked:
+            last_id, last_rank = ranked[-1]
+            headers = next_cursor_headers(ranked, limit, last_rank, last_id)
+        ids = [tool_id for tool_id, _ in ranked]
+        tools_by_id = {tool.id: tool for tool in db.query(*TOOL_COLUMNS).filter(Tool.id.in_(ids)).all()}
+        return tools_json([tools_by_id[tool_id] for tool_id in ids if tool_id in tools_by_id]), headers
+    params = {"name": name, "category": category, "skip": skip, "limit": limit, "cursor": cursor}
+    return await run_db(lambda db: cached_response(request, db, "search", params, compute))
+
+@app.get("/tools/suggest", response_model = SuggestResponse)
+async def suggest_tools(
+    prefix: str = Query(..., description = "What has been typed so far; matches the start of any word"),
+    limit: int = Query(10, ge = 1, le = SUGGEST_MAX_LIMIT),
+    categories: int = Query(3, ge = 0, le = SUGGEST_MAX_LIMIT, description = "How many matching categories to include"),
+):
+    # typeahead: answered from memory (see suggest.py) with no database round trip, so it runs on the
+    # event loop directly and isn't put through the response cache
+    if not suggest_index.loaded:
+        raise HTTPException(status_code = 503, detail = "Suggestions are still loading", headers = {"Retry-After": "5"})
+    tools, found = suggest_index.suggest(prefix, limit, categories)
+    return Response(dumps({
+        "tools": [{"id": tool_id, "name": name, "category": category} for tool_id, name, category in tools],
+        "categories": [{"name": name, "count": count} for name, count in found],
+    }), media_type = "application/json")
+
+@app.get("/tools/facets", response_model = FacetResponse)
+async def tool_facets(
+    request: Request,
+    name: Optional[str] = Query(None, description = "Only count tools whose name contains this"),
+    category: Optional[str] = Query(None, description = "Only list categories containing this"),
+    limit: int = Query(100, ge = 1, le = FACETS_MAX_LIMIT),
+):
+    # without ?name= this reads the maintained counts (one small table, see facets.py);
+    # with it, the matching tools are grouped per request, and then cached like any other search
+    name, category = normalize_term(name), normalize_term(category)
+    def compute(db):
+        counts = category_facets.counts(db, name = name, category = category, limit = limit)
+        return dumps({"categories": [{"name": facet, "count": count} for facet, count in counts]}), {}
+    params = {"name": name, "category": category, "limit": limit}
+    return await run_db(lambda db: cached_response(request, db, "facets", params, compute))
+
+def encode_search_query(q):
+    try:
+        return query_encoder.encode(q)
+    except QueueFull:
+        raise HTTPException(status_code = 429, detail = "Search is busy, try again shortly", headers = {"Retry-After": "1"})
+    except InferenceTimeout:
+        raise HTTPException(status_code = 503, detail = "Search timed out")
 
 @app.get("/tools/ai_search", response_model = List[ToolResponse])
 def ai_search(
+    request: Request,
     q: str = Query(..., description = "Search query"),
     top_k: int = Query(5, description = "Number of results to return"),
     db: Session = Depends(get_db)
     ):
-    # get all tools
-    tools = db.query(Tool).all()
-    if not tools:
+    if not embedding_index.loaded:
+        raise HTTPException(status_code = 503, detail = "Search index is still loading", headers = {"Retry-After": "5"})
+    if len(embedding_index) == 0:
         raise HTTPException(status_code = 404, detail = "No tools found")
-    # prep text for each tool (usu. description preferred)
-    tool_texts = [tool.description if tool.description else tool.name for tool in tools]
-    # computing embeddings
-    tool_embeddings = model.encode(tool_texts, convert_to_tensor = True)
-    query_embedding = model.encode(q, convert_to_tensor = True)
-    # calculate cosine simularity scores
-    cosine_scores = util.cos_sim(query_embedding, tool_embeddings)[0]
-    # the top-k indices
-    top_results = torch.topk(cosine_scores, k = top_k)
-    top_indices = top_results.indices.tolist()
-    # retrieve the corresponding objects
-    top_tools = [tools[i] for i in top_indices]
-    return top_tools
+    # stays a threadpool handler: it blocks on the query encoder, not just the database
+    def compute(db):
+        # tool embeddings are precomputed, so we only encode the query
+        # (queued and batched with whatever other searches are in flight)
+        with AI_SEARCH_STAGE.time(stage = "encode"): # includes the wait for a batch slot
+            query_embedding = encode_search_query(q)
+        # cosine similarity against every tool in one matrix-vector product, best top_k first
+        with AI_SEARCH_STAGE.time(stage = "topk"):
+            top_results = embedding_index.search(query_embedding, top_k)
+        top_ids = [tool_id for tool_id, _ in top_results]
+        # retrieve the corresponding objects, keeping the ranking order
+        with AI_SEARCH_STAGE.time(stage = "fetch"):
+            tools_by_id = {tool.id: tool for tool in db.query(*TOOL_COLUMNS).filter(Tool.id.in_(top_ids)).all()}
+        top_tools = [tools_by_id[tool_id] for tool_id in top_ids if tool_id in tools_by_id]
+        return tools_json(top_tools), {}
+    # repeated queries skip the model entirely
+    return cached_response(request, db, "ai_search", {"q": normalize_term(q), "top_k": top_k}, compute)
 
+@app.get("/tools/hybrid_search", response_model = List[ToolResponse])
+def hybrid_search(
+    request: Request,
+    q: str = Query(..., description = "Search query"),
+    category: Optional[str] = Query(None, description = "Only tools whose category contains this"),
+    name: Optional[str] = Query(None, description = "Only tools whose name contains this"),
+    skip: int = Query(0, ge = 0),
+    limit: int = Query(10, ge = 1, le = 100),
+    lexical_weight: float = Query(HYBRID_LEXICAL_WEIGHT, ge = 0, description = "Weight of the keyword ranking in the fusion"),
+    semantic_weight: float = Query(HYBRID_SEMANTIC_WEIGHT, ge = 0, description = "Weight of the embedding ranking in the fusion"),
+    db: Session = Depends(get_db)
+    ):
+    # filters shrink the candidate set first, then keyword and embedding rankings of what's left are fused
+    # (see hybrid_search.py); semantic_weight=0 skips the model, so it also works while the index loads
+    if semantic_weight and not embedding_index.loaded:
+        raise HTTPException(status_code = 503, detail = "Search index is still loading", headers = {"Retry-After": "5"})
+    q, category, name = normalize_term(q), normalize_term(category), normalize_term(name)
+    def compute(db):
+        query_embedding = encode_search_query(q) if semantic_weight else None
+        ranked = hybrid.search(db, q, query_embedding, name = name, category = category, skip = skip, limit = limit,
+                               lexical_weight = lexical_weight, semantic_weight = semantic_weight)
+        ids = [tool_id for tool_id, _ in ranked]
+        tools_by_id = {tool.id: tool for tool in db.query(*TOOL_COLUMNS).filter(Tool.id.in_(ids)).all()}
+        return tools_json([tools_by_id[tool_id] for tool_id in ids if tool_id in tools_by_id]), {}
+    params = {"q": q, "category": category, "name": name, "skip": skip, "limit": limit,
+              "lexical_weight": lexical_weight, "semantic_weight": semantic_weight}
+    return cached_response(request, db, "hybrid_search", params, compute)
+
+@app.get("/health")
+def health():
+    # liveness: the process is up and serving
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def ready():
+    # readiness: ai_search can answer (index loaded, and the model too unless we're loading it lazily)
+    status = {
+        "index_loaded": embedding_index.loaded,
+        "model_loaded": model_loaded(),
+        "embedding_backend": EMBEDDING_BACKEND,
+    }
+    status["ready"] = status["index_loaded"] and (status["model_loaded"] or EMBEDDING_WARMUP == "lazy")
+    return JSONResponse(status, status_code = 200 if status["ready"] else 503)
+
+@app.get("/inference/stats")
+def inference_stats():
+    # batch sizes, time in the model, queue wait and rejections for the query encoder
+    return query_encoder.metrics()
 
 @app.get("/tools/{tool_id}", response_model = ToolResponse)
-def read_tool(tool_id: int, db: Session = Depends(get_db)):
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
-    if tool is None:
-        raise HTTPException(status_code = 404, detail = "Tool not found")
-    return tool
+async def read_tool(tool_id: int, request: Request):
+    def compute(db):
+        tool = db.query(*TOOL_COLUMNS).filter(Tool.id == tool_id).first()
+        if tool is None:
+            raise HTTPException(status_code = 404, detail = "Tool not found") # errors aren't cached
+        return tool_json(tool), {}
+    return await run_db(lambda db: cached_response(request, db, "tool", {"id": tool_id}, compute))
+
+@app.get("/tools/{tool_id}/similar", response_model = List[ToolResponse])
+def similar_tools(
+    tool_id: int,
+    request: Request,
+    limit: int = Query(SIMILAR_K, ge = 1, le = SIMILAR_K, description = "At most SIMILAR_K (the neighbours stored per tool)"),
+    db: Session = Depends(get_db)
+    ):
+    # normally k rows off the tool_neighbors primary key (see similar.py); a threadpool handler because
+    # a tool without a list yet (graph not built) falls back to scanning the index once
+    def compute(db):
+        neighbors = similar_ids(db, tool_id, limit)
+        source = "graph"
+        if not neighbors:
+            if db.query(Tool.id).filter(Tool.id == tool_id).first() is None:
+                raise HTTPException(status_code = 404, detail = "Tool not found")
+            neighbors = scan_similar(embedding_index, tool_id, limit)
+            source = "scan"
+        ids = [neighbor_id for neighbor_id, _ in neighbors]
+        tools_by_id = {tool.id: tool for tool in db.query(*TOOL_COLUMNS).filter(Tool.id.in_(ids)).all()}
+        return tools_json([tools_by_id[i] for i in ids if i in tools_by_id]), {"X-Similar-Source": source}
+    return cached_response(request, db, "similar", {"id": tool_id, "limit": limit}, compute)
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format; point a scrape job at every worker
+    return Response(metrics_registry.render(), media_type = "text/plain; version=0.0.4")
+
+# state owned by other modules, read at scrape time
+for name, help, kind, callback in (
+    ("response_cache_hits_total", "Response cache hits", "counter", lambda: response_cache.stats()["hits"]),
+    ("response_cache_misses_total", "Response cache misses", "counter", lambda: response_cache.stats()["misses"]),
+    ("response_cache_entries", "Entries in the response cache", "gauge", lambda: response_cache.stats()["entries"]),
+    ("inference_queue_depth", "Queries waiting to be encoded", "gauge", lambda: query_encoder.metrics()["queue_depth"]),
+    ("inference_batches_total", "Encoder batches run", "counter", lambda: query_encoder.metrics()["batches"]),
+    ("inference_rejected_total", "Queries rejected because the encoder queue was full", "counter", lambda: query_encoder.metrics()["rejected"]),
+    ("embedding_index_size", "Vectors in the search index", "gauge", lambda: len(embedding_index)),
+    ("suggest_index_size", "Tool names in the suggestion index", "gauge", lambda: len(suggest_index)),
+):
+    metrics_registry.register(Gauge(name, help, callback, kind = kind))
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {**response_cache.stats(), "catalog_version": catalog_version.version}
+
+def index_tool(tool_id):
+    # (re)embed one tool and refresh the search index; runs after the response is sent, since it may load and run
+    # the model. The write already bumped the catalog version, so a failure here only leaves search a step behind
+    db = SessionLocal()
+    try:
+        db_tool = db.query(Tool).filter(Tool.id == tool_id).first()
+        if db_tool is None:
+            suggest_index.remove(tool_id)
+            delete_embedding(db, tool_id)
+            embedding_index.remove(tool_id)
+            remove_neighbors(db, embedding_index, tool_id) # refill the similar lists that had it
+        else:
+            suggest_index.upsert(tool_id, db_tool.name, db_tool.category)
+            _, previous = embedding_index.lookup([tool_id])
+            vector = embed_tool(db, db_tool) # only re-encodes if the text changed
+            embedding_index.upsert(db_tool.id, vector)
+            if not (len(previous) and np.array_equal(previous[0], vector)):
+                update_neighbors(db, embedding_index, tool_id, vector) # new or moved: patch the similar-tools graph
+        bump_catalog_version(db) # again, so cached ai_search results pick the new vector up
+    except Exception as e:
+        print(f"Indexing tool {tool_id} failed: {e}")
+    finally:
+        db.close()
 
 @app.post("/tools", response_model = ToolResponse)
-def create_tool(tool: ToolCreate, db: Session = Depends(get_db)):
-    # convert tool into an SQLAlchemy object
-    db_tool = Tool(name = tool.name, description = tool.description, category = tool.category, url = tool.url)
-    db.add(db_tool)
-    db.commit() # writes to DB but doesn't get auto-updated with autu-generated fields like id
-    db.refresh(db_tool) # reloads the object to ensure defaults are included
-    return db_tool
+async def create_tool(tool: ToolCreate, background_tasks: BackgroundTasks):
+    def insert(db):
+        # convert tool into an SQLAlchemy object
+        db_tool = Tool(name = tool.name, description = tool.description, category = tool.category, url = tool.url)
+        db.add(db_tool)
+        db.commit() # writes to DB but doesn't get auto-updated with autu-generated fields like id
+        db.refresh(db_tool) # reloads the object to ensure defaults are included
+        bump_catalog_version(db) # drop cached responses as soon as the row is committed
+        return tool_row(db_tool)
+    created = await run_db(insert)
+    background_tasks.add_task(index_tool, created["id"]) # make it searchable, without the client waiting on the model
+    return created
+
+def embed_bulk_ingest(ids):
+    # runs after the bulk response is sent: embed whatever changed and make it searchable
+    db = SessionLocal()
+    try:
+        if len(ids) >= SUGGEST_REBUILD_AFTER:
+            suggest_index.rebuild_async(again = True) # cheaper than patching in a big load row by row
+        else:
+            for tool_id, name, category in db.query(Tool.id, Tool.name, Tool.category).filter(Tool.id.in_(ids)):
+                suggest_index.upsert(tool_id, name, category)
+        for tool_id, vector in sync_embeddings(db).items():
+            embedding_index.upsert(tool_id, vector)
+            update_neighbors(db, embedding_index, tool_id, vector)
+        bump_catalog_version(db) # again, so cached ai_search results pick the new vectors up
+    except Exception as e:
+        print(f"Embedding bulk-ingested tools failed: {e}")
+    finally:
+        db.close()
+
+@app.post("/tools/bulk")
+async def bulk_create_tools(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    format: Optional[Literal["ndjson", "csv"]] = Query(None, description = "Defaults from the Content-Type (text/csv or application/x-ndjson)"),
+    on_conflict: Literal["update", "nothing"] = Query("update", description = "What to do with a url that already exists"),
+    batch_size: int = Query(INGEST_BATCH_SIZE, ge = 1, le = MAX_BATCH_SIZE),
+):
+    # the body is read as a stream: rows are validated as they arrive and written batch_size at a time,
+    # so a large upload never sits in memory and costs one INSERT per batch rather than per tool
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    db = SessionLocal()
+    try:
+        ingest = BulkIngest(db, on_conflict = on_conflict, batch_size = batch_size)
+        async for row, record, error in iter_records(request.stream(), fmt):
+            ingest.add(row, record, error)
+            if ingest.ready():
+                await run_in_threadpool(ingest.flush) # keep the event loop free while the DB works
+        await run_in_threadpool(ingest.flush)
+        if ingest.ids:
+            await run_in_threadpool(bump_catalog_version, db)
+            background_tasks.add_task(embed_bulk_ingest, list(ingest.ids))
+    finally:
+        db.close()
+    return ingest.report()
 
 @app.put("/tools/{tool_id}", response_model = ToolResponse)
-def update_tool(tool_id: int, tool_update: ToolUpdate, db: Session = Depends(get_db)):
-    db_tool = db.query(Tool).filter(Tool.id == tool_id).first()
-    if not db_tool:
-        raise HTTPException(status_code = 404, detail = "Tool not found")
-    if tool_update.name is not None:
-        db_tool.name = tool_update.name
-    if tool_update.description is not None:
-        db_tool.description = tool_update.description
-    if tool_update.category is not None:
-        db_tool.category = tool_update.category
-    if tool_update.url is not None:
-        db_tool.url = tool_update.url
-    db.commit()
-    db.refresh(db_tool)
-    return db_tool
+async def update_tool(tool_id: int, tool_update: ToolUpdate, background_tasks: BackgroundTasks):
+    def update(db):
+        db_tool = db.query(Tool).filter(Tool.id == tool_id).first()
+        if not db_tool:
+            raise HTTPException(status_code = 404, detail = "Tool not found")
+        if tool_update.name is not None:
+            db_tool.name = tool_update.name
+        if tool_update.description is not None:
+            db_tool.description = tool_update.description
+        if tool_update.category is not None:
+            db_tool.category = tool_update.category
+        if tool_update.url is not None:
+            db_tool.url = tool_update.url
+        db.commit()
+        db.refresh(db_tool)
+        bump_catalog_version(db)
+        return tool_row(db_tool)
+    updated = await run_db(update)
+    background_tasks.add_task(index_tool, tool_id)
+    return updated
 
 @app.delete("/tools/{tool_id}")
-def delete_tool(tool_id: int, db: Session = Depends(get_db)):
-    db_tool = db.query(Tool).filter(Tool.id == tool_id).first()
-    if not db_tool:
-        raise HTTPException(status_code = 404, detail = "Tool not found")
-    db.delete(db_tool)
-    db.commit()
+async def delete_tool(tool_id: int, background_tasks: BackgroundTasks):
+    def delete(db):
+        db_tool = db.query(Tool).filter(Tool.id == tool_id).first()
+        if not db_tool:
+            raise HTTPException(status_code = 404, detail = "Tool not found")
+        db.delete(db_tool)
+        db.commit()
+        bump_catalog_version(db)
+    await run_db(delete)
+    background_tasks.add_task(index_tool, tool_id) # gone from the DB, so this drops its embedding
     return {"detail": "Tool deleted successfully"}
 
     
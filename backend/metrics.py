@@ -0,0 +1,211 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# in-process metrics in the Prometheus text format, served at GET /metrics
+#   MetricsMiddleware   per-route request counts and latency histograms (labelled by route template, not raw path)
+#   SQL event hooks     query counts and DB time, per statement and per request
+#   search stages       ai_search encode / top-k / fetch and hybrid_search filter / lexical / semantic / fuse timings
+# everything lives in this process; with several uvicorn workers, scrape each (or aggregate in Prometheus)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {} # label values tuple -> value (or histogram state)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    @staticmethod
+    def _format_labels(names, values, extra = ()):
+        pairs = [f'{name}="{value}"' for name, value in zip(names, values)] + list(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.extend(self._render_value(values, value))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_value(self, values, value):
+        return [f"{self.name}{self._format_labels(self.labels, values)} {value}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels = (), buckets = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0] # per-bucket counts, sum, count
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_value(self, values, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            bucket_labels = self._format_labels(self.labels, values, ['le="' + le + '"'])
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = self._format_labels(self.labels, values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge(Metric):
+    """
+    Read at scrape time from a callback returning {label values tuple: value} (or a plain number).
+    kind = "counter" for totals another module already keeps (e.g. cache hits).
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help, callback, labels = (), kind = "gauge"):
+        super().__init__(name, help, labels)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        try:
+            values = self.callback()
+        except Exception:
+            return [] # a broken collector shouldn't take /metrics down
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{self._format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+REQUESTS = registry.register(Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+REQUEST_LATENCY = registry.register(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+REQUEST_QUERIES = registry.register(Histogram("db_queries_per_request", "SQL statements executed per request", ("route",), COUNT_BUCKETS))
+REQUEST_DB_TIME = registry.register(Histogram("db_time_per_request_seconds", "Time spent in SQL per request", ("route",)))
+QUERY_LATENCY = registry.register(Histogram("db_query_duration_seconds", "SQL statement latency"))
+AI_SEARCH_STAGE = registry.register(Histogram("ai_search_stage_seconds", "ai_search time by stage (encode, topk, fetch)", ("stage",)))
+HYBRID_SEARCH_STAGE = registry.register(Histogram("hybrid_search_stage_seconds", "hybrid_search time by stage (filter, lexical, semantic, fuse)", ("stage",)))
+
+
+# --- per-request SQL accounting ---
+# the request's stats object is mutable, so queries run on threadpool threads (which copy the context)
+# or inside AsyncSession.run_sync still add to it
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+_request_stats = contextvars.ContextVar("request_stats", default = None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    QUERY_LATENCY.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+class MetricsMiddleware:
+    """ Plain ASGI middleware (no BaseHTTPMiddleware overhead); streamed bodies are timed to their last chunk """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # the route template ("/tools/{tool_id}") keeps label cardinality bounded; unmatched paths share one label
+            route = getattr(route, "path", None) or "unmatched"
+            REQUESTS.inc(method = scope["method"], route = route, status = status)
+            REQUEST_LATENCY.observe(elapsed, method = scope["method"], route = route)
+            REQUEST_QUERIES.observe(stats.queries, route = route)
+            REQUEST_DB_TIME.observe(stats.db_seconds, route = route)
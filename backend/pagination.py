@@ -0,0 +1,35 @@
+import base64
+import json
+import math
+
+# opaque cursors for keyset pagination
+# instead of OFFSET n (which makes the DB walk and throw away n rows, and shifts under concurrent inserts)
+# the client hands back the sort key of the last row it saw and we continue with WHERE key > last
+#   /tools           ordered by id           -> cursor holds [id]
+#   /tools/search    ordered by rank, id     -> cursor holds [rank, id]
+# the value is base64'd JSON so clients treat it as a token rather than something to build by hand
+
+
+def encode_cursor(*values):
+    raw = json.dumps(list(values), separators = (",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _is_key(value):
+    # a value the database can compare against: bool is an int subclass, and SQLite integers are 64-bit
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return isinstance(value, float) and math.isfinite(value)
+
+def decode_cursor(cursor, size):
+    """ Returns the list of `size` values in the cursor, or None for an empty cursor (first page) """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Malformed cursor")
+    if not isinstance(values, list) or len(values) != size or not all(map(_is_key, values)):
+        raise ValueError("Malformed cursor")
+    return values
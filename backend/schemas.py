@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 # BaseModel is a Pydantic class for automatic data validation and serialization
 # thus, these three models inherit from it
 
@@ -18,17 +19,38 @@ class ToolUpdate(BaseModel):
 
 class ToolResponse(BaseModel):
     # defining how data is structured when returned
-    # orm_mode allows Pydantic to work w/ SQLAlchemy ORM objects
+    # from_attributes (pydantic 1's orm_mode) allows Pydantic to work w/ SQLAlchemy ORM objects
     # otherwise, we can't serialize the objects
     # SQLAlchemy obj -> Pydantic model -> JSON
+    model_config = ConfigDict(from_attributes = True)
+
     id: int
     name: str
-    description: str = None
+    description: Optional[str] = None # stored as NULL when a tool is created without one
     category: str
     url: str
 
-    class Config:
-        orm_mode = True
 
 
 
+class ToolSuggestion(BaseModel):
+    # just enough to show in a typeahead dropdown and link to the tool
+    id: int
+    name: str
+    category: str
+
+class CategorySuggestion(BaseModel):
+    name: str
+    count: int
+
+class SuggestResponse(BaseModel):
+    tools: List[ToolSuggestion]
+    categories: List[CategorySuggestion]
+
+class CategoryFacet(BaseModel):
+    name: str
+    count: int
+
+class FacetResponse(BaseModel):
+    # categories with how many tools each has (or how many of the tools matching ?name=), most first
+    categories: List[CategoryFacet]
@@ -1,47 +1,65 @@
-from bs4 import BeautifulSoup # for parsing HTML; may no longer be needed
-import requests # fetches web page content
-from sqlalchemy.dialects.postgresql import insert # allows inserting data into the DB
-from models import SessionLocal, Tool # SessionLocal creates a session, while Tool is the DB model
-import openai
+import argparse
+import json
 import os
 import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests # fetches web page content
+from sqlalchemy import insert, update, delete, and_
+try:
+    from backend.models import SessionLocal, Tool, ScrapeSource, ScrapeRow # SessionLocal creates a session
+    from backend.embeddings import sync_embeddings, publish_embeddings, content_hash # keeps the tool_embeddings table (and shared index) in step with new rows
+    from backend.cache import bump_catalog_version
+    from backend.ingest import upsert_statement, delete_tools # multi-row INSERT ... ON CONFLICT DO NOTHING
+    from backend.llm import make_llm_client, LimitedClient
+    from backend.dedup import IngestDeduper, DEDUP_MODE, normalize_url, url_variants # drops rows duplicating a tool we have (normalized url, near-identical text)
+except ImportError:
+    from models import SessionLocal, Tool, ScrapeSource, ScrapeRow
+    from embeddings import sync_embeddings, publish_embeddings, content_hash
+    from cache import bump_catalog_version
+    from ingest import upsert_statement, delete_tools
+    from llm import make_llm_client, LimitedClient
+    from dedup import IngestDeduper, DEDUP_MODE, normalize_url, url_variants
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set!")
+# the scraper is a streaming pipeline:
+#   fetch   stream the README line by line
+#   parse   table rows -> (name, url, description), dropping duplicates of tools we already have
+#           (same url up to http/https, www., trailing slash...; or near-identical name + description, see dedup.py)
+#   enrich  ask the LLM for descriptions the README doesn't give, SCRAPE_CONCURRENCY calls at a time
+#   write   multi-row inserts, committed every SCRAPE_BATCH_SIZE tools, each commit followed by a checkpoint
+# a rerun after a crash resumes after the last committed line instead of starting over
+# --incremental syncs instead: only what changed since the last run is fetched and written (see below)
 
-openai.api_key = openai_api_key
 GITHUB_URL = "https://github.com/public-apis/public-apis"
 RAW_MARKDOWN_URL = "https://raw.githubusercontent.com/public-apis/public-apis/master/README.md"
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", "100"))
+SCRAPE_CHECKPOINT = os.getenv("SCRAPE_CHECKPOINT", ".scrape_public_apis.checkpoint.json")
+SCRAPE_MAX_REMOVE_FRACTION = float(os.getenv("SCRAPE_MAX_REMOVE_FRACTION", "0.5")) # --incremental won't delete more of a source's tools than this without --force
 
 md_link_pattern = re.compile(r"\[(.*?)\]\((.*?)\)")
 # \[(.*?)\] captures everything inside [ ] (the API name).
 # \((.*?)\) captures everything inside ( ) (the URL).
 
-def generate_description(name, fallback_desc):
+def generate_description(client, name, fallback_desc):
     name = name.strip()
     if not name:
         return fallback_desc or "No description available"
     if fallback_desc.strip() == "" or "Back to Index" in fallback_desc:
         prompt = f"""
-        You are an API documentation assistant. 
+        You are an API documentation assistant.
         The API is called '{name}' and is a public API.
         Please provide a short, concise description for this API, focusing on what it does for developers.
         """
         try:
-            response = openai.ChatCompletion.create(
-                model = "gpt-3.5-turbo",
-                messages = [{"role": "system", "content": "You are an API documentation assistant."},
-                            {"role": "user", "content": prompt}]
-            )
-            return response["choices"][0]["message"]["content"]
+            return client.complete(prompt)
         except Exception as e:
             print(f"OpenAI Error: {e}")
             return fallback_desc or "No description available"
     else:
         return fallback_desc or "No description available"
-    
+
 def parse_markdown_table_line(line):
     """
     Split the markdown table row into columns
@@ -66,67 +84,315 @@ def parse_markdown_table_line(line):
         desc_col = ""
     return api_name, api_url, desc_col
 
-def scrape_public_apis():
-    # response = requests.get(GITHUB_URL)
-    response = requests.get(RAW_MARKDOWN_URL)
-    if response.status_code != 200:
-        print("Failed to fetch tools", response.status_code)
+
+# --- stages; each is a generator over the previous one ---
+
+def fetch_lines(source):
+    """ Yields (line number, line); source is a URL or a local file (handy for offline runs) """
+    if not source.startswith("http"):
+        with open(source, encoding = "utf-8") as f:
+            for number, line in enumerate(f, 1):
+                yield number, line.rstrip("\n")
         return
-    # soup = BeautifulSoup(response.text, "html.parser") # parses and organizes the raw HTML, using the built-in Python parser html.parser
-    # links = soup.find_all("a", href = True) # get everything with <a> and href
-    # db = SessionLocal() # new DB session
-    # count = 0 # count of tools added
-    # existing_urls_in_db = {row.url for row in db.query(Tool.url).all()} # stores all URLs already in the DB and puts them in a set, for O(1) lookup
-    # for link in links:
-    #     href = link["href"] # grabs every href
-    #     text = link.get_text(strip = True) # and grabs the link text
-    #     desc_tag = link.find_next("p")
-    #     description = desc_tag.get_text(strip = True) if desc_tag else generate_description(text)
-    #     if href.startswith("http") and "github.com/public-apis" not in href: # ensure they start w/ http and exclude internal links (redundant if we didn't do this)
-    #         if href in existing_urls_in_db: # remove dups
-    #             continue
-    #         # if href in newly_inserted_urls:
-    #         #     continue
-    #         # existing_tool = db.query(Tool).filter_by(url=href).first()
-    #         # if existing_tool:
-    #         #     continue
-    #         stmt = insert(Tool).values(
-    #             name = text or "Untitled",
-    #             description = description,
-    #             category = "Public APIs",
-    #             url = href
-    #         ).on_conflict_do_nothing()
-    #         # this was an insert statement; if the URL already exists, we don't insert it again
-    #         db.execute(stmt)
-    #         count += 1
-    lines = response.text.split("\n")
-    db = SessionLocal()
-    existing_urls_in_db = {row.url for row in db.query(Tool.url).all()}
-    count = 0
-    for line in lines:
+    with requests.get(source, stream = True, timeout = 30) as response:
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        for number, line in enumerate(response.iter_lines(decode_unicode = True), 1):
+            yield number, line
+
+def table_rows(lines, start_after = 0):
+    """ Yields (line number, name, url, desc) for every API table row """
+    for number, line in lines:
+        if number <= start_after:
+            continue
         if not line.startswith("|"):
             continue
         if line.startswith("|:---") or line.startswith("|---"):
             continue
         parsed = parse_markdown_table_line(line)
-        if not parsed:
-            continue
-        api_name, api_url, api_desc = parsed
-        if api_url in existing_urls_in_db:
+        if parsed:
+            yield (number, *parsed)
+
+def parse_rows(lines, deduper, start_after = 0):
+    """ Yields (line number, name, url, desc) for table rows we don't have yet """
+    for number, api_name, api_url, api_desc in table_rows(lines, start_after):
+        if deduper.check(api_name, api_desc, api_url):
             continue
-        final_desc = generate_description(api_name, api_desc) # maybe
-        stmt = insert(Tool).values(
-            name = api_name,
-            description = final_desc,
-            category = "Public APIs",
-            url = api_url
-        ).on_conflict_do_nothing()
-        db.execute(stmt)
-        count += 1
-        existing_urls_in_db.add(api_url)
+        yield number, api_name, api_url, api_desc
+
+def enrich_rows(rows, client, concurrency = SCRAPE_CONCURRENCY):
+    """
+    Yields (line number, tool values) in input order, with up to `concurrency` LLM calls in flight.
+    Keeping the order means "everything up to line N is written" is a valid checkpoint.
+    """
+    with ThreadPoolExecutor(max_workers = max(1, concurrency)) as pool:
+        in_flight = deque()
+        for number, api_name, api_url, api_desc in rows:
+            in_flight.append((number, api_name, api_url, pool.submit(generate_description, client, api_name, api_desc)))
+            if len(in_flight) >= concurrency * 2: # bounded read-ahead, so a huge source never piles up in memory
+                yield _finished(in_flight.popleft())
+        while in_flight:
+            yield _finished(in_flight.popleft())
+
+def _finished(item):
+    number, api_name, api_url, future = item
+    return number, {"name": api_name, "description": future.result(), "category": "Public APIs", "url": api_url}
+
+def write_batches(db, rows, checkpoint, batch_size = SCRAPE_BATCH_SIZE):
+    """ Inserts rows batch_size at a time, committing and checkpointing after each batch; returns the count written """
+    dialect = db.get_bind().dialect.name
+    written = 0
+    batch, last_line = [], 0
+    for number, values in rows:
+        batch.append(values)
+        last_line = number
+        if len(batch) >= batch_size:
+            written += _write(db, dialect, batch)
+            checkpoint.save(last_line, written)
+            batch = []
+    if batch:
+        written += _write(db, dialect, batch)
+        checkpoint.save(last_line, written)
+    return written
+
+def _write(db, dialect, batch):
+    # if the URL already exists, we don't insert it again
+    inserted = db.execute(upsert_statement(dialect, batch, on_conflict = "nothing")).fetchall()
     db.commit()
-    db.close()
-    print(f"Scraped and stored {count} tools (links) from the Public APIs repo")
+    return len(inserted)
+
+
+class Checkpoint:
+    """ Last source line whose tool is committed, kept in a small JSON file next to where the script runs """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+        self.line = 0
+        self.written = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("source") == source: # a checkpoint for another source doesn't apply
+                self.line, self.written = state["line"], state["written"]
+
+    def save(self, line, written):
+        self.line = line
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"source": self.source, "line": line, "written": self.written + written, "saved_at": time.time()}, f)
+        os.replace(tmp, self.path) # atomic, so a crash mid-write can't leave a corrupt checkpoint
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_pipeline(db, source, client, concurrency = SCRAPE_CONCURRENCY, batch_size = SCRAPE_BATCH_SIZE, checkpoint_path = SCRAPE_CHECKPOINT, dedup = DEDUP_MODE):
+    checkpoint = Checkpoint(checkpoint_path, source)
+    if checkpoint.line:
+        print(f"Resuming after line {checkpoint.line} ({checkpoint.written} tools written so far)")
+    deduper = IngestDeduper(dedup).load(db) # every tool already in the DB, by normalized url (and text signature)
+    rows = parse_rows(fetch_lines(source), deduper, start_after = checkpoint.line)
+    count = write_batches(db, enrich_rows(rows, client, concurrency), checkpoint, batch_size)
+    if any(deduper.dropped.values()):
+        print(f"Skipped duplicates: {deduper.dropped['url']} by url, {deduper.dropped['near']} near-identical")
+    checkpoint.clear() # finished; the next run starts from the top (and skips what's already in the DB)
+    return count
+
+
+# --- incremental sync ---
+# a full run re-reads the whole README and checks every row against every url in the DB; a sync instead:
+#   fetch   sends the ETag / Last-Modified saved last time (for a local file: its mtime and size);
+#           an unchanged document ends the run right there
+#   diff    hashes every row and compares against scrape_rows for this source (only this source's rows
+#           are loaded, never the tools table): new urls are added, edited rows update their tool,
+#           rows gone from the document delete theirs
+#   match   a new url is first looked up among existing tools by its usual spellings (url_variants), so
+#           tools from an earlier full scrape or another loader are adopted, not duplicated or re-described
+# each batch commits its tool writes together with its scrape_rows; the validators are saved last, so a
+# run that dies halfway simply re-diffs the next time
+
+def row_hash(name, description):
+    return content_hash(f"{name}\n{description}")
+
+def fetch_if_changed(source, etag = None, last_modified = None):
+    """ (lines, validators) for source, or None if it hasn't changed since the given validators """
+    if not source.startswith("http"):
+        stat = os.stat(source)
+        validator = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if validator == etag:
+            return None
+        return fetch_lines(source), {"etag": validator, "last_modified": None}
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = requests.get(source, stream = True, timeout = 30, headers = headers)
+    if response.status_code == 304:
+        response.close()
+        return None
+    try:
+        response.raise_for_status()
+    except requests.RequestException:
+        response.close()
+        raise
+    response.encoding = response.encoding or "utf-8"
+
+    def lines():
+        with response:
+            yield from enumerate(response.iter_lines(decode_unicode = True), 1)
+    return lines(), {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+def _existing_tools(db, urls):
+    # normalized url -> tool id for tools already stored under any usual spelling of urls
+    variants = set()
+    for url in urls:
+        variants |= url_variants(url)
+    wanted = {normalize_url(url) for url in urls}
+    found = {}
+    for tool_id, url in db.query(Tool.id, Tool.url).filter(Tool.url.in_(variants)):
+        key = normalize_url(url)
+        if key in wanted:
+            found.setdefault(key, tool_id)
+    return found
+
+def _record(db, source, rows):
+    # (url, hash, tool id) into scrape_rows, replacing what was there
+    if not rows:
+        return
+    db.execute(delete(ScrapeRow).where(and_(ScrapeRow.source == source, ScrapeRow.url.in_([url for url, _, _ in rows]))))
+    db.execute(insert(ScrapeRow), [{"source": source, "url": url, "row_hash": digest, "tool_id": tool_id} for url, digest, tool_id in rows])
+
+def _add(db, source, rows, client, concurrency, report):
+    # rows: (line number, name, url, desc, hash); adopts tools we already have, inserts (and describes) the rest
+    existing = _existing_tools(db, [url for _, _, url, _, _ in rows])
+    new = [row[:4] for row in rows if normalize_url(row[2]) not in existing]
+    values = [values for _, values in enrich_rows(iter(new), client, concurrency)]
+    if values:
+        db.execute(upsert_statement(db.get_bind().dialect.name, values, on_conflict = "nothing"))
+        existing.update(_existing_tools(db, [url for _, _, url, _ in new]))
+    _record(db, source, [(url, digest, existing.get(normalize_url(url))) for _, _, url, _, digest in rows])
+    db.commit()
+    report["added"] += len(new)
+    report["adopted"] += len(rows) - len(new)
+
+def _update(db, source, rows, report):
+    # rows: (line number, name, url, desc, hash, tool id); returns the rows whose tool is gone, to be re-added
+    live = {tool_id for tool_id, in db.query(Tool.id).filter(Tool.id.in_([row[5] for row in rows if row[5] is not None]))}
+    described = [{"id": tool_id, "name": name, "description": desc} for _, name, _, desc, _, tool_id in rows if tool_id in live and desc]
+    # an empty README description would wipe out the one the LLM wrote, so only the name is updated
+    named = [{"id": tool_id, "name": name} for _, name, _, desc, _, tool_id in rows if tool_id in live and not desc]
+    for params in (described, named):
+        if params:
+            db.execute(update(Tool), params)
+    _record(db, source, [(url, digest, tool_id) for _, _, url, _, digest, tool_id in rows if tool_id in live])
+    db.commit()
+    report["updated"] += len(described) + len(named)
+    return [row[:5] for row in rows if row[5] not in live]
+
+def sync_source(db, source, client, concurrency = SCRAPE_CONCURRENCY, batch_size = SCRAPE_BATCH_SIZE, prune = True, force = False):
+    """
+    Applies whatever changed in source since the last sync: adds new rows, updates edited ones and
+    (with prune) deletes the tools of rows that were removed. Returns counts of each.
+    force fetches even if the source reports no change, and allows removing more than SCRAPE_MAX_REMOVE_FRACTION.
+    """
+    report = {"not_modified": False, "added": 0, "adopted": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    state = db.get(ScrapeSource, source)
+    fetched = fetch_if_changed(source, *((state.etag, state.last_modified) if state and not force else (None, None)))
+    if fetched is None:
+        report["not_modified"] = True
+        return report
+    lines, validators = fetched
+    current = {} # url -> row; a url listed twice keeps its last row, as a full scrape would
+    for number, name, url, desc in table_rows(lines):
+        current[url] = (number, name, url, desc, row_hash(name, desc))
+    stored = {url: (digest, tool_id) for url, digest, tool_id in db.query(ScrapeRow.url, ScrapeRow.row_hash, ScrapeRow.tool_id).filter(ScrapeRow.source == source)}
+
+    added, changed = [], []
+    for url, row in current.items():
+        previous = stored.get(url)
+        if previous is None:
+            added.append(row)
+        elif previous[0] != row[4]:
+            changed.append((*row, previous[1]))
+        else:
+            report["unchanged"] += 1
+    for start in range(0, len(changed), batch_size):
+        added += _update(db, source, changed[start:start + batch_size], report) # tool deleted since: add it again
+    for start in range(0, len(added), batch_size):
+        _add(db, source, added[start:start + batch_size], client, concurrency, report)
+
+    removed = [(url, tool_id) for url, (_, tool_id) in stored.items() if url not in current]
+    if removed and prune and len(removed) > SCRAPE_MAX_REMOVE_FRACTION * len(stored) and not force:
+        # most likely a truncated or reformatted document rather than half the list being dropped
+        print(f"Not removing {len(removed)} of {len(stored)} tools from {source}; rerun with --force if that's intended")
+        return report # validators not saved, so the next run looks again
+    for start in range(0, len(removed), batch_size):
+        chunk = removed[start:start + batch_size]
+        # without prune the tools stay, but the rows are forgotten so they aren't reported every run
+        db.execute(delete(ScrapeRow).where(and_(ScrapeRow.source == source, ScrapeRow.url.in_([url for url, _ in chunk]))))
+        if prune:
+            ids = {tool_id for _, tool_id in chunk if tool_id is not None}
+            # a tool some other row (another spelling, another source) still lists stays
+            listed = {tool_id for tool_id, in db.query(ScrapeRow.tool_id).filter(ScrapeRow.tool_id.in_(ids))}
+            delete_tools(db, sorted(ids - listed))
+            report["removed"] += len(ids - listed)
+        db.commit()
+
+    state = state or ScrapeSource(source = source)
+    state.etag, state.last_modified, state.fetched_at = validators["etag"], validators["last_modified"], time.time()
+    db.add(state)
+    db.commit()
+    return report
+
+
+def scrape_public_apis(source = RAW_MARKDOWN_URL, llm = None, concurrency = SCRAPE_CONCURRENCY, batch_size = SCRAPE_BATCH_SIZE, checkpoint_path = SCRAPE_CHECKPOINT, dedup = DEDUP_MODE,
+                       incremental = False, prune = True, force = False):
+    client = LimitedClient(make_llm_client(llm)) # LLM_MAX_RPM/LLM_MAX_TPM budget + retries with backoff
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        if incremental:
+            report = sync_source(db, source, client, concurrency, batch_size, prune, force)
+            count = report["added"] + report["updated"] + report["removed"]
+        else:
+            count = run_pipeline(db, source, client, concurrency, batch_size, checkpoint_path, dedup)
+        elapsed = time.perf_counter() - start
+        if count:
+            sync_embeddings(db) # embed only the rows we just added (or whose text changed)
+            publish_embeddings(db) # a new shared generation, or a reload signal for API processes without one
+            bump_catalog_version(db) # so API servers stop serving cached pages without the new tools
+    except requests.RequestException as e:
+        print(f"Failed to fetch tools: {e}") # rerunning resumes from the checkpoint
+        return
+    finally:
+        db.close()
+    if not incremental:
+        print(f"Scraped and stored {count} tools (links) from the Public APIs repo in {elapsed:.1f}s")
+    elif report["not_modified"]:
+        print(f"{source} hasn't changed since the last sync ({elapsed:.1f}s)")
+    else:
+        print(f"Synced {source} in {elapsed:.1f}s: {report['added']} added, {report['adopted']} matched to existing tools, "
+              f"{report['updated']} updated, {report['removed']} removed, {report['unchanged']} unchanged")
 
 if __name__ == "__main__":
-    scrape_public_apis()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = "Scrape the public-apis README into the tools table")
+    parser.add_argument("--source", default = RAW_MARKDOWN_URL, help = "README URL or local file")
+    parser.add_argument("--llm", choices = ["openai", "stub"], default = None, help = "defaults to LLM_BACKEND")
+    parser.add_argument("--concurrency", type = int, default = SCRAPE_CONCURRENCY)
+    parser.add_argument("--batch-size", type = int, default = SCRAPE_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default = SCRAPE_CHECKPOINT, help = "checkpoint file ('' to disable)")
+    parser.add_argument("--restart", action = "store_true", help = "ignore any checkpoint and start from the top")
+    parser.add_argument("--dedup", choices = ["near", "url", "off"], default = DEDUP_MODE, help = "which duplicates of existing tools to skip")
+    parser.add_argument("--incremental", action = "store_true", help = "only apply what changed since the last --incremental run")
+    parser.add_argument("--keep-removed", action = "store_true", help = "with --incremental: don't delete tools whose rows were removed")
+    parser.add_argument("--force", action = "store_true", help = "with --incremental: fetch even if unchanged, allow large removals")
+    args = parser.parse_args()
+    if args.restart:
+        Checkpoint(args.checkpoint, args.source).clear()
+    scrape_public_apis(args.source, args.llm, args.concurrency, args.batch_size, args.checkpoint, args.dedup,
+                       args.incremental, not args.keep_removed, args.force)
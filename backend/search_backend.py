@@ -0,0 +1,241 @@
+import os
+import sqlite3
+from sqlalchemy import text, func, or_, and_, case, literal, literal_column, select, Integer
+try:
+    from backend.models import Tool
+except ImportError:
+    from models import Tool
+
+# keyword search behind /tools/search
+# leading-wildcard ILIKE ('%term%') can't use a B-tree index, so every search was a sequential scan
+# each backend here answers the same question with an index and a relevance score:
+#   postgres - pg_trgm GIN indexes (which ILIKE '%term%' *can* use) + a tsvector GIN index for ranking
+#   sqlite   - an FTS5 table with the trigram tokenizer (substring MATCH), ranked with bm25
+#   like     - the old ILIKE scan, for anything else (or if the extensions aren't available)
+# search() returns [(tool_id, rank)] best first; the caller loads the Tool rows
+# filter_ids() returns every id matching name/category filters, unranked (hybrid search's candidate set);
+# id_filter() is the same as a subquery, for callers that only aggregate over the matches (facet counts)
+# both match exactly the tools search() would return, so counts and candidate sets agree with the results
+# pass after = (rank, id) of the last row seen instead of skip for keyset pagination
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND") # postgres | sqlite | like; unset = pick from the database
+
+
+class SearchBackend:
+    name = None
+
+    def setup(self, engine):
+        """ Create whatever indexes / tables the backend needs; returns False if it can't run here """
+        return True
+
+    def search(self, db, name = None, category = None, skip = 0, limit = 10, after = None):
+        raise NotImplementedError
+
+    def id_filter(self, name = None, category = None):
+        """ A SELECT of the ids of every tool whose name / category contains the given substrings """
+        raise NotImplementedError
+
+    def filter_ids(self, db, name = None, category = None):
+        """ Ids of every tool whose name / category contains the given substrings """
+        return db.execute(self.id_filter(name, category)).scalars().all()
+
+
+class LikeSearch(SearchBackend):
+    """ The original substring scan, ranked by id so paging is at least stable """
+    name = "like"
+
+    def search(self, db, name = None, category = None, skip = 0, limit = 10, after = None):
+        query = db.query(Tool.id)
+        if name:
+            query = query.filter(Tool.name.ilike(f"%{name}%"))
+        if category:
+            query = query.filter(Tool.category.ilike(f"%{category}%"))
+        query = query.order_by(Tool.id)
+        if after:
+            query = query.filter(Tool.id > after[1]) # every rank is 0, so only the id matters
+        else:
+            query = query.offset(skip)
+        return [(row.id, 0.0) for row in query.limit(limit)]
+
+    def id_filter(self, name = None, category = None):
+        # on Postgres the trigram indexes serve these ILIKEs too
+        query = select(Tool.id)
+        if name:
+            query = query.where(Tool.name.ilike(f"%{name}%"))
+        if category:
+            query = query.where(Tool.category.ilike(f"%{category}%"))
+        return query
+
+
+class PostgresSearch(LikeSearch):
+    name = "postgres"
+    # same expression as the GIN index below, so the planner can use it
+    DOCUMENT = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+    def setup(self, engine):
+        table = f"{Tool.__table__.schema}.{Tool.__tablename__}"
+        statements = [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            f"CREATE INDEX IF NOT EXISTS tools_name_trgm_idx ON {table} USING gin (name gin_trgm_ops)",
+            f"CREATE INDEX IF NOT EXISTS tools_category_trgm_idx ON {table} USING gin (category gin_trgm_ops)",
+            f"CREATE INDEX IF NOT EXISTS tools_fts_idx ON {table} USING gin ({self.DOCUMENT})",
+        ]
+        try:
+            with engine.begin() as conn:
+                for statement in statements:
+                    conn.execute(text(statement))
+        except Exception as e:
+            print(f"Postgres search indexes unavailable ({e}), falling back to ILIKE scans")
+            return False
+        return True
+
+    def _name_match(self, name):
+        # both sides are index-backed: the trigram index serves the ILIKE, the tsvector index the @@
+        return or_(Tool.name.ilike(f"%{name}%"), literal_column(self.DOCUMENT).op("@@")(func.plainto_tsquery("english", name)))
+
+    def id_filter(self, name = None, category = None):
+        query = select(Tool.id)
+        if name:
+            query = query.where(self._name_match(name))
+        if category:
+            query = query.where(Tool.category.ilike(f"%{category}%"))
+        return query
+
+    def search(self, db, name = None, category = None, skip = 0, limit = 10, after = None):
+        if name:
+            # name similarity dominates; description words add a smaller full-text score
+            rank = func.similarity(Tool.name, name) * 2 + func.ts_rank_cd(literal_column(self.DOCUMENT), func.plainto_tsquery("english", name))
+        else:
+            rank = literal(0.0)
+        query = db.query(Tool.id, rank.label("rank"))
+        if name:
+            query = query.filter(self._name_match(name))
+        if category:
+            query = query.filter(Tool.category.ilike(f"%{category}%"))
+        query = query.order_by(rank.desc(), Tool.id)
+        if after:
+            last_rank, last_id = after
+            query = query.filter(or_(rank < last_rank, and_(rank == last_rank, Tool.id > last_id)))
+        else:
+            query = query.offset(skip)
+        return [(row.id, float(row.rank)) for row in query.limit(limit)]
+
+
+class SQLiteSearch(LikeSearch):
+    name = "sqlite"
+
+    def setup(self, engine):
+        # external-content FTS5 table: it indexes tools without storing a second copy of the text
+        statements = [
+            """CREATE VIRTUAL TABLE tools_fts USING fts5(
+                name, description, category, content = 'tools', content_rowid = 'id', tokenize = 'trigram'
+            )""",
+            """CREATE TRIGGER tools_fts_insert AFTER INSERT ON tools BEGIN
+                INSERT INTO tools_fts(rowid, name, description, category)
+                VALUES (new.id, new.name, new.description, new.category);
+            END""",
+            """CREATE TRIGGER tools_fts_delete AFTER DELETE ON tools BEGIN
+                INSERT INTO tools_fts(tools_fts, rowid, name, description, category)
+                VALUES ('delete', old.id, old.name, old.description, old.category);
+            END""",
+            """CREATE TRIGGER tools_fts_update AFTER UPDATE ON tools BEGIN
+                INSERT INTO tools_fts(tools_fts, rowid, name, description, category)
+                VALUES ('delete', old.id, old.name, old.description, old.category);
+                INSERT INTO tools_fts(rowid, name, description, category)
+                VALUES (new.id, new.name, new.description, new.category);
+            END""",
+            "INSERT INTO tools_fts(tools_fts) VALUES ('rebuild')", # index rows that existed before the table
+        ]
+        try:
+            with engine.begin() as conn:
+                exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'tools_fts'")).first()
+                if not exists:
+                    for statement in statements:
+                        conn.execute(text(statement))
+        except Exception as e:
+            # the trigram tokenizer needs SQLite 3.34+
+            print(f"SQLite FTS5 trigram search unavailable (SQLite {sqlite3.sqlite_version}: {e}), falling back to LIKE scans")
+            return False
+        return True
+
+    @staticmethod
+    def _phrase(term):
+        return '"' + term.replace('"', '""') + '"'
+
+    @staticmethod
+    def _use_like(name, category):
+        # trigrams need at least 3 characters; shorter terms go to a LIKE scan over the same columns
+        return (name and len(name) < 3) or (category and len(category) < 3) or not (name or category)
+
+    @classmethod
+    def _match(cls, name, category):
+        clauses = []
+        if name:
+            clauses.append("{name description} : " + cls._phrase(name))
+        if category:
+            clauses.append("category : " + cls._phrase(category))
+        return " AND ".join(clauses)
+
+    @staticmethod
+    def _like_clauses(name, category):
+        # what _match() matches, as LIKEs (case-insensitive for ASCII, like the trigram tokenizer)
+        clauses = []
+        if name:
+            clauses.append(or_(Tool.name.ilike(f"%{name}%"), Tool.description.ilike(f"%{name}%")))
+        if category:
+            clauses.append(Tool.category.ilike(f"%{category}%"))
+        return clauses
+
+    def id_filter(self, name = None, category = None):
+        if self._use_like(name, category):
+            return select(Tool.id).where(*self._like_clauses(name, category))
+        return (
+            text("SELECT rowid AS id FROM tools_fts WHERE tools_fts MATCH :match")
+            .bindparams(match = self._match(name, category))
+            .columns(id = Integer)
+        )
+
+    def _like_search(self, db, name, category, skip, limit, after):
+        # no bm25 without the FTS index; rank name hits above description-only hits (the same 10:1 weighting),
+        # so results still come back best first and the (rank, id) cursor pages the same way as below
+        rank = case((Tool.name.ilike(f"%{name}%"), 10.0), else_ = 1.0) if name else literal(0.0)
+        query = db.query(Tool.id, rank.label("rank")).filter(*self._like_clauses(name, category))
+        query = query.order_by(rank.desc(), Tool.id)
+        if after:
+            last_rank, last_id = after
+            query = query.filter(or_(rank < last_rank, and_(rank == last_rank, Tool.id > last_id)))
+        else:
+            query = query.offset(skip)
+        return [(row.id, float(row.rank)) for row in query.limit(limit)]
+
+    def search(self, db, name = None, category = None, skip = 0, limit = 10, after = None):
+        if self._use_like(name, category):
+            return self._like_search(db, name, category, skip, limit, after)
+        params = {"match": self._match(name, category), "limit": limit, "skip": 0 if after else skip}
+        keyset = ""
+        if after:
+            keyset = "WHERE rank < :last_rank OR (rank = :last_rank AND id > :last_id)"
+            params["last_rank"], params["last_id"] = after
+        rows = db.execute(
+            text(
+                # bm25 is "lower is better"; negate it so every backend ranks high-to-low
+                # and weight name matches well above description matches
+                "SELECT id, rank FROM ("
+                "SELECT rowid AS id, -bm25(tools_fts, 10.0, 1.0, 2.0) AS rank FROM tools_fts WHERE tools_fts MATCH :match"
+                f") {keyset} ORDER BY rank DESC, id LIMIT :limit OFFSET :skip"
+            ),
+            params,
+        )
+        return [(row.id, row.rank) for row in rows]
+
+
+BACKENDS = {backend.name: backend for backend in (PostgresSearch, SQLiteSearch, LikeSearch)}
+
+def make_search_backend(engine):
+    """ Pick the backend for this database (or SEARCH_BACKEND), set it up, and fall back to LIKE if that fails """
+    name = SEARCH_BACKEND or {"postgresql": "postgres", "sqlite": "sqlite"}.get(engine.dialect.name, "like")
+    backend = BACKENDS[name]()
+    if not backend.setup(engine):
+        backend = LikeSearch()
+    print(f"Using the {backend.name} search backend")
+    return backend
@@ -0,0 +1,40 @@
+import json
+try:
+    from backend.models import Tool
+    from backend.schemas import ToolResponse
+except ImportError:
+    from models import Tool
+    from schemas import ToolResponse
+
+# fast path for the tool list endpoints
+# instead of hydrating Tool ORM objects and pushing each through ToolResponse, select just the response
+# columns as plain row tuples and encode them straight to JSON bytes
+# the fields come from ToolResponse itself, so the response contract can't drift from the schema
+# orjson is used when installed (pip install orjson); otherwise the stdlib encoder, same output
+
+TOOL_FIELDS = tuple(ToolResponse.model_fields)
+TOOL_COLUMNS = tuple(getattr(Tool, field) for field in TOOL_FIELDS) # db.query(*TOOL_COLUMNS) -> rows in field order
+
+try:
+    import orjson
+
+    def dumps(value):
+        return orjson.dumps(value)
+except ImportError:
+    orjson = None
+
+    def dumps(value):
+        return json.dumps(value, separators = (",", ":")).encode("utf-8")
+
+
+def tool_row(row):
+    # a row of TOOL_COLUMNS (or anything with those attributes, e.g. a Tool) as a ToolResponse-shaped dict
+    if isinstance(row, tuple):
+        return dict(zip(TOOL_FIELDS, row))
+    return {field: getattr(row, field) for field in TOOL_FIELDS}
+
+def tools_json(rows):
+    return dumps([dict(zip(TOOL_FIELDS, row)) for row in rows])
+
+def tool_json(row):
+    return dumps(tool_row(row))
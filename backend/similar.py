@@ -0,0 +1,160 @@
+import argparse
+import os
+import time
+import numpy as np
+from sqlalchemy import insert, delete, select
+try:
+    from backend.models import SessionLocal, ToolNeighbor, ToolEmbedding
+    from backend.embeddings import MODEL_NAME, SYNC_BATCH_SIZE
+    from backend.cache import bump_catalog_version
+except ImportError:
+    from models import SessionLocal, ToolNeighbor, ToolEmbedding
+    from embeddings import MODEL_NAME, SYNC_BATCH_SIZE
+    from cache import bump_catalog_version
+
+# "similar tools": a k-nearest-neighbour graph over the tool embeddings, stored in tool_neighbors
+#   build     offline, exact: the vectors are multiplied against each other one block of rows at a time
+#             (block x N scores, sized to SIMILAR_BLOCK_MB), so memory stays bounded at any catalog size
+#   maintain  the API keeps it current on every create/update/delete (update_neighbors / remove_neighbors)
+#   serve     GET /tools/{tool_id}/similar reads k rows off the primary key, O(k) instead of an O(N) scan
+# incremental maintenance is exact for the written tool's own list; for the reverse edges (other tools
+# that should now list it) only its SIMILAR_REVERSE_SCAN nearest tools are checked, which catches
+# practically all of them; re-run the build (e.g. nightly, or after a bulk load) to make everything exact:
+#   python -m backend.similar --k 10
+
+SIMILAR_K = int(os.getenv("SIMILAR_K", "10"))
+SIMILAR_BLOCK_MB = int(os.getenv("SIMILAR_BLOCK_MB", "256")) # size of one block of the score matrix
+SIMILAR_REVERSE_SCAN = int(os.getenv("SIMILAR_REVERSE_SCAN", "100"))
+
+
+def load_vectors(db):
+    """ (ids, matrix) of every stored embedding for the current model, in id order """
+    ids, vectors = [], []
+    query = (
+        db.query(ToolEmbedding.tool_id, ToolEmbedding.vector)
+        .filter(ToolEmbedding.model_name == MODEL_NAME)
+        .order_by(ToolEmbedding.tool_id)
+        .yield_per(SYNC_BATCH_SIZE)
+    )
+    for tool_id, vector in query:
+        ids.append(tool_id)
+        vectors.append(np.frombuffer(vector, dtype = np.float32))
+    if not ids:
+        return np.empty(0, dtype = np.int64), None
+    return np.asarray(ids, dtype = np.int64), np.stack(vectors)
+
+def knn_blocks(ids, matrix, k, block_rows):
+    """ Yields (tool ids, neighbour ids, scores) per block of rows; neighbours best first, self excluded """
+    n = len(ids)
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        scores = matrix[start:stop] @ matrix.T # one BLAS call per block
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf # a tool isn't its own neighbour
+        top = np.argpartition(-scores, k - 1, axis = 1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis = 1)
+        order = np.argsort(-top_scores, axis = 1)
+        yield ids[start:stop], ids[np.take_along_axis(top, order, axis = 1)], np.take_along_axis(top_scores, order, axis = 1)
+
+def _rows(tool_id, neighbors):
+    return [{"tool_id": int(tool_id), "rank": rank, "neighbor_id": int(neighbor_id), "score": float(score)}
+            for rank, (neighbor_id, score) in enumerate(neighbors)]
+
+def replace_neighbors(db, lists):
+    """ lists is {tool_id: [(neighbor_id, score)] best first}; replaces those tools' rows (no commit) """
+    if not lists:
+        return
+    db.execute(delete(ToolNeighbor).where(ToolNeighbor.tool_id.in_([int(tool_id) for tool_id in lists]))) # plain ints, not numpy
+    rows = [row for tool_id, neighbors in lists.items() for row in _rows(tool_id, neighbors)]
+    if rows:
+        db.execute(insert(ToolNeighbor), rows)
+
+def build_similar(db, k = SIMILAR_K, block_mb = SIMILAR_BLOCK_MB):
+    start = time.perf_counter()
+    ids, matrix = load_vectors(db)
+    if matrix is None:
+        print("No embeddings to build the similar-tools graph from")
+        return 0
+    block_rows = max(1, block_mb * 1024 * 1024 // (4 * len(ids)))
+    done = 0
+    for tool_ids, neighbor_ids, scores in knn_blocks(ids, matrix, k, block_rows):
+        replace_neighbors(db, {tool_id: list(zip(row_ids, row_scores)) for tool_id, row_ids, row_scores in zip(tool_ids, neighbor_ids, scores)})
+        db.commit() # one transaction per block: readers see the old lists until a block lands
+        done += len(tool_ids)
+        print(f"  {done}/{len(ids)} tools ({done / (time.perf_counter() - start):.0f}/s)")
+    # lists of tools that no longer have an embedding (deleted, or not re-embedded for this model yet)
+    live = select(ToolEmbedding.tool_id).where(ToolEmbedding.model_name == MODEL_NAME)
+    db.execute(delete(ToolNeighbor).where(ToolNeighbor.tool_id.not_in(live)))
+    db.commit()
+    bump_catalog_version(db) # cached /similar responses are stale now
+    print(f"Built the similar-tools graph for {len(ids)} tools (k={k}) in {time.perf_counter() - start:.1f}s")
+    return len(ids)
+
+
+# --- incremental maintenance, called by the API after it updates the search index ---
+
+def _current_lists(db, tool_ids):
+    lists = {}
+    rows = db.query(ToolNeighbor.tool_id, ToolNeighbor.neighbor_id, ToolNeighbor.score).filter(ToolNeighbor.tool_id.in_(tool_ids)).order_by(ToolNeighbor.tool_id, ToolNeighbor.rank)
+    for tool_id, neighbor_id, score in rows:
+        lists.setdefault(tool_id, []).append((neighbor_id, score))
+    return lists
+
+def _nearest(index, tool_id, vector, k):
+    return [(neighbor_id, score) for neighbor_id, score in index.search(vector, k + 1) if neighbor_id != tool_id][:k]
+
+def _recompute(index, tool_ids, k):
+    # fresh lists for tools whose current list can't be patched in place
+    found, vectors = index.lookup(tool_ids)
+    return {int(tool_id): _nearest(index, int(tool_id), vector, k) for tool_id, vector in zip(found, vectors)}
+
+def update_neighbors(db, index, tool_id, vector, k = SIMILAR_K):
+    """ After tool_id was added or its vector changed: rewrite its list and patch everyone else's """
+    lists = {tool_id: _nearest(index, tool_id, vector, k)}
+    # tools that already list it: its score moved (or it fell out of range), so recompute them exactly
+    pointing = [other_id for other_id, in db.query(ToolNeighbor.tool_id).filter(ToolNeighbor.neighbor_id == tool_id)]
+    lists.update(_recompute(index, [other_id for other_id in pointing if other_id != tool_id], k))
+    # everyone else: it can only enter the lists of tools near it; merge it into any that is short of k
+    # (a small catalog) or whose k-th score it beats
+    # a tool with no list at all (e.g. one of the first tools, created when it had no neighbours) gets
+    # one filled from the index, the nearest k of them per write; any further ones keep the endpoint's
+    # scan fallback until a later write or the next build reaches them
+    close = [(other_id, score) for other_id, score in index.search(vector, SIMILAR_REVERSE_SCAN + 1) if other_id not in lists]
+    current = _current_lists(db, [other_id for other_id, _ in close])
+    missing = [other_id for other_id, _ in close if other_id not in current][:k]
+    lists.update(_recompute(index, missing, k))
+    for other_id, score in close:
+        listed = current.get(other_id)
+        if listed is not None and (len(listed) < k or score > listed[-1][1]):
+            lists[other_id] = sorted(listed + [(tool_id, score)], key = lambda item: -item[1])[:k]
+    replace_neighbors(db, lists)
+    db.commit()
+
+def remove_neighbors(db, index, tool_id, k = SIMILAR_K):
+    """ After tool_id was deleted (and dropped from the index): drop its list and refill the lists that had it """
+    pointing = [other_id for other_id, in db.query(ToolNeighbor.tool_id).filter(ToolNeighbor.neighbor_id == tool_id)]
+    db.execute(delete(ToolNeighbor).where(ToolNeighbor.tool_id == tool_id))
+    replace_neighbors(db, _recompute(index, [other_id for other_id in pointing if other_id != tool_id], k))
+    db.commit()
+
+def similar_ids(db, tool_id, limit):
+    """ [(neighbor_id, score)] from the graph, best first """
+    return db.query(ToolNeighbor.neighbor_id, ToolNeighbor.score).filter(ToolNeighbor.tool_id == tool_id).order_by(ToolNeighbor.rank).limit(limit).all()
+
+def scan_similar(index, tool_id, limit):
+    # fallback for a tool with no list yet: one O(N) search from its own vector
+    return _recompute(index, [tool_id], limit).get(tool_id, [])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Build the similar-tools graph from the stored embeddings")
+    parser.add_argument("--k", type = int, default = SIMILAR_K, help = "neighbours kept per tool")
+    parser.add_argument("--block-mb", type = int, default = SIMILAR_BLOCK_MB, help = "memory for one block of scores")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        build_similar(db, args.k, args.block_mb)
+    finally:
+        db.close()
@@ -0,0 +1,351 @@
+import os
+import re
+import threading
+import time
+import numpy as np
+try:
+    from backend.models import SessionLocal, Tool
+except ImportError:
+    from models import SessionLocal, Tool
+
+# typeahead behind GET /tools/suggest
+# /tools/search is a substring match that goes to the database on every keystroke; a suggestion only needs
+# names that *start* with what was typed (at any word: "weat" finds "Open Weather"), which a sorted array
+# answers with two binary searches and no database at all
+#   snapshot  every tool name and category, normalized and packed into one bytes blob plus a few numpy
+#             arrays (one entry per word start, sorted), rebuilt from the DB in a background thread
+#   deltas    writes since the snapshot (index_tool calls upsert/remove): new names sit in a small dict
+#             that is scanned per query, replaced/deleted ones are hidden; past SUGGEST_REBUILD_AFTER
+#             of them, or SUGGEST_REFRESH_SECONDS after the last build (writes made by other workers), a
+#             rebuild is started and the new snapshot swapped in
+# ranking: a match at the start of the name beats one at a later word, then shorter names, then older tools;
+# categories rank by how many tools they have
+# a prefix range too big to rank per query (a single letter on a large catalog) has its top entries
+# precomputed at build time
+
+SUGGEST_MAX_LIMIT = int(os.getenv("SUGGEST_MAX_LIMIT", "20"))
+SUGGEST_SCAN_MAX = int(os.getenv("SUGGEST_SCAN_MAX", "10000")) # bigger prefix ranges are precomputed
+SUGGEST_REBUILD_AFTER = int(os.getenv("SUGGEST_REBUILD_AFTER", "500")) # pending writes before a rebuild
+SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "300"))
+SUGGEST_KEY_BYTES = 32 # entries are sorted on (at most) this many bytes; longer prefixes are checked exactly
+
+_WORD = re.compile(r"\w+")
+_TOP = SUGGEST_MAX_LIMIT * 4 # precomputed per big range, with room for hidden ids and repeated words
+
+
+def normalize(text):
+    # "Open-Weather  API" -> "open weather api"; the same for names and typed prefixes
+    return " ".join(_WORD.findall((text or "").casefold()))
+
+def _pack(strings):
+    # many short strings as one blob + offsets, instead of one Python object each
+    data = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(data) + 1, dtype = np.int64)
+    np.cumsum([len(b) for b in data], out = offsets[1:])
+    return b"".join(data), offsets
+
+
+class _PrefixArray:
+    """
+    Every word-start suffix of a list of normalized keys, sorted.
+    An entry is (where it starts in the blob, which key); the key's rank (lower first) orders entries within
+    a prefix range, after matches at the start of a key.
+    """
+
+    def __init__(self, keys, ranks):
+        self.blob, self.offsets = _pack(keys)
+        starts, owners, later = [], [], []
+        for i, key in enumerate(keys):
+            base = int(self.offsets[i])
+            starts.append(base)
+            owners.append(i)
+            later.append(0)
+            for match in re.finditer(" ", key):
+                starts.append(base + match.start() + 1)
+                owners.append(i)
+                later.append(1)
+        starts = np.asarray(starts, dtype = np.int64)
+        owners = np.asarray(owners, dtype = np.int64)
+        ends = self.offsets[owners + 1]
+        width = SUGGEST_KEY_BYTES
+        # numpy sorts fixed-width bytes the same way Python compares them
+        sort_keys = np.array([self.blob[s:min(s + width, e)] for s, e in zip(starts.tolist(), ends.tolist())], dtype = f"S{width}")
+        order = np.argsort(sort_keys, kind = "stable")
+        del sort_keys
+        self.starts = starts[order].astype(np.uint32 if len(self.blob) < 2 ** 32 else np.int64)
+        owners = owners[order]
+        # (later word, key rank, key index) in one int64: a range ranks with a single argpartition,
+        # and the key an entry belongs to is its low 32 bits
+        ranks = np.minimum(np.asarray(ranks, dtype = np.int64), (1 << 29) - 1)
+        self.order = (np.asarray(later, dtype = np.int64)[order] << 61) | (ranks[owners] << 32) | owners
+        self.top = {}
+        self._precompute(0, len(self.starts), b"")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _key(self, entry, width):
+        start = int(self.starts[entry])
+        return self.blob[start:min(start + width, int(self.offsets[(int(self.order[entry]) & 0xFFFFFFFF) + 1]))]
+
+    def _bound(self, prefix, lo, hi, upper):
+        # first entry whose first len(prefix) bytes are >= prefix (> prefix for the upper bound)
+        width = len(prefix)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self._key(mid, width)
+            if key < prefix or (upper and key == prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, prefix, lo = 0, hi = None):
+        hi = len(self.starts) if hi is None else hi
+        lo = self._bound(prefix, lo, hi, False)
+        return lo, self._bound(prefix, lo, hi, True)
+
+    def _best(self, lo, hi, count):
+        if hi - lo > count:
+            part = lo + np.argpartition(self.order[lo:hi], count)[:count]
+        else:
+            part = np.arange(lo, hi)
+        return part[np.argsort(self.order[part])]
+
+    def _precompute(self, lo, hi, prefix):
+        # walk the prefixes whose range is too big to rank per query, one byte deeper at a time;
+        # each child range is found with two binary searches, so this only touches the big ones
+        if hi - lo <= SUGGEST_SCAN_MAX or len(prefix) >= SUGGEST_KEY_BYTES:
+            return
+        if prefix:
+            self.top[prefix] = self._best(lo, hi, _TOP)
+        depth = len(prefix)
+        while lo < hi:
+            key = self._key(lo, depth + 1)
+            if len(key) <= depth: # the key ends exactly at the prefix
+                lo += 1
+                continue
+            child_hi = self._bound(key, lo, hi, True)
+            self._precompute(lo, child_hi, key)
+            lo = child_hi
+
+    def candidates(self, prefix, count):
+        """ Up to count (key index, (later word, rank)) matching prefix at a word start, best first, without repeats """
+        lo, hi = self.range(prefix[:SUGGEST_KEY_BYTES])
+        if hi - lo > SUGGEST_SCAN_MAX and prefix in self.top and count <= _TOP:
+            entries = self.top[prefix]
+        else:
+            entries = self._best(lo, hi, count if len(prefix) <= SUGGEST_KEY_BYTES else hi - lo)
+        found = {}
+        for entry, order in zip(entries.tolist(), self.order[entries].tolist()):
+            owner = order & 0xFFFFFFFF
+            if owner not in found and (len(prefix) <= SUGGEST_KEY_BYTES or self._key(entry, len(prefix)) == prefix):
+                found[owner] = (order >> 61, (order >> 32) & ((1 << 29) - 1))
+                if len(found) == count:
+                    break
+        return list(found.items())
+
+
+class _Snapshot:
+    """ Names and categories of every tool at build time """
+
+    def __init__(self, rows):
+        ids, names, keys, categories = [], [], [], []
+        category_index = {}
+        for tool_id, name, category in rows:
+            ids.append(tool_id)
+            names.append(name or "")
+            keys.append(normalize(name))
+            categories.append(category_index.setdefault(category or "", len(category_index)))
+        self.ids = np.asarray(ids, dtype = np.int64) # ascending, so an id's row is a searchsorted away
+        self.names, self.name_offsets = _pack(names)
+        self.category_of = np.asarray(categories, dtype = np.int32)
+        self.categories = list(category_index)
+        self.category_rows = category_index
+        self.category_counts = np.bincount(self.category_of, minlength = len(self.categories)).astype(np.int64)
+        self.name_index = _PrefixArray(keys, [len(key) for key in keys])
+        self.category_index = _PrefixArray([normalize(c) for c in self.categories], (self.category_counts.max(initial = 0) - self.category_counts).tolist())
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, tool_id):
+        i = int(np.searchsorted(self.ids, tool_id))
+        return i if i < len(self.ids) and self.ids[i] == tool_id else None
+
+    def name(self, i):
+        return self.names[int(self.name_offsets[i]):int(self.name_offsets[i + 1])].decode("utf-8")
+
+    def category(self, i):
+        return self.categories[int(self.category_of[i])]
+
+
+def _word_match(key, prefix):
+    # prefix at the start of key or of any later word; returns 0 (start), 1 (later word) or None
+    if key.startswith(prefix):
+        return 0
+    return 1 if (" " + prefix) in key else None
+
+
+class SuggestIndex:
+    """ The snapshot plus the writes since it was built; safe to query while a rebuild runs """
+
+    def __init__(self):
+        self._snapshot = None
+        self._size = 0 # tools in the index now: the snapshot's, plus added, minus deleted since
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock() # one build at a time, or a second would drop the first's pending writes
+        self._recent = {} # tool_id -> (name, category, key): added or changed since the snapshot
+        self._hidden = set() # tool_ids whose snapshot entry is out of date
+        self._category_delta = {} # category -> change in count since the snapshot
+        self._pending = None # writes that land while a rebuild runs, replayed on the new snapshot
+        self._building = False
+        self._again = False
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    def build(self, db = None):
+        """ Read every name from the DB into a new snapshot and swap it in (blocking; waits for a running build) """
+        with self._build_lock:
+            return self._build(db)
+
+    def _build(self, db):
+        with self._lock:
+            self._pending = []
+        own = db is None
+        db = db or SessionLocal()
+        try:
+            start = time.perf_counter()
+            rows = db.query(Tool.id, Tool.name, Tool.category).order_by(Tool.id).yield_per(10000)
+            snapshot = _Snapshot(rows)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        finally:
+            if own:
+                db.close()
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._snapshot = snapshot
+            self._recent, self._hidden, self._category_delta = {}, set(), {}
+            self._size = len(snapshot)
+            for op, args in pending:
+                getattr(self, "_" + op)(*args)
+        print(f"Built the suggestion index for {len(snapshot)} tools in {time.perf_counter() - start:.1f}s")
+        return snapshot
+
+    def rebuild_async(self, again = False):
+        """ Start a rebuild in a background thread; again = also rebuild after one that's already running """
+        with self._lock:
+            if self._building:
+                self._again = self._again or again # e.g. a bulk load committed after that build read the table
+                return False
+            self._building = True
+
+        def run():
+            while True:
+                try:
+                    self.build()
+                except Exception as e:
+                    print(f"Rebuilding the suggestion index failed: {e}")
+                with self._lock:
+                    if not self._again:
+                        self._building = False
+                        return
+                    self._again = False
+        threading.Thread(target = run, name = "suggest-build", daemon = True).start()
+        return True
+
+    def _current(self, tool_id):
+        # (name, category) as the index sees it now, or None
+        if tool_id in self._recent:
+            return self._recent[tool_id][:2]
+        if self._snapshot is None or tool_id in self._hidden:
+            return None
+        i = self._snapshot.row(tool_id)
+        return None if i is None else (self._snapshot.name(i), self._snapshot.category(i))
+
+    def _count(self, category, change):
+        self._category_delta[category] = self._category_delta.get(category, 0) + change
+
+    def _upsert(self, tool_id, name, category):
+        current = self._current(tool_id)
+        if current is None:
+            self._size += 1
+        else:
+            self._count(current[1] or "", -1)
+        self._count(category or "", 1)
+        self._hidden.add(tool_id)
+        self._recent[tool_id] = (name or "", category or "", normalize(name))
+
+    def _remove(self, tool_id):
+        current = self._current(tool_id)
+        if current is not None:
+            self._size -= 1
+            self._count(current[1] or "", -1)
+        self._hidden.add(tool_id)
+        self._recent.pop(tool_id, None)
+
+    def _write(self, op, *args):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((op, args))
+            if self._snapshot is not None or self._pending is not None:
+                getattr(self, "_" + op)(*args)
+            stale = len(self._hidden) >= SUGGEST_REBUILD_AFTER
+        if stale:
+            self.rebuild_async()
+
+    def upsert(self, tool_id, name, category):
+        self._write("upsert", tool_id, name, category)
+
+    def remove(self, tool_id):
+        self._write("remove", tool_id)
+
+    def suggest(self, prefix, limit = 10, categories = 3):
+        """ ([(id, name, category)], [(category, tool count)]) for names / categories with a word starting with prefix """
+        with self._lock:
+            # copies, since writes change the overlay in place (it's small: a rebuild starts past SUGGEST_REBUILD_AFTER)
+            snapshot, recent, hidden, delta = self._snapshot, dict(self._recent), set(self._hidden), dict(self._category_delta)
+        key = normalize(prefix)
+        if snapshot is None or not key:
+            return [], []
+        if time.monotonic() - snapshot.built_at > SUGGEST_REFRESH_SECONDS:
+            self.rebuild_async() # pick up writes made by other workers; this query uses what's there
+        raw = key.encode("utf-8")
+
+        tools = []
+        # over-fetch for hidden ids and names that match at two words
+        for i, (later, length) in snapshot.name_index.candidates(raw, limit + len(hidden)):
+            tool_id = int(snapshot.ids[i])
+            if tool_id not in hidden:
+                tools.append(((later, length, tool_id), i))
+        for tool_id, (name, category, name_key) in recent.items():
+            match = _word_match(name_key, key)
+            if match is not None:
+                tools.append(((match, len(name_key), tool_id), (tool_id, name, category)))
+        tools.sort(key = lambda item: item[0])
+        # names are only decoded for what's returned
+        tools = [tool if isinstance(tool, tuple) else (int(snapshot.ids[tool]), snapshot.name(tool), snapshot.category(tool)) for _, tool in tools[:limit]]
+
+        found = []
+        if categories:
+            counts = {}
+            for i, _ in snapshot.category_index.candidates(raw, categories + len(delta)):
+                counts[snapshot.categories[i]] = int(snapshot.category_counts[i])
+            for category, change in delta.items():
+                if category in counts or _word_match(normalize(category), key) is not None:
+                    row = snapshot.category_rows.get(category)
+                    counts[category] = counts.get(category, 0 if row is None else int(snapshot.category_counts[row])) + change
+            found = sorted(((c, n) for c, n in counts.items() if c and n > 0), key = lambda item: (-item[1], item[0]))[:categories]
+        return tools, found
+
+
+index = SuggestIndex()
@@ -1,37 +1,129 @@
-from sqlalchemy.orm import Session
-from models import SessionLocal, Tool
-import openai
+import argparse
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update, bindparam
+try:
+    from backend.models import SessionLocal, Tool
+    from backend.embeddings import sync_embeddings, publish_embeddings
+    from backend.cache import bump_catalog_version
+    from backend.llm import make_llm_client, LimitedClient, RateLimiter, CompletionCache, LLM_MAX_RPM, LLM_MAX_TPM
+except ImportError:
+    from models import SessionLocal, Tool
+    from embeddings import sync_embeddings, publish_embeddings
+    from cache import bump_catalog_version
+    from llm import make_llm_client, LimitedClient, RateLimiter, CompletionCache, LLM_MAX_RPM, LLM_MAX_TPM
 
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# backfills descriptions for tools the scraper left with the placeholder
+# rows are read in keyset chunks; within a chunk each distinct normalized name is
+# generated once, concurrently under the LLM_MAX_RPM/LLM_MAX_TPM budget, and cached on disk so reruns
+# and duplicate names are free; each chunk is written with one executemany UPDATE and one commit
 
-def generate_description(name):
+PLACEHOLDER = "Scraped from public-apis list"
+DESCRIPTION_CACHE = os.getenv("DESCRIPTION_CACHE", ".description_cache.sqlite")
+DESCRIBE_CONCURRENCY = int(os.getenv("DESCRIBE_CONCURRENCY", "8"))
+DESCRIBE_CHUNK_SIZE = int(os.getenv("DESCRIBE_CHUNK_SIZE", "200"))
+
+def generate_description(client, name):
     """ Uses GPT to generate an API description """
     prompt = f"Provide a short, concise description for an API named '{name}'."
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an API documentation assistant."},
-                {"role": "user", "content": prompt}
-            ]
+    return client.complete(prompt).strip()
+
+def stream_placeholder_tools(db, chunk_size):
+    # keyset chunks (id > last id) rather than .all(): memory stays flat, and unlike a long-lived
+    # server-side cursor nothing is held open across the per-chunk commits (SQLite can't commit under one)
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Tool.id, Tool.name)
+            .filter(Tool.description == PLACEHOLDER, Tool.id > last_id)
+            .order_by(Tool.id)
+            .limit(chunk_size)
+            .all()
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        print(f"OpenAI Error: {e}")
-        return "No description available"
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield rows
+
+
+class DescriptionJob:
+    def __init__(self, client, cache, concurrency = DESCRIBE_CONCURRENCY):
+        self.client = client
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers = max(1, concurrency))
+        self.stats = {"rows": 0, "updated": 0, "unique_names": 0, "cache_hits": 0, "generated": 0, "failed": 0}
 
-def update_descriptions():
+    def _generate(self, key, name):
+        description = generate_description(self.client, name)
+        self.cache.set(key, description)
+        return description
+
+    def describe(self, rows):
+        """ Returns {tool_id: description} for a chunk, calling the LLM only for names not seen before """
+        keys = {row.id: CompletionCache.normalize(row.name) or row.name for row in rows}
+        names = {}
+        for row in rows:
+            names.setdefault(keys[row.id], row.name)
+        found = self.cache.get_many(names)
+        self.stats["unique_names"] += len(names)
+        self.stats["cache_hits"] += len(found)
+        futures = {key: self.pool.submit(self._generate, key, name) for key, name in names.items() if key not in found}
+        for key, future in futures.items():
+            try:
+                found[key] = future.result()
+                self.stats["generated"] += 1
+            except Exception as e:
+                # left as the placeholder, so the next run tries it again
+                print(f"OpenAI Error for {names[key]!r}: {e}")
+                self.stats["failed"] += 1
+        return {tool_id: found[key] for tool_id, key in keys.items() if key in found}
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def update_descriptions(llm = None, concurrency = DESCRIBE_CONCURRENCY, chunk_size = DESCRIBE_CHUNK_SIZE, cache_path = DESCRIPTION_CACHE, embed = True):
+    client = LimitedClient(make_llm_client(llm), RateLimiter(LLM_MAX_RPM, LLM_MAX_TPM))
+    cache = CompletionCache(cache_path)
+    job = DescriptionJob(client, cache, concurrency)
     db = SessionLocal()
-    tools = db.query(Tool).filter(Tool.description == "Scraped from public-apis list").all()
-    
-    for tool in tools:
-        print(f"Updating: {tool.name}")
-        tool.description = generate_description(tool.name)
-        db.commit()
-    
-    db.close()
-    print("Descriptions updated successfully!")
+    statement = (
+        update(Tool)
+        .where(Tool.id == bindparam("tool_id"), Tool.description == PLACEHOLDER) # don't clobber edits made meanwhile
+        .values(description = bindparam("new_description"))
+        .execution_options(synchronize_session = False)
+    )
+    start = time.perf_counter()
+    try:
+        for rows in stream_placeholder_tools(db, chunk_size):
+            described = job.describe(rows)
+            if described:
+                db.connection().execute(statement, [{"tool_id": tool_id, "new_description": text} for tool_id, text in described.items()])
+                db.commit()
+            job.stats["rows"] += len(rows)
+            job.stats["updated"] += len(described)
+            elapsed = time.perf_counter() - start
+            print(f"Updated {job.stats['updated']}/{job.stats['rows']} tools ({job.stats['rows'] / elapsed:.1f} rows/s)")
+        if embed and job.stats["updated"]:
+            sync_embeddings(db) # descriptions changed, so re-embed those tools
+            publish_embeddings(db)
+            bump_catalog_version(db) # invalidate cached API responses
+    finally:
+        job.close()
+        cache.close()
+        db.close()
+    elapsed = time.perf_counter() - start
+    stats = {**job.stats, "llm_calls": client.calls, "retries": client.retried, "seconds": round(elapsed, 2)}
+    stats["rows_per_second"] = round(stats["rows"] / elapsed, 1) if elapsed > 0 else None
+    print(f"Descriptions updated successfully! {stats}")
+    return stats
 
 if __name__ == "__main__":
-    update_descriptions()
+    parser = argparse.ArgumentParser(description = "Generate descriptions for tools still carrying the scraper placeholder")
+    parser.add_argument("--llm", choices = ["openai", "stub"], default = None, help = "defaults to LLM_BACKEND")
+    parser.add_argument("--concurrency", type = int, default = DESCRIBE_CONCURRENCY)
+    parser.add_argument("--chunk-size", type = int, default = DESCRIBE_CHUNK_SIZE)
+    parser.add_argument("--cache", default = DESCRIPTION_CACHE, help = "SQLite file for generated descriptions")
+    args = parser.parse_args()
+    update_descriptions(args.llm, args.concurrency, args.chunk_size, args.cache)
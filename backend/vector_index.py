@@ -0,0 +1,425 @@
+import os
+import threading
+import numpy as np
+
+# pluggable vector index behind ai_search
+# FlatIndex is exact (scores every vector, batched with NumPy)
+# IVFIndex is approximate: vectors are bucketed under k-means centroids and a query
+# only scores the nprobe closest buckets, so cost is ~ N * nprobe / nlist instead of N
+# all vectors are expected to be L2-normalized, so the score is cosine similarity
+
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "flat") # flat | ivf
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0")) # 0 = pick from the catalog size (~sqrt(N))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8")) # more probes = better recall, slower queries
+
+
+def _top_k(scores, k):
+    # indices of the k highest scores, best first; argpartition keeps this O(n)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype = np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class _RowStore:
+    """
+    Densely packed (ids, vectors) rows.
+    Deletes move the last row into the hole and the matrix grows by doubling,
+    so inserts and deletes are amortized O(d).
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.ids = np.empty(16, dtype = np.int64)
+        self.matrix = np.empty((16, dim), dtype = np.float32)
+        self.rows = {} # id -> row
+        self.size = 0
+
+    def upsert(self, item_id, vector):
+        row = self.rows.get(item_id)
+        if row is None:
+            row = self.size
+            if row == len(self.ids):
+                self.ids = np.concatenate([self.ids, np.empty_like(self.ids)])
+                self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+            self.ids[row] = item_id
+            self.rows[item_id] = row
+            self.size += 1
+        self.matrix[row] = vector
+
+    def remove(self, item_id):
+        row = self.rows.pop(item_id, None)
+        if row is None:
+            return False
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self.ids[last])
+            self.ids[row] = moved_id
+            self.matrix[row] = self.matrix[last]
+            self.rows[moved_id] = row
+        self.size -= 1
+        return True
+
+    def live(self):
+        return self.ids[:self.size], self.matrix[:self.size]
+
+    def lookup(self, ids):
+        rows = np.fromiter((row for row in map(self.rows.get, ids) if row is not None), dtype = np.int64)
+        return self.ids[rows], self.matrix[rows]
+
+
+class _AppendStore:
+    """
+    Rows for FlatIndex that a search can score without holding the index lock.
+    Rows are only ever appended: an update appends the new vector and marks the old row dead, a delete just
+    marks it dead. Growing and compacting (once half the rows are dead) copy into new arrays, so the arrays a
+    search picked up are never written to again within the rows it scans; only the live mask changes in place,
+    and a search copies that (one byte per row) under the lock.
+    """
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.ids = np.empty(16, dtype = np.int64)
+        self.matrix = np.empty((16, dim), dtype = np.float32)
+        self.live_mask = np.zeros(16, dtype = bool)
+        self.rows = {} # id -> row of its live vector
+        self.size = 0 # rows used, dead ones included
+
+    def _reserve(self):
+        if self.size < len(self.ids):
+            return
+        if len(self.rows) * 2 <= self.size:
+            self._compact()
+        if self.size == len(self.ids):
+            capacity = len(self.ids) * 2
+            self.ids = np.concatenate([self.ids, np.empty(capacity - len(self.ids), dtype = np.int64)])
+            self.matrix = np.concatenate([self.matrix, np.empty((capacity - len(self.matrix), self.dim), dtype = np.float32)])
+            self.live_mask = np.concatenate([self.live_mask, np.zeros(capacity - len(self.live_mask), dtype = bool)])
+
+    def _compact(self):
+        keep = np.flatnonzero(self.live_mask[:self.size])
+        capacity = max(16, len(self.ids))
+        ids = np.empty(capacity, dtype = np.int64)
+        matrix = np.empty((capacity, self.dim), dtype = np.float32)
+        ids[:len(keep)] = self.ids[keep]
+        matrix[:len(keep)] = self.matrix[keep]
+        live_mask = np.zeros(capacity, dtype = bool)
+        live_mask[:len(keep)] = True
+        self.ids, self.matrix, self.live_mask = ids, matrix, live_mask
+        self.rows = {int(item_id): row for row, item_id in enumerate(ids[:len(keep)].tolist())}
+        self.size = len(keep)
+
+    def upsert(self, item_id, vector):
+        self._reserve()
+        old = self.rows.get(item_id)
+        if old is not None:
+            self.live_mask[old] = False
+        row = self.size
+        self.ids[row] = item_id
+        self.matrix[row] = vector
+        self.live_mask[row] = True
+        self.rows[item_id] = row
+        self.size += 1
+
+    def remove(self, item_id):
+        row = self.rows.pop(item_id, None)
+        if row is not None:
+            self.live_mask[row] = False
+
+    def snapshot(self):
+        # (ids, matrix, live) over the used rows; safe to read after the lock is released
+        return self.ids[:self.size], self.matrix[:self.size], self.live_mask[:self.size].copy()
+
+    def live(self):
+        keep = np.flatnonzero(self.live_mask[:self.size])
+        return self.ids[keep], self.matrix[keep]
+
+    def lookup(self, ids):
+        rows = np.fromiter((row for row in map(self.rows.get, ids) if row is not None), dtype = np.int64)
+        return self.ids[rows], self.matrix[rows]
+
+
+class VectorIndex:
+    """
+    Interface every backend implements.
+    ids are ints (tool ids); vectors are float32 rows of length dim.
+    """
+    kind = None
+
+    def __init__(self, dim):
+        self.dim = dim
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def add(self, ids, vectors):
+        """ Insert or replace vectors by id """
+        raise NotImplementedError
+
+    def remove(self, ids):
+        raise NotImplementedError
+
+    def search_batch(self, queries, top_k):
+        """ queries is (q, dim); returns one [(id, score)] list per query, best first """
+        raise NotImplementedError
+
+    def search(self, query, top_k):
+        return self.search_batch(np.asarray(query, dtype = np.float32)[None, :], top_k)[0]
+
+    def lookup(self, ids):
+        """ (ids, vectors) for whichever of ids are stored """
+        raise NotImplementedError
+
+    def search_subset(self, query, ids, top_k):
+        """ Exact search over just these ids (a pre-filtered candidate set); cost is len(ids), not the index size """
+        found, vectors = self.lookup(ids)
+        if len(found) == 0:
+            return []
+        scores = vectors @ np.asarray(query, dtype = np.float32)
+        return [(int(found[i]), float(scores[i])) for i in _top_k(scores, top_k)]
+
+    def items(self):
+        """ All (ids, vectors) currently stored """
+        raise NotImplementedError
+
+    def save(self, path):
+        raise NotImplementedError
+
+
+class FlatIndex(VectorIndex):
+    """ Exact search: one matrix multiply against every stored vector """
+    kind = "flat"
+
+    def __init__(self, dim):
+        super().__init__(dim)
+        self.store = _AppendStore(dim)
+
+    def __len__(self):
+        return len(self.store.rows)
+
+    def add(self, ids, vectors):
+        with self._lock:
+            for item_id, vector in zip(ids, vectors):
+                self.store.upsert(int(item_id), vector)
+
+    def remove(self, ids):
+        with self._lock:
+            for item_id in ids:
+                self.store.remove(int(item_id))
+
+    def search_batch(self, queries, top_k):
+        # only the snapshot is taken under the lock; the O(N * d) scan runs outside it, so writes don't queue behind it
+        with self._lock:
+            ids, matrix, live = self.store.snapshot()
+        if not live.any():
+            return [[] for _ in queries]
+        scores = queries @ matrix.T # (q, N) in one BLAS call
+        scores[:, ~live] = -np.inf # replaced or deleted rows
+        results = []
+        for row in scores:
+            top = _top_k(row, top_k)
+            results.append([(int(ids[i]), float(row[i])) for i in top if row[i] != -np.inf])
+        return results
+
+    def lookup(self, ids):
+        with self._lock:
+            return self.store.lookup(ids)
+
+    def items(self):
+        with self._lock:
+            ids, matrix = self.store.live()
+            return ids.copy(), matrix.copy()
+
+    def save(self, path):
+        ids, matrix = self.items()
+        np.savez(path, kind = self.kind, dim = self.dim, ids = ids, vectors = matrix)
+
+    @classmethod
+    def _from_npz(cls, data):
+        index = cls(int(data["dim"]))
+        index.add(data["ids"], data["vectors"])
+        return index
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: k-means centroids partition the vectors into nlist buckets.
+    A query scores all centroids, then only the vectors in the nprobe best buckets.
+
+    Until there are enough vectors to train on (min_train_size), everything sits in one
+    untrained bucket and searches are exact. Inserts/deletes after training go straight
+    to the nearest bucket; call train() again if the data drifts a lot.
+    """
+    kind = "ivf"
+
+    def __init__(self, dim, nlist = None, nprobe = None, min_train_size = None, seed = 0):
+        super().__init__(dim)
+        self.nlist = nlist or IVF_NLIST
+        self.nprobe = nprobe or IVF_NPROBE
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self.centroids = None # (nlist, dim) once trained
+        self.lists = [_RowStore(dim)]
+        self.where = {} # id -> bucket number
+
+    def __len__(self):
+        return len(self.where)
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def _target_nlist(self, n):
+        return self.nlist or max(1, int(np.sqrt(n)))
+
+    def needs_training(self):
+        # untrained, or the catalog has grown enough that the buckets are ~2x too big
+        if not self.trained:
+            return len(self.where) > 0
+        return len(self.centroids) * 2 <= min(self._target_nlist(len(self.where)), len(self.where))
+
+    def _assign(self, vectors, chunk = 65536):
+        # nearest centroid for each vector, chunked so the (n, nlist) score matrix stays small
+        out = np.empty(len(vectors), dtype = np.int64)
+        for start in range(0, len(vectors), chunk):
+            out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ self.centroids.T, axis = 1)
+        return out
+
+    def train(self, vectors = None, iterations = 10, sample_size = 256):
+        """ (Re)compute the centroids with spherical k-means and redistribute every stored vector """
+        with self._lock:
+            ids, stored = self._all_items()
+            data = stored if vectors is None else np.asarray(vectors, dtype = np.float32)
+            nlist = min(self._target_nlist(len(data)), len(data))
+            if nlist == 0:
+                return
+            rng = np.random.default_rng(self.seed)
+            # k-means only needs a sample; ~256 points per centroid is plenty
+            if len(data) > nlist * sample_size:
+                data = data[rng.choice(len(data), nlist * sample_size, replace = False)]
+            centroids = data[rng.choice(len(data), nlist, replace = False)].copy()
+            for _ in range(iterations):
+                self.centroids = centroids
+                labels = self._assign(data)
+                # per-bucket sums via one sort + reduceat (much faster than np.add.at)
+                counts = np.bincount(labels, minlength = nlist)
+                starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+                empty = counts == 0
+                sums = np.zeros_like(centroids)
+                sums[~empty] = np.add.reduceat(data[np.argsort(labels, kind = "stable")], starts[~empty], axis = 0)
+                # re-seed empty buckets from random points so every list gets used
+                sums[empty] = data[rng.choice(len(data), int(empty.sum()))]
+                norms = np.linalg.norm(sums, axis = 1, keepdims = True)
+                centroids = sums / np.maximum(norms, 1e-12)
+            self.centroids = centroids.astype(np.float32)
+            self.lists = [_RowStore(self.dim) for _ in range(nlist)]
+            self.where = {}
+            self._insert(ids, stored)
+
+    def _all_items(self):
+        parts = [store.live() for store in self.lists if store.size]
+        if not parts:
+            return np.empty(0, dtype = np.int64), np.empty((0, self.dim), dtype = np.float32)
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def _insert(self, ids, vectors):
+        buckets = self._assign(vectors) if self.trained else np.zeros(len(ids), dtype = np.int64)
+        for item_id, vector, bucket in zip(ids, vectors, buckets):
+            item_id, bucket = int(item_id), int(bucket)
+            previous = self.where.get(item_id)
+            if previous is not None and previous != bucket:
+                self.lists[previous].remove(item_id)
+            self.lists[bucket].upsert(item_id, vector)
+            self.where[item_id] = bucket
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype = np.float32)
+        with self._lock:
+            self._insert(ids, vectors)
+            needs_training = self.min_train_size and not self.trained and len(self.where) >= self.min_train_size
+        if needs_training:
+            self.train()
+
+    def remove(self, ids):
+        with self._lock:
+            for item_id in ids:
+                bucket = self.where.pop(int(item_id), None)
+                if bucket is not None:
+                    self.lists[bucket].remove(int(item_id))
+
+    def search_batch(self, queries, top_k, nprobe = None):
+        nprobe = nprobe or self.nprobe
+        with self._lock:
+            if not self.where:
+                return [[] for _ in queries]
+            if self.trained:
+                probes = np.argsort(-(queries @ self.centroids.T), axis = 1)[:, :nprobe]
+            else:
+                probes = np.zeros((len(queries), 1), dtype = np.int64)
+            results = []
+            for query, buckets in zip(queries, probes):
+                parts = [self.lists[b].live() for b in buckets if self.lists[b].size]
+                if not parts:
+                    results.append([])
+                    continue
+                ids = np.concatenate([p[0] for p in parts])
+                scores = np.concatenate([p[1] @ query for p in parts])
+                top = _top_k(scores, top_k)
+                results.append([(int(ids[i]), float(scores[i])) for i in top])
+            return results
+
+    def lookup(self, ids):
+        with self._lock:
+            by_bucket = {}
+            for item_id in ids:
+                bucket = self.where.get(item_id)
+                if bucket is not None:
+                    by_bucket.setdefault(bucket, []).append(item_id)
+            parts = [self.lists[bucket].lookup(bucket_ids) for bucket, bucket_ids in by_bucket.items()]
+        if not parts:
+            return np.empty(0, dtype = np.int64), np.empty((0, self.dim), dtype = np.float32)
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def items(self):
+        with self._lock:
+            ids, vectors = self._all_items()
+            return ids.copy(), vectors.copy()
+
+    def save(self, path):
+        with self._lock:
+            ids, vectors = self._all_items()
+            np.savez(
+                path,
+                kind = self.kind,
+                dim = self.dim,
+                nlist = self.nlist,
+                nprobe = self.nprobe,
+                centroids = self.centroids if self.trained else np.empty((0, self.dim), dtype = np.float32),
+                ids = ids,
+                vectors = vectors,
+            )
+
+    @classmethod
+    def _from_npz(cls, data):
+        index = cls(int(data["dim"]), nlist = int(data["nlist"]), nprobe = int(data["nprobe"]))
+        if len(data["centroids"]):
+            index.centroids = data["centroids"]
+            index.lists = [_RowStore(index.dim) for _ in range(len(index.centroids))]
+        index.add(data["ids"], data["vectors"])
+        return index
+
+
+BACKENDS = {FlatIndex.kind: FlatIndex, IVFIndex.kind: IVFIndex}
+
+def make_index(dim, kind = None, **options):
+    kind = kind or VECTOR_INDEX
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown vector index '{kind}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[kind](dim, **options)
+
+def load_index(path):
+    # the path save() wrote to, suffix included (np.savez adds .npz if it was missing)
+    with np.load(path) as data:
+        return BACKENDS[str(data["kind"])]._from_npz(data)
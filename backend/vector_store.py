@@ -0,0 +1,286 @@
+import contextlib
+import fcntl
+import os
+import re
+import struct
+import time
+import numpy as np
+try:
+    from backend.vector_index import VectorIndex, FlatIndex, _top_k
+except ImportError:
+    from vector_index import VectorIndex, FlatIndex, _top_k
+
+# tool vectors shared by every uvicorn worker through memory-mapped files
+#
+# VECTOR_STORE_DIR/
+#   CURRENT            name of the live generation, e.g. "gen-000042" (swapped atomically with os.replace)
+#   gen-000042.vec     header + float32 vectors + int64 ids (ascending), mapped read-only by every worker (zero-copy)
+#   gen-000042.log     fixed-size upsert/delete records appended since that generation was built
+#
+# writers append to the live generation's log; readers tail it into a small private overlay
+# publish() compacts everything into a new generation and swaps CURRENT, without restarting anyone
+
+FORMAT_VERSION = 1
+MAGIC = b"THVEC\0\0\0"
+HEADER = struct.Struct("<8sIIQQd64s") # magic, version, dim, count, generation, created_at, model name
+HEADER_SIZE = 128 # header is padded so the vectors start aligned
+KEEP_GENERATIONS = 2 # older files are unlinked on publish (workers still mapping them keep their copy alive)
+OP_UPSERT, OP_DELETE = 1, 2
+GENERATION_FILE = re.compile(r"gen-(\d{6})\.(vec|log)")
+
+
+def _gen_name(generation):
+    return f"gen-{generation:06d}"
+
+def _log_dtype(dim):
+    return np.dtype([("op", "u1"), ("pad", "u1", 7), ("id", "<i8"), ("vector", "<f4", dim)])
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, dim, count, generation, created_at, model_name = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a vector store file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+    return {
+        "dim": dim,
+        "count": count,
+        "generation": generation,
+        "created_at": created_at,
+        "model_name": model_name.rstrip(b"\0").decode("utf-8"),
+    }
+
+def current_generation(store_dir):
+    try:
+        with open(os.path.join(store_dir, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def generation_model(store_dir, name = None):
+    """ The model a generation (default: the live one) was built with, or None if there is none """
+    name = name or current_generation(store_dir)
+    if name is None:
+        return None
+    try:
+        return read_header(os.path.join(store_dir, name + ".vec"))["model_name"]
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class _Locked:
+    # exclusive flock on a file for the duration of a with-block
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.f = open(self.path, "a+b")
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self.f
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+
+
+def publish(store_dir, chunks, dim, model_name, only_if_missing = False):
+    """
+    Write a new generation from an iterable of (ids, vectors) chunks and make it live.
+    Chunks must come in ascending id order (readers binary-search the ids).
+
+    The live log stays locked from before the snapshot starts until CURRENT points at the new
+    generation, so every append either landed before the snapshot (and is in it, since writers
+    commit to the DB first) or is redirected to the new generation's log.
+    Returns the new generation number, or None if only_if_missing and a usable one (same model) already existed.
+    """
+    os.makedirs(store_dir, exist_ok = True)
+    with _Locked(os.path.join(store_dir, "publish.lock")):
+        live = current_generation(store_dir)
+        if live and only_if_missing and generation_model(store_dir, live) == model_name:
+            return None
+        with (_Locked(os.path.join(store_dir, live + ".log")) if live else contextlib.nullcontext()):
+            generation = int(live.split("-")[1]) + 1 if live else 1
+            name = _gen_name(generation)
+            tmp_path = os.path.join(store_dir, name + ".vec.tmp")
+            all_ids = []
+            with open(tmp_path, "wb") as f:
+                f.write(b"\0" * HEADER_SIZE) # real header goes in once we know the count
+                for ids, vectors in chunks:
+                    f.write(np.ascontiguousarray(vectors, dtype = "<f4").tobytes())
+                    all_ids.append(np.asarray(ids, dtype = "<i8"))
+                ids = np.concatenate(all_ids) if all_ids else np.empty(0, dtype = "<i8")
+                f.write(ids.tobytes())
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, dim, len(ids), generation, time.time(), model_name.encode("utf-8")[:64]))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(store_dir, name + ".vec"))
+            open(os.path.join(store_dir, name + ".log"), "wb").close()
+            # swap the pointer last; readers pick the new generation up on their next refresh
+            pointer_tmp = os.path.join(store_dir, "CURRENT.tmp")
+            with open(pointer_tmp, "w") as f:
+                f.write(name)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer_tmp, os.path.join(store_dir, "CURRENT"))
+        _remove_old_generations(store_dir, generation)
+    return generation
+
+def _remove_old_generations(store_dir, generation):
+    for filename in os.listdir(store_dir):
+        match = GENERATION_FILE.fullmatch(filename)
+        if match and int(match.group(1)) <= generation - KEEP_GENERATIONS:
+            os.unlink(os.path.join(store_dir, filename))
+
+def append(store_dir, op, tool_id, vector = None, dim = None):
+    """ Record an upsert/delete in the live generation's log, for every worker to pick up """
+    while True:
+        live = current_generation(store_dir)
+        if live is None:
+            return False
+        with _Locked(os.path.join(store_dir, live + ".log")) as f:
+            # a publish may have swapped generations while we waited for the lock
+            if current_generation(store_dir) != live:
+                continue
+            dim = dim or read_header(os.path.join(store_dir, live + ".vec"))["dim"]
+            record = np.zeros(1, dtype = _log_dtype(dim))
+            record["op"] = op
+            record["id"] = tool_id
+            if vector is not None:
+                record["vector"] = vector
+            f.write(record.tobytes())
+            f.flush()
+            return True
+
+
+class SharedIndex(VectorIndex):
+    """
+    Exact search over the memory-mapped live generation plus a private overlay of the log.
+    Every worker maps the same file read-only, so the big matrix is in memory once per node.
+    With model_name set, a generation built with a different model is refused: the constructor raises,
+    and refresh() keeps serving the generation it has rather than mixing incompatible vectors.
+    """
+    kind = "shared"
+
+    def __init__(self, store_dir, model_name = None):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.generation = None
+        self._refused = None
+        self.header = None
+        self._open_generation(current_generation(store_dir))
+        super().__init__(self.header["dim"])
+
+    def _open_generation(self, name):
+        path = os.path.join(self.store_dir, name + ".vec")
+        header = read_header(path)
+        if self.model_name and header["model_name"] != self.model_name:
+            raise ValueError(f"{path} was built with {header['model_name']}, expected {self.model_name}")
+        dim, count = header["dim"], header["count"]
+        mapped = np.memmap(path, dtype = np.uint8, mode = "r")
+        self.base = mapped[HEADER_SIZE:HEADER_SIZE + count * dim * 4].view("<f4").reshape(count, dim)
+        self.base_ids = mapped[HEADER_SIZE + count * dim * 4:].view("<i8")[:count]
+        self.hidden = np.zeros(count, dtype = bool) # base rows deleted or replaced by the log
+        self.overlay = FlatIndex(dim)
+        self.dim = dim
+        self.log_offset = 0
+        self.generation = name
+        self.header = header
+
+    def _base_row(self, tool_id):
+        # ids are written in ascending order, so a binary search beats a per-worker dict of every id
+        row = int(np.searchsorted(self.base_ids, tool_id))
+        if row < len(self.base_ids) and self.base_ids[row] == tool_id:
+            return row
+        return None
+
+    def refresh(self):
+        # cheap when nothing changed: one small read of CURRENT plus a stat of the log
+        with self._lock:
+            live = current_generation(self.store_dir)
+            if live and live != self.generation and live != self._refused:
+                try:
+                    self._open_generation(live)
+                except ValueError as e:
+                    self._refused = live # don't re-read its header on every search
+                    print(f"Not switching to vector store generation {live}: {e}")
+            log_path = os.path.join(self.store_dir, self.generation + ".log")
+            try:
+                size = os.path.getsize(log_path)
+            except FileNotFoundError:
+                return
+            dtype = _log_dtype(self.dim)
+            whole = (size - self.log_offset) // dtype.itemsize * dtype.itemsize
+            if whole <= 0:
+                return
+            with open(log_path, "rb") as f:
+                f.seek(self.log_offset)
+                records = np.frombuffer(f.read(whole), dtype = dtype)
+            self.log_offset += whole
+            for record in records:
+                tool_id = int(record["id"])
+                row = self._base_row(tool_id)
+                if row is not None:
+                    self.hidden[row] = True
+                if record["op"] == OP_UPSERT:
+                    self.overlay.add([tool_id], record["vector"][None, :])
+                else:
+                    self.overlay.remove([tool_id])
+
+    def __len__(self):
+        self.refresh()
+        return int(len(self.base_ids) - self.hidden.sum()) + len(self.overlay)
+
+    def add(self, ids, vectors):
+        for tool_id, vector in zip(ids, vectors):
+            append(self.store_dir, OP_UPSERT, int(tool_id), vector, self.dim)
+        self.refresh() # read-your-writes for this worker
+
+    def remove(self, ids):
+        for tool_id in ids:
+            append(self.store_dir, OP_DELETE, int(tool_id), dim = self.dim)
+        self.refresh()
+
+    def search_batch(self, queries, top_k):
+        self.refresh()
+        with self._lock:
+            base, base_ids, hidden, overlay = self.base, self.base_ids, self.hidden.copy(), self.overlay
+        extra = overlay.search_batch(queries, top_k)
+        if len(base_ids) == 0:
+            return extra
+        scores = queries @ base.T
+        scores[:, hidden] = -np.inf
+        results = []
+        for row, overlay_hits in zip(scores, extra):
+            top = _top_k(row, top_k)
+            hits = [(int(base_ids[i]), float(row[i])) for i in top if row[i] != -np.inf]
+            results.append(sorted(hits + overlay_hits, key = lambda hit: -hit[1])[:top_k])
+        return results
+
+    def lookup(self, ids):
+        self.refresh()
+        with self._lock:
+            base, base_ids, hidden, overlay = self.base, self.base_ids, self.hidden.copy(), self.overlay
+        ids = np.asarray(list(ids), dtype = np.int64)
+        if len(base_ids) == 0 or len(ids) == 0:
+            return overlay.lookup(ids.tolist())
+        rows = np.minimum(np.searchsorted(base_ids, ids), len(base_ids) - 1)
+        rows = rows[(base_ids[rows] == ids) & ~hidden[rows]]
+        overlay_ids, overlay_vectors = overlay.lookup(ids.tolist())
+        return np.concatenate([base_ids[rows], overlay_ids]), np.concatenate([base[rows], overlay_vectors])
+
+    def items(self):
+        self.refresh()
+        with self._lock:
+            keep = ~self.hidden
+            overlay_ids, overlay_vectors = self.overlay.items()
+            return (
+                np.concatenate([self.base_ids[keep], overlay_ids]),
+                np.concatenate([self.base[keep], overlay_vectors]),
+            )
+
+    def save(self, path):
+        # a private flat copy (what FlatIndex.save writes), e.g. to seed VECTOR_INDEX_PATH; the store itself
+        # is persisted by publish()
+        ids, vectors = self.items()
+        np.savez(path, kind = FlatIndex.kind, dim = self.dim, ids = ids, vectors = vectors)
@@ -0,0 +1,51 @@
+import importlib
+import os
+import sys
+import tempfile
+import pytest
+
+# the backend modules create their engine at import time, so point it at a throwaway SQLite file first
+# (a file, not sqlite://: an in-memory database is per connection, and the app reads from a threadpool)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix = "toolhub-tests-"), "test.db")
+os.environ.setdefault("SESSION_SECRET_KEY", "test") # main.py refuses to start without one
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db():
+    """ A session on an empty tools table (tables, search index and count triggers created as on startup) """
+    importlib.import_module("backend.main") # creates the tables, FTS index and category count triggers
+    from backend.models import SessionLocal, Tool, ToolEmbedding, ToolNeighbor
+    from backend.cache import bump_catalog_version
+    session = SessionLocal()
+    for model in (ToolNeighbor, ToolEmbedding, Tool):
+        session.query(model).delete()
+    bump_catalog_version(session) # responses cached by an earlier test are for other rows
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client(db):
+    """ The app without its lifespan: no model load, no background threads """
+    from fastapi.testclient import TestClient
+    from backend import main
+    return TestClient(main.app)
+
+@pytest.fixture
+def add_tools(db):
+    """ add_tools([(name, description, category), ...]) -> ids, written straight to the DB """
+    from backend.models import Tool
+    from backend.cache import bump_catalog_version
+
+    def add(rows):
+        tools = [
+            Tool(name = name, description = description, category = category, url = f"https://tool-{name.lower().replace(' ', '-')}.example")
+            for name, description, category in rows
+        ]
+        db.add_all(tools)
+        db.commit()
+        bump_catalog_version(db)
+        return [tool.id for tool in tools]
+    return add
@@ -0,0 +1,60 @@
+from backend.cache import CachedResponse, LRUCache, ResponseCache, CatalogVersionTracker
+from backend.models import CatalogVersion
+
+
+def test_etag_matches_exact_weak_list_and_star():
+    entry = CachedResponse(b"[]")
+    assert entry.matches(entry.etag)
+    assert entry.matches("W/" + entry.etag)
+    assert entry.matches('"other", ' + entry.etag)
+    assert entry.matches('W/"other",W/' + entry.etag)
+    assert entry.matches("*")
+
+
+def test_etag_mismatch():
+    entry = CachedResponse(b"[]")
+    assert not entry.matches(None)
+    assert not entry.matches("")
+    assert not entry.matches('"other"')
+    assert not entry.matches(entry.etag.strip('"'))
+
+
+def test_lru_evicts_oldest_and_expires():
+    cache = LRUCache(max_entries = 2, ttl = 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a") # now most recent
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    cache.set("d", 4, ttl = -1)
+    assert cache.get("d") is None
+
+def test_key_normalizes_params_and_carries_the_version():
+    assert ResponseCache.key(3, "search", {"name": " fast  api", "limit": 10, "skip": None}) == "v3:search?limit=10&name=fast api"
+    assert ResponseCache.key(3, "tools", {}) != ResponseCache.key(4, "tools", {})
+
+def test_another_process_bumping_the_version_is_seen(db):
+    tracker = CatalogVersionTracker(poll_seconds = 0)
+    before = tracker.get(db)
+    db.query(CatalogVersion).filter(CatalogVersion.id == 1).update({CatalogVersion.version: CatalogVersion.version + 1})
+    db.commit() # as the ingest scripts would, without going through this tracker
+    assert tracker.get(db) == before + 1
+
+
+def test_write_invalidates_cached_responses(client, add_tools):
+    [tool_id] = add_tools([("Alpha", "first", "misc")])
+    first = client.get("/tools")
+    again = client.get("/tools")
+    assert (first.headers["X-Cache"], again.headers["X-Cache"]) == ("MISS", "HIT")
+    assert client.get("/tools", headers = {"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    client.put(f"/tools/{tool_id}", json = {"name": "Renamed"})
+    after = client.get("/tools")
+    assert after.headers["X-Cache"] == "MISS"
+    assert after.headers["ETag"] != first.headers["ETag"]
+    assert after.json()[0]["name"] == "Renamed"
+    assert client.get("/tools", headers = {"If-None-Match": first.headers["ETag"]}).status_code == 200
+
+    client.delete(f"/tools/{tool_id}")
+    assert client.get("/tools").json() == []
+    assert client.get(f"/tools/{tool_id}").status_code == 404
@@ -0,0 +1,49 @@
+from backend.facets import drift
+from backend.models import Tool, CategoryCount
+from backend.ingest import BulkIngest
+
+
+def stored(db):
+    return dict(db.query(CategoryCount.category, CategoryCount.count))
+
+
+def test_triggers_follow_inserts_updates_and_deletes(db, add_tools):
+    ids = add_tools([("A", "", "Maps"), ("B", "", "Maps"), ("C", "", "Weather"), ("D", "", None)])
+    assert stored(db) == {"Maps": 2, "Weather": 1} # no row for tools without a category
+
+    db.query(Tool).filter(Tool.id == ids[0]).update({Tool.category: "Weather"})
+    db.query(Tool).filter(Tool.id == ids[3]).update({Tool.category: "Maps"})
+    db.query(Tool).filter(Tool.id == ids[2]).update({Tool.name: "C2"}) # not a category change
+    db.commit()
+    assert stored(db) == {"Maps": 2, "Weather": 2}
+
+    db.query(Tool).filter(Tool.id.in_([ids[1], ids[3]])).delete(synchronize_session = False)
+    db.commit()
+    assert stored(db) == {"Weather": 2} # a category with no tools left is dropped
+    assert drift(db) == {}
+
+def test_bulk_upserts_keep_counts_right(db):
+    # ON CONFLICT DO UPDATE moves existing tools between categories; DO NOTHING must not count twice
+    first = BulkIngest(db)
+    for row, category in enumerate(["Maps", "Maps", "Text"]):
+        first.add(row, {"name": f"T{row}", "category": category, "url": f"https://t{row}.example"})
+    first.flush()
+    moved = BulkIngest(db, on_conflict = "update")
+    moved.add(1, {"name": "T0", "category": "Text", "url": "https://t0.example"})
+    moved.add(2, {"name": "New", "category": "Music", "url": "https://new.example"})
+    moved.flush()
+    kept = BulkIngest(db, on_conflict = "nothing")
+    kept.add(1, {"name": "T1", "category": "Music", "url": "https://t1.example"})
+    kept.flush()
+    assert stored(db) == {"Maps": 1, "Text": 2, "Music": 1}
+    assert drift(db) == {}
+
+def test_facets_endpoint(client, add_tools):
+    add_tools([("Open Maps", "", "Maps"), ("Open Weather", "", "Weather"), ("Weather Now", "", "Weather"), ("Closed", "", "Maps")])
+    everything = client.get("/tools/facets").json()["categories"]
+    assert everything == [{"name": "Maps", "count": 2}, {"name": "Weather", "count": 2}]
+    # scoped counts agree with what /tools/search?name= returns
+    scoped = client.get("/tools/facets", params = {"name": "open"}).json()["categories"]
+    searched = client.get("/tools/search", params = {"name": "open", "limit": 100}).json()
+    assert sum(facet["count"] for facet in scoped) == len(searched) == 2
+    assert client.get("/tools/facets", params = {"category": "wea"}).json()["categories"] == [{"name": "Weather", "count": 2}]
@@ -0,0 +1,69 @@
+import threading
+import pytest
+from backend.inference import BatchEncoder, QueueFull
+
+
+class RecordingEncoder:
+    """ encode_fn that remembers every batch it was given and returns len(text) per text """
+
+    def __init__(self, fail = False):
+        self.batches = []
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [len(text) for text in texts]
+
+
+def test_concurrent_queries_share_a_batch():
+    encode = RecordingEncoder()
+    encoder = BatchEncoder(encode, max_batch = 8, max_wait_ms = 200, workers = 1)
+    encoder.start()
+    try:
+        futures = [encoder.submit("x" * n) for n in range(1, 21)]
+        assert [future.result(timeout = 5) for future in futures] == list(range(1, 21)) # each caller gets its own vector
+    finally:
+        encoder.stop()
+    assert max(len(batch) for batch in encode.batches) == 8 # capped at max_batch
+    assert len(encode.batches) < 20
+    stats = encoder.metrics()
+    assert (stats["items"], stats["batches"]) == (20, len(encode.batches))
+
+def test_identical_texts_are_encoded_once():
+    encode = RecordingEncoder()
+    encoder = BatchEncoder(encode, max_batch = 16, max_wait_ms = 200)
+    encoder.start()
+    try:
+        futures = [encoder.submit("weather") for _ in range(5)]
+        assert {future.result(timeout = 5) for future in futures} == {7}
+    finally:
+        encoder.stop()
+    assert encode.batches == [["weather"]]
+
+def test_a_failed_batch_fails_every_caller_in_it():
+    encoder = BatchEncoder(RecordingEncoder(fail = True), max_wait_ms = 100)
+    encoder.start()
+    try:
+        futures = [encoder.submit(text) for text in ("a", "b")]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout = 5)
+    finally:
+        encoder.stop()
+    assert encoder.metrics()["errors"] >= 1
+
+def test_full_queue_sheds_load():
+    encoder = BatchEncoder(RecordingEncoder(), queue_size = 1) # not started, so nothing drains it
+    encoder.submit("a")
+    with pytest.raises(QueueFull):
+        encoder.submit("b")
+    assert encoder.metrics()["rejected"] == 1
+
+def test_encodes_inline_when_not_started():
+    encode = RecordingEncoder()
+    assert BatchEncoder(encode).encode("abc") == 3
+    assert encode.batches == [["abc"]]
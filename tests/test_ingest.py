@@ -0,0 +1,83 @@
+import asyncio
+import json
+from backend.ingest import iter_records, BulkIngest, max_batch_size, MAX_BATCH_SIZE
+from backend.models import Tool
+
+
+def records(body, fmt, chunk_size = 7):
+    # feed the body in small chunks, so lines (and multi-byte characters) straddle chunk boundaries
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    async def collect():
+        return [item async for item in iter_records(chunks(), fmt)]
+    return asyncio.run(collect())
+
+def tool(name, url, **fields):
+    return {"name": name, "category": "misc", "url": url, **fields}
+
+
+def test_ndjson_records_and_errors():
+    lines = [json.dumps(tool("Café", "https://a.example")), "", "{not json", "[1, 2]", json.dumps(tool("B", "https://b.example"))]
+    parsed = records("\n".join(lines).encode("utf-8"), "ndjson")
+    assert [(row, record and record["name"]) for row, record, error in parsed if not error] == [(1, "Café"), (5, "B")]
+    assert [(row, error.split(":")[0]) for row, _, error in parsed if error] == [(3, "invalid JSON"), (4, "expected a JSON object")]
+
+def test_csv_records_with_quoted_newlines():
+    body = 'Name,Description,Category,URL\r\nA,"two\nlines, and a comma",misc,https://a.example\r\nB,,misc\r\nC,plain,misc,https://c.example\r\n'
+    parsed = records(body.encode("utf-8"), "csv")
+    assert parsed[0] == (2, {"name": "A", "description": "two\nlines, and a comma", "category": "misc", "url": "https://a.example"}, None)
+    assert parsed[1] == (4, None, "expected 4 columns, got 3")
+    assert parsed[2][1]["name"] == "C"
+
+def test_csv_unterminated_quote():
+    parsed = records(b'name,description,category,url\nA,"never closed,misc,https://a.example\n', "csv")
+    assert parsed == [(2, None, "unterminated quoted field")]
+
+
+def test_upsert_updates_or_keeps_existing_urls(db):
+    ingest = BulkIngest(db)
+    ingest.add(1, tool("A", "https://a.example", description = "first"))
+    ingest.add(2, tool("B", "https://b.example"))
+    ingest.flush()
+    update = BulkIngest(db, on_conflict = "update")
+    update.add(1, tool("A2", "https://a.example", description = "second"))
+    update.flush()
+    keep = BulkIngest(db, on_conflict = "nothing")
+    keep.add(1, tool("B2", "https://b.example"))
+    keep.flush()
+    assert (update.report()["written"], keep.report()["written"], keep.report()["skipped"]) == (1, 0, 1)
+    rows = {url: (name, description) for url, name, description in db.query(Tool.url, Tool.name, Tool.description)}
+    assert rows == {"https://a.example": ("A2", "second"), "https://b.example": ("B", None)}
+
+def test_batches_report_bad_rows_and_repeated_urls(db):
+    ingest = BulkIngest(db, batch_size = 2)
+    ingest.add(1, tool("A", "https://a.example"))
+    ingest.add(2, {"category": "misc", "url": "https://no-name.example"}) # fails validation
+    ingest.add(3, tool("A again", "https://a.example")) # supersedes row 1 within the batch
+    ingest.add(4, None, "invalid JSON: ...")
+    ingest.flush()
+    report = ingest.report()
+    assert (report["received"], report["written"], report["skipped"], report["failed"]) == (4, 1, 1, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 4]
+    assert db.query(Tool.name).scalar() == "A again"
+
+def test_batch_size_stays_under_sqlite_bind_limit(db):
+    assert max_batch_size("sqlite") * 4 <= 32766
+    assert max_batch_size("postgresql") == MAX_BATCH_SIZE
+    assert BulkIngest(db, batch_size = MAX_BATCH_SIZE).batch_size == max_batch_size("sqlite")
+
+
+def test_bulk_endpoint(client, db):
+    body = "\n".join([json.dumps(tool("A", "https://a.example")), "oops", json.dumps(tool("B", "https://b.example"))])
+    response = client.post("/tools/bulk", content = body, headers = {"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["received"], report["written"], report["failed"]) == (3, 2, 1)
+    assert sorted(name for name, in db.query(Tool.name)) == ["A", "B"]
+    csv = "name,description,category,url\nA,updated,misc,https://a.example\n"
+    response = client.post("/tools/bulk", content = csv, headers = {"Content-Type": "text/csv"})
+    assert response.json()["written"] == 1
+    db.expire_all()
+    assert db.query(Tool.description).filter(Tool.url == "https://a.example").scalar() == "updated"
@@ -0,0 +1,68 @@
+import base64
+import pytest
+from backend.pagination import encode_cursor, decode_cursor
+
+
+def forge(raw):
+    # a cursor built by hand, the way a client tampering with one would
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def pages(client, path, limit, **params):
+    # follow X-Next-Cursor from the first page to the last
+    ids, cursor = [], ""
+    while cursor is not None:
+        response = client.get(path, params = {**params, "limit": limit, "cursor": cursor})
+        assert response.status_code == 200
+        ids += [tool["id"] for tool in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    return ids
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1.5, 42), 2) == [1.5, 42]
+    assert decode_cursor("", 1) is None
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!!",
+    forge("not json"),
+    forge('{"id": 1}'),
+    forge('["1"]'),
+    forge("[true]"),
+    forge("[1, 2]"), # wrong size for /tools
+    forge(f"[{2 ** 70}]"), # past SQLite's 64-bit integers
+    forge("[NaN]"),
+])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 1)
+
+@pytest.mark.parametrize("path", ["/tools", "/tools/search"])
+@pytest.mark.parametrize("cursor", ["garbage", forge('["x", "y"]'), forge(f"[{2 ** 70}, {2 ** 70}]"), forge("[1e999, 1]")])
+def test_bad_cursor_is_a_400(client, path, cursor):
+    response = client.get(path, params = {"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Malformed cursor"
+
+def test_list_pages_cover_every_tool_once(client, add_tools):
+    ids = add_tools([(f"Tool {i}", "a tool", "misc") for i in range(23)])
+    assert pages(client, "/tools", 5) == sorted(ids)
+
+def test_last_full_page_has_no_duplicates(client, add_tools):
+    # an exact multiple of the page size: the last page is full, the one after it empty
+    ids = add_tools([(f"Tool {i}", "a tool", "misc") for i in range(10)])
+    assert pages(client, "/tools", 5) == sorted(ids)
+
+@pytest.mark.parametrize("name", ["tool", "to"]) # the FTS5 path and the short-term LIKE path
+def test_search_pages_follow_the_ranking(client, add_tools, name):
+    # names and descriptions vary so ranks differ, and repeat so some tie and the id breaks them
+    rows = [(f"Tool {i}" if i % 3 else f"Gadget {i}", "tool " * (i % 4 + 1) + "for things", "misc") for i in range(20)]
+    add_tools(rows)
+    everything = [tool["id"] for tool in client.get("/tools/search", params = {"name": name, "limit": 100}).json()]
+    assert len(everything) == 20
+    paged = pages(client, "/tools/search", 3, name = name)
+    assert paged == everything
+    assert len(set(paged)) == len(paged)
+
+def test_cursor_header_is_exposed_to_the_frontend(client):
+    response = client.get("/tools", params = {"cursor": ""}, headers = {"Origin": "http://localhost:8080"})
+    assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
@@ -0,0 +1,69 @@
+import numpy as np
+from backend.embeddings import MODEL_NAME
+from backend.models import ToolEmbedding, ToolNeighbor
+from backend.similar import knn_blocks, build_similar, update_neighbors, remove_neighbors, similar_ids
+from backend.vector_index import FlatIndex
+
+DIM = 8
+K = 3
+
+
+def unit_vectors(n, seed = 0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis = 1, keepdims = True)
+
+def exact_graph(vectors, k = K):
+    # {tool_id: [neighbour ids best first]} by brute force
+    ids = list(vectors)
+    graph = {}
+    for tool_id in ids:
+        others = [other for other in ids if other != tool_id]
+        scores = [float(vectors[tool_id] @ vectors[other]) for other in others]
+        graph[tool_id] = [others[i] for i in np.argsort(scores, kind = "stable")[::-1][:k]]
+    return graph
+
+def stored_graph(db):
+    graph = {}
+    for tool_id, neighbor_id in db.query(ToolNeighbor.tool_id, ToolNeighbor.neighbor_id).order_by(ToolNeighbor.tool_id, ToolNeighbor.rank):
+        graph.setdefault(tool_id, []).append(neighbor_id)
+    return graph
+
+def store_embeddings(db, vectors):
+    db.add_all(
+        ToolEmbedding(tool_id = tool_id, model_name = MODEL_NAME, content_hash = "", dim = DIM, vector = vector.tobytes())
+        for tool_id, vector in vectors.items()
+    )
+    db.commit()
+
+
+def test_knn_blocks_match_brute_force():
+    vectors = unit_vectors(25)
+    ids = np.arange(100, 125)
+    graph = {}
+    for tool_ids, neighbor_ids, scores in knn_blocks(ids, vectors, K, block_rows = 4): # several uneven blocks
+        assert np.all(np.diff(scores, axis = 1) <= 0) # best first
+        graph.update({int(tool_id): [int(n) for n in row] for tool_id, row in zip(tool_ids, neighbor_ids)})
+    expected = exact_graph(dict(enumerate(vectors)))
+    assert graph == {100 + tool_id: [100 + n for n in row] for tool_id, row in expected.items()}
+
+def test_build_then_maintain_incrementally(db):
+    vectors = dict(enumerate(unit_vectors(30), start = 1))
+    store_embeddings(db, vectors)
+    build_similar(db, k = K)
+    assert stored_graph(db) == exact_graph(vectors)
+    assert [neighbor_id for neighbor_id, _ in similar_ids(db, 1, 2)] == exact_graph(vectors)[1][:2]
+
+    index = FlatIndex(DIM)
+    index.add(list(vectors), np.stack(list(vectors.values())))
+    # a new tool, then one whose vector moves: lists that gain, lose or reorder it are patched
+    new = unit_vectors(2, seed = 1)
+    for tool_id, vector in ((31, new[0]), (5, new[1])):
+        vectors[tool_id] = vector
+        index.add([tool_id], [vector])
+        update_neighbors(db, index, tool_id, vector, k = K)
+        assert stored_graph(db) == exact_graph(vectors) # exact while the catalog is under SIMILAR_REVERSE_SCAN
+
+    del vectors[31]
+    index.remove([31])
+    remove_neighbors(db, index, 31, k = K)
+    assert stored_graph(db) == exact_graph(vectors)
@@ -0,0 +1,145 @@
+import threading
+from backend import suggest
+from backend.suggest import SuggestIndex, _PrefixArray, _Snapshot, normalize
+
+ROWS = [
+    (1, "Open Weather", "Weather"),
+    (2, "WeatherStack", "Weather"),
+    (3, "OpenStreetMap", "Maps"),
+    (4, "Mapbox", "Maps"),
+    (5, "Weasel Words", "Text"),
+]
+
+
+class FakeDB:
+    """ Just enough of a Session for SuggestIndex.build: query(...).order_by(...).yield_per(...) """
+
+    def __init__(self, rows, during = None):
+        self.rows = rows
+        self.during = during # called halfway through the read, to land a write mid-build
+
+    def query(self, *columns):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def yield_per(self, n):
+        for i, row in enumerate(self.rows):
+            if self.during and i == len(self.rows) // 2:
+                self.during()
+            yield row
+
+
+def built(rows = ROWS):
+    index = SuggestIndex()
+    index.build(FakeDB(rows))
+    return index
+
+def names(result):
+    return [name for _, name, _ in result[0]]
+
+
+def test_normalize():
+    assert normalize("  Open-Weather  API ") == "open weather api"
+    assert normalize(None) == ""
+
+def test_prefix_array_matches_any_word_start():
+    keys = ["open weather", "weatherstack", "open street map"]
+    array = _PrefixArray(keys, [len(key) for key in keys])
+    found = dict(array.candidates(b"wea", 10))
+    # a match at the start of the key ranks before one at a later word
+    assert found == {1: (0, len("weatherstack")), 0: (1, len("open weather"))}
+    assert [owner for owner, _ in array.candidates(b"wea", 10)] == [1, 0]
+    assert array.candidates(b"eather", 10) == [] # not a word start
+    assert [owner for owner, _ in array.candidates(b"open", 1)] == [0] # shorter key first, and count is respected
+
+def test_prefix_array_precomputed_ranges(monkeypatch):
+    monkeypatch.setattr(suggest, "SUGGEST_SCAN_MAX", 4) # make "a" a range big enough to precompute
+    keys = [f"a{'x' * i}" for i in range(20)]
+    array = _PrefixArray(keys, [len(key) for key in keys])
+    assert b"a" in array.top
+    assert [owner for owner, _ in array.candidates(b"a", 3)] == [0, 1, 2]
+
+def test_snapshot_rows_and_counts():
+    snapshot = _Snapshot(ROWS)
+    assert len(snapshot) == 5
+    assert snapshot.name(snapshot.row(3)) == "OpenStreetMap"
+    assert snapshot.row(42) is None
+    assert dict(zip(snapshot.categories, snapshot.category_counts.tolist())) == {"Weather": 2, "Maps": 2, "Text": 1}
+
+def test_suggest_ranks_start_of_name_first():
+    index = built()
+    tools, categories = index.suggest("wea", limit = 10, categories = 3)
+    assert [name for _, name, _ in tools] == ["WeatherStack", "Weasel Words", "Open Weather"]
+    assert categories == [("Weather", 2)]
+
+def test_recent_overrides_snapshot():
+    index = built()
+    index.upsert(2, "Rainfall", "Weather") # renamed: the snapshot's "WeatherStack" must not show up
+    index.upsert(6, "Weatherly", "Climate")
+    assert names(index.suggest("wea", 10)) == ["Weatherly", "Weasel Words", "Open Weather"]
+    assert names(index.suggest("rain", 10)) == ["Rainfall"]
+    assert index.suggest("clim", 10, categories = 3)[1] == [("Climate", 1)]
+    assert len(index) == 6
+
+def test_hidden_removes_from_results_and_counts():
+    index = built()
+    index.remove(1)
+    index.remove(2)
+    assert names(index.suggest("wea", 10)) == ["Weasel Words"]
+    assert index.suggest("wea", 10, categories = 3)[1] == [] # no Weather tools left
+    index.upsert(1, "Open Weather", "Weather") # and back again
+    assert names(index.suggest("wea", 10)) == ["Weasel Words", "Open Weather"]
+    assert len(index) == 4
+
+def test_writes_during_a_build_survive_it():
+    index = built()
+    db = FakeDB(ROWS, during = lambda: (index.upsert(7, "Weather Radar", "Weather"), index.remove(4)))
+    index.build(db) # the DB rows don't have the writes; the pending list replays them on the new snapshot
+    assert "Weather Radar" in names(index.suggest("weather", 10))
+    assert names(index.suggest("mapb", 10)) == []
+    assert len(index) == 5
+
+def test_overlapping_builds_are_serialized():
+    index = built()
+    reading, release, second_read = threading.Event(), threading.Event(), threading.Event()
+
+    def stall():
+        index.upsert(8, "Weatherproof", "Weather") # a write buffered by the first build
+        reading.set()
+        release.wait(5)
+
+    first = threading.Thread(target = index.build, args = (FakeDB(ROWS, during = stall),))
+    first.start()
+    assert reading.wait(5)
+    # committed by now, so the second build's read includes it
+    second = threading.Thread(target = index.build, args = (FakeDB(ROWS + [(8, "Weatherproof", "Weather")], during = second_read.set),))
+    second.start()
+    assert not second_read.wait(0.2) # waits for the first instead of resetting its pending writes
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert second_read.is_set()
+    assert "Weatherproof" in names(index.suggest("weatherp", 10))
+    assert len(index) == 6
+
+def test_rebuild_async_coalesces(monkeypatch):
+    index = SuggestIndex()
+    started = []
+    release = threading.Event()
+
+    def slow_build(db = None):
+        started.append(1)
+        release.wait(5)
+
+    monkeypatch.setattr(index, "build", slow_build)
+    assert index.rebuild_async() is True
+    assert index.rebuild_async(again = True) is False # folded into the running one, then run once more
+    release.set()
+    for _ in range(100):
+        with index._lock:
+            if not index._building:
+                break
+        threading.Event().wait(0.01)
+    assert len(started) == 2
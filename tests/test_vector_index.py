@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from backend.vector_index import FlatIndex, IVFIndex, make_index, load_index
+from backend.embeddings import EmbeddingIndex
+
+DIM = 16
+
+
+def unit_vectors(n, seed = 0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis = 1, keepdims = True)
+
+def exact(stored, query, k):
+    # brute force over {id: vector}, the answer every backend should give (IVF with every bucket probed)
+    ids = list(stored)
+    scores = np.array([stored[i] @ query for i in ids])
+    return [ids[i] for i in np.argsort(-scores, kind = "stable")[:k]]
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf"])
+def test_add_replace_remove_search(kind):
+    index = make_index(DIM, kind)
+    vectors = unit_vectors(300)
+    index.add(range(300), vectors)
+    if kind == "ivf":
+        index.train()
+        index.nprobe = len(index.lists) # probe everything: exact
+    stored = dict(enumerate(vectors))
+    replaced = unit_vectors(50, seed = 1)
+    index.add(range(50), replaced)
+    stored.update(enumerate(replaced))
+    index.remove(range(250, 300))
+    index.remove([10_000]) # unknown ids are ignored
+    for gone in range(250, 300):
+        del stored[gone]
+
+    assert len(index) == 250
+    for query in unit_vectors(5, seed = 2):
+        hits = index.search(query, 10)
+        assert [tool_id for tool_id, _ in hits] == exact(stored, query, 10)
+        assert all(tool_id < 250 for tool_id, _ in hits)
+    found, vectors = index.lookup([3, 260, 7])
+    assert dict(zip(found.tolist(), map(tuple, vectors))) == {3: tuple(stored[3]), 7: tuple(stored[7])}
+    ids, _ = index.items()
+    assert sorted(ids.tolist()) == sorted(stored)
+
+def test_flat_index_compacts_replaced_rows():
+    index = FlatIndex(DIM)
+    vectors = unit_vectors(20)
+    for shift in range(50): # 1000 upserts of the same 20 ids
+        index.add(range(20), np.roll(vectors, shift, axis = 0))
+    assert len(index) == 20
+    assert index.store.size < 100 # dead rows were dropped, not kept forever
+    assert [tool_id for tool_id, _ in index.search(vectors[0], 1)] == [49 % 20] # the last round put vectors[0] at id 49 % 20
+
+def test_search_subset_and_empty_index():
+    index = FlatIndex(DIM)
+    assert index.search(unit_vectors(1)[0], 5) == []
+    vectors = unit_vectors(30)
+    index.add(range(30), vectors)
+    hits = index.search_subset(vectors[4], [1, 4, 9, 999], 2)
+    assert hits[0][0] == 4 and {tool_id for tool_id, _ in hits} <= {1, 4, 9}
+
+def test_ivf_trains_once_big_enough():
+    index = IVFIndex(DIM, nlist = 4, min_train_size = 100)
+    index.add(range(99), unit_vectors(99))
+    assert not index.trained
+    index.add([99], unit_vectors(1, seed = 3))
+    assert index.trained and len(index.centroids) == 4 and len(index) == 100
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf"])
+def test_save_and_load(tmp_path, kind):
+    index = make_index(DIM, kind)
+    vectors = unit_vectors(200)
+    index.add(range(200), vectors)
+    if kind == "ivf":
+        index.train()
+    path = tmp_path / "index.npz"
+    index.save(str(path))
+    loaded = load_index(str(path))
+    assert (type(loaded), loaded.dim, len(loaded)) == (type(index), DIM, 200)
+    if kind == "ivf":
+        assert np.array_equal(loaded.centroids, index.centroids) # no retraining on load
+    query = unit_vectors(1, seed = 5)[0]
+    assert loaded.search(query, 5) == index.search(query, 5)
+
+def test_index_path_without_suffix_is_found_again(tmp_path):
+    # np.savez appends .npz; the saved file must be what the next startup looks for
+    embeddings = EmbeddingIndex(kind = "flat", path = str(tmp_path / "tools"))
+    index = make_index(DIM, "flat")
+    index.add([1, 2], unit_vectors(2))
+    index.save(embeddings.path)
+    assert len(embeddings._new_index(DIM)) == 2